@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('assembleur_dxf_dwg.py', '.'), ('config/icon.ico', 'config')],
-    hiddenimports=['ezdxf', 'ezdxf.addons', 'ezdxf.addons.dxf2code', 'ezdxf.lldxf', 'ezdxf.entities', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'win32com.client', 'win32com'],
+    hiddenimports=['assembleur_core', 'assembleur_cli', 'ezdxf', 'ezdxf.addons', 'ezdxf.addons.dxf2code', 'ezdxf.lldxf', 'ezdxf.entities', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'win32com.client', 'win32com'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
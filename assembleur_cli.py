@@ -0,0 +1,520 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : mode ligne de commande (sans interface graphique)
+- Exécute le même pipeline que l'interface, sans importer PyQt5
+- Fichier de tâches JSON : plusieurs couples dossier d'archives/sortie enchaînés
+  dans un même processus (imports et modules déjà chargés réutilisés)
+- Rapport JSON : statut, durée de chaque étape et compteurs de chaque tâche
+- Extraction d'une zone d'un assemblage indexé (fenêtre X/Y ou sources), sans le relire
+- Surveillance d'un dossier de dépôt (--watch) : processus résident, assemblage mis à jour
+  à chaque archive nouvelle ou modifiée
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from assembleur_core import (
+    APP_VERSION, EVENT_FINISHED, EVENT_LOG, AssemblyEngine, EngineEvent,
+    check_autocad_available, default_cache_dir, open_in_qgis
+)
+from assembleur_convert import DWG_CONVERTERS, find_oda_converter
+from assembleur_geopackage import GEOPACKAGE_SRS_ID, geopackage_path
+from assembleur_index import extract_region
+from assembleur_metrics import PROFILERS, STAGES, write_metrics_csv
+from assembleur_output import OUTPUT_FORMATS, output_path, qgis_source
+from assembleur_shards import SHARD_MODES, SHARD_TILE_SIZE, shards_index_path
+from assembleur_simplify import check_simplify_options
+from assembleur_watch import WATCH_POLL_INTERVAL, WATCH_SETTLE_SECONDS, snapshot_archives, watch_folder
+
+
+# Options d'une tâche et valeurs par défaut (clés du fichier de tâches)
+JOB_DEFAULTS = {
+    "name": None,
+    "archive_folder": "",
+    "dxf_folders": [],
+    "output": "",
+    "cleanup": False,
+    "convert_dwg": False,
+    "open_qgis": False,
+    "single_parse": True,
+    "merge_workers": 1,
+    "in_memory": False,
+    "cache_dir": None,
+    "incremental": False,
+    "strict_validation": False,
+    "approx_extents": False,
+    "spatial_index": False,
+    "shard_by": None,
+    "shard_tile_size": SHARD_TILE_SIZE,
+    "shard_max_entities": None,
+    "dedup_blocks": True,
+    "output_format": "ascii",
+    "streaming": False,
+    "simplify_tolerance": None,
+    "coordinate_precision": None,
+    "geopackage": False,
+    "geopackage_srs": GEOPACKAGE_SRS_ID,
+    "dwg_converter": "autocad",
+    "oda_converter": None,
+    "dwg_workers": None,
+    "profile_stage": None,
+    "profiler": "cprofile",
+    "profile_output": None,
+}
+
+# Options contenant des chemins, résolus par rapport au fichier de tâches
+_PATH_OPTIONS = ("archive_folder", "output", "cache_dir", "profile_output")
+
+
+def print_event(event: EngineEvent, quiet: bool = False) -> None:
+    """Affiche un événement du moteur (journal sur la sortie standard, erreurs sur stderr)."""
+    if event.kind == EVENT_LOG:
+        if not quiet:
+            print(event.message, flush=True)
+    elif event.kind == EVENT_FINISHED:
+        if event.status == "ok":
+            if not quiet:
+                print(f"✅ {event.message}", flush=True)
+        else:
+            # La trace complète est déjà journalisée par le moteur
+            print(event.message.split("\n", 1)[0], file=sys.stderr, flush=True)
+
+
+def _split_folders(value) -> List[str]:
+    """Liste de dossiers, depuis une liste ou une chaîne séparée par des virgules."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [folder.strip() for folder in value if folder and folder.strip()]
+
+
+def _resolve_job_options(options: dict, base_dir: str, path: str) -> dict:
+    """Contrôle les clés d'un jeu d'options du fichier de tâches et résout ses chemins relatifs."""
+    unknown = set(options) - set(JOB_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Option(s) inconnue(s) dans {path} : {', '.join(sorted(unknown))}")
+    options = dict(options)
+    for key in _PATH_OPTIONS:
+        if options.get(key):
+            options[key] = os.path.join(base_dir, options[key])
+    if "dxf_folders" in options:
+        options["dxf_folders"] = [os.path.join(base_dir, folder) for folder in _split_folders(options["dxf_folders"])]
+    return options
+
+
+def load_job_file(path: str) -> Tuple[dict, List[dict]]:
+    """Charge un fichier de tâches JSON.
+
+    Le fichier contient soit une liste de tâches, soit un objet
+    {"defaults": {...}, "jobs": [...]}. Chaque tâche reprend les clés de JOB_DEFAULTS ;
+    les chemins relatifs sont résolus par rapport au dossier du fichier de tâches.
+
+    Args:
+        path: Chemin du fichier de tâches
+
+    Returns:
+        (options par défaut du fichier, liste des tâches), options non renseignées absentes :
+        les valeurs par défaut du fichier passent après les options de la ligne de commande
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get("defaults") or {}
+        data = data.get("jobs")
+    if not isinstance(data, list) or not all(isinstance(job, dict) for job in data):
+        raise ValueError(f"Fichier de tâches invalide (liste de tâches attendue) : {path}")
+    if not isinstance(defaults, dict):
+        raise ValueError(f"Fichier de tâches invalide (\"defaults\" doit être un objet) : {path}")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return (_resolve_job_options(defaults, base_dir, path),
+            [_resolve_job_options(entry, base_dir, path) for entry in data])
+
+
+def run_job(job: dict, quiet: bool = False, metrics_rows: Optional[list] = None,
+            open_results: bool = True) -> dict:
+    """Exécute une tâche d'assemblage dans le processus courant.
+
+    Args:
+        job: Options de la tâche (clés de JOB_DEFAULTS)
+        quiet: Si True, le journal du pipeline n'est pas affiché
+        metrics_rows: Si fourni, reçoit les mesures détaillées de la tâche (avec son nom)
+        open_results: Si False, le résultat n'est ouvert ni dans AutoCAD ni dans QGIS (surveillance)
+
+    Returns:
+        Entrée du rapport pour cette tâche
+    """
+    output = os.path.abspath(job["output"])
+    entry = {
+        "name": job["name"] or os.path.basename(job["archive_folder"].rstrip("\\/")) or output,
+        "archive_folder": job["archive_folder"],
+        "dxf_folders": job["dxf_folders"],
+        "output": os.path.join(output, "assemblage.dxf"),
+        "output_format": job["output_format"],
+        "started": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    if job["convert_dwg"] and job["dwg_converter"] == "oda":
+        if not (job["oda_converter"] or find_oda_converter()):
+            entry.update(status="error", message="La conversion en DWG nécessite ODA File Converter "
+                                                 "(--oda-converter ou variable ODA_FILE_CONVERTER)",
+                         elapsed=0.0, stages={}, metrics={}, counts={})
+            print(f"❌ {entry['message']}", file=sys.stderr, flush=True)
+            return entry
+    elif job["convert_dwg"]:
+        acad_ok, acad_err = check_autocad_available(convert_to_dwg=True)
+        if not acad_ok:
+            entry.update(status="error", message=f"La conversion en DWG nécessite AutoCAD : {acad_err}",
+                         elapsed=0.0, stages={}, metrics={}, counts={})
+            print(f"❌ {entry['message']}", file=sys.stderr, flush=True)
+            return entry
+
+    engine = AssemblyEngine(
+        job["archive_folder"], job["dxf_folders"], output, job["cleanup"],
+        convert_before_open=job["convert_dwg"], single_parse=job["single_parse"],
+        merge_workers=job["merge_workers"], in_memory=job["in_memory"], cache_dir=job["cache_dir"],
+        incremental=job["incremental"], strict_validation=job["strict_validation"],
+        approximate_extents=job["approx_extents"], spatial_index=job["spatial_index"],
+        shard_by=job["shard_by"], shard_tile_size=job["shard_tile_size"],
+        shard_max_entities=job["shard_max_entities"], dedup_blocks=job["dedup_blocks"],
+        output_format=job["output_format"], streaming=job["streaming"],
+        simplify_tolerance=job["simplify_tolerance"], coordinate_precision=job["coordinate_precision"],
+        geopackage=job["geopackage"], geopackage_srs=job["geopackage_srs"],
+        dwg_converter=job["dwg_converter"], oda_converter=job["oda_converter"], dwg_workers=job["dwg_workers"],
+        # ODA File Converter convertit sans AutoCAD : pas d'ouverture en fin de tâche
+        open_in_autocad=open_results and job["convert_dwg"] and job["dwg_converter"] == "autocad",
+        name=entry["name"],
+        listeners=[lambda event: print_event(event, quiet)],
+        profile_stage=job["profile_stage"], profiler=job["profiler"], profile_output=job["profile_output"],
+    )
+    start = time.perf_counter()
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        engine.status = "cancelled"
+        engine.message = "Traitement interrompu"
+    entry.update(status=engine.status or "error",
+                 message=engine.message.split("\n", 1)[0] if engine.message else None,
+                 elapsed=round(time.perf_counter() - start, 3),
+                 stages={name: round(t, 3) for name, t in engine.stage_times.items()},
+                 metrics=engine.metrics.totals(),
+                 counts=dict(engine.counts))
+    if metrics_rows is not None:
+        metrics_rows.extend({"job": entry["name"], **record.as_dict()} for record in engine.metrics.records)
+
+    gpkg = geopackage_path(entry["output"])
+    gpkg = gpkg if job["geopackage"] and entry["status"] == "ok" and os.path.isfile(gpkg) else None
+    if gpkg is not None:
+        entry["geopackage"] = gpkg
+    if job["shard_by"]:
+        # Sortie découpée : le rapport désigne l'index des DXF écrits
+        entry["output"] = shards_index_path(entry["output"])
+        qgis_path = gpkg
+        if job["open_qgis"] and open_results and gpkg is None:
+            print_event(EngineEvent(EVENT_LOG, message="ℹ️ Sortie découpée : pas d'ouverture dans QGIS"), quiet)
+    else:
+        entry["output"] = output_path(entry["output"], job["output_format"])
+        # Sortie compressée : ouverte par le système de fichiers virtuel de GDAL
+        qgis_path = gpkg or entry["output"]
+    if qgis_path is not None and entry["status"] == "ok" and job["open_qgis"] and open_results:
+        # Le GeoPackage (index spatial, sans relecture du DXF) est préféré à l'assemblage
+        opened, qgis_err = open_in_qgis(qgis_path if gpkg is not None else qgis_source(qgis_path))
+        if opened:
+            print_event(EngineEvent(EVENT_LOG, message=f"🗺️ Ouverture dans QGIS : {qgis_path}"), quiet)
+        else:
+            print_event(EngineEvent(EVENT_LOG, message=f"⚠️ {qgis_err}"), quiet)
+    return entry
+
+
+def run_watch(job: dict, args) -> int:
+    """Surveille le dossier d'archives d'une tâche et met l'assemblage à jour à chaque changement.
+
+    Une première exécution met l'assemblage à jour, puis chaque lot d'archives nouvelles,
+    modifiées ou supprimées (stables depuis --watch-settle secondes) déclenche une mise à
+    jour incrémentale : seules ces archives sont extraites et réimportées. Le rapport
+    (--report) décrit la dernière exécution. S'arrête par Ctrl+C ou SIGTERM (service).
+
+    Returns:
+        Code de sortie : 0 à l'arrêt de la surveillance
+    """
+    if not job["incremental"]:
+        job["incremental"] = True
+        print("ℹ️ Surveillance : mise à jour incrémentale activée", flush=True)
+    if job["shard_by"] or job["streaming"]:
+        print("ℹ️ Sortie découpée ou écriture en flux : assemblage complet à chaque changement", flush=True)
+    if job["open_qgis"]:
+        print("ℹ️ Surveillance : pas d'ouverture dans QGIS", flush=True)
+
+    def update() -> None:
+        started = datetime.now().isoformat(timespec="seconds")
+        entry = run_job(job, args.quiet, open_results=False)
+        print(f"{'✅' if entry['status'] == 'ok' else '❌'} {entry['name']} : {entry['status']} "
+              f"({entry['elapsed']:.1f} s, {entry['counts'].get('entities', 0)} entités) → {entry['output']}",
+              flush=True)
+        if entry["status"] == "cancelled":
+            raise KeyboardInterrupt
+        if args.report:
+            report = {"app_version": APP_VERSION, "started": started, "jobs": [entry],
+                      "elapsed": entry["elapsed"], "succeeded": int(entry["status"] == "ok"),
+                      "failed": int(entry["status"] != "ok")}
+            try:
+                write_report(args.report, report)
+            except OSError as e:
+                print(f"⚠️ Rapport non enregistré : {e}", file=sys.stderr)
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+    settle = WATCH_SETTLE_SECONDS if args.watch_settle is None else args.watch_settle
+    interval = WATCH_POLL_INTERVAL if args.watch_interval is None else args.watch_interval
+    try:
+        # État relevé avant la première mise à jour : les archives déposées pendant celle-ci
+        # (parfois plusieurs minutes) restent à traiter
+        initial = snapshot_archives(job["archive_folder"])
+        update()
+        watch_folder(job["archive_folder"], lambda changed, removed: update(), settle=settle,
+                     poll_interval=interval, use_inotify=not args.watch_polling,
+                     log=lambda message: print(message, flush=True), initial=initial)
+    except KeyboardInterrupt:
+        print("⏹️ Surveillance arrêtée", flush=True)
+    return 0
+
+
+def write_report(path: str, report: dict) -> None:
+    """Écrit le rapport JSON (écriture atomique)."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="assembleur_dxf_dwg.py --cli",
+        description="Assemble des DXF (archives .tar.bz2 et dossiers) sans interface graphique.",
+    )
+    # Les options non fournies valent None : elles ne remplacent pas celles du fichier de tâches
+    parser.add_argument("--cli", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--archive-folder", help="Dossier contenant les archives .tar.bz2")
+    parser.add_argument("--dxf-folders", help="Dossiers DXF séparés par des virgules")
+    parser.add_argument("--output", help="Dossier de sortie")
+    parser.add_argument("--jobs", metavar="FICHIER", help="Fichier de tâches JSON (plusieurs assemblages)")
+    parser.add_argument("--report", metavar="FICHIER", help="Rapport JSON (durées par étape et compteurs)")
+    parser.add_argument("--metrics", metavar="FICHIER",
+                        help="Mesures détaillées par étape et par source (.json ou .csv)")
+    parser.add_argument("--profile-stage", choices=STAGES, help="Étape à profiler")
+    parser.add_argument("--profiler", choices=PROFILERS, help="Profileur (cprofile par défaut)")
+    parser.add_argument("--profile-output", metavar="FICHIER",
+                        help="Fichier du profil (défaut : profil_<étape>.prof dans le dossier de sortie)")
+    parser.add_argument("--cleanup", action="store_true", default=None, help="Nettoyer les DXF avant fusion")
+    parser.add_argument("--convert-dwg", action="store_true", default=None,
+                        help="Convertir en DWG (AutoCAD, ou ODA File Converter avec --dwg-converter oda)")
+    parser.add_argument("--dwg-converter", choices=DWG_CONVERTERS,
+                        help="Convertisseur DWG : autocad (défaut, ouvre le résultat) ou oda (sans AutoCAD)")
+    parser.add_argument("--oda-converter", metavar="EXE",
+                        help="Chemin d'ODA File Converter (défaut : variable ODA_FILE_CONVERTER, puis recherche)")
+    parser.add_argument("--dwg-workers", type=int, metavar="N",
+                        help="Processus ODA File Converter simultanés (défaut : automatique)")
+    parser.add_argument("--open-qgis", action="store_true", default=None, help="Ouvrir le résultat dans QGIS")
+    parser.add_argument("--merge-workers", type=int, help="Nombre de processus de fusion (1 = séquentiel)")
+    parser.add_argument("--multi-pass", dest="single_parse", action="store_false", default=None,
+                        help="Validation préalable de tous les DXF avant fusion (désactive la lecture unique)")
+    parser.add_argument("--strict-validation", action="store_true", default=None,
+                        help="Validation préalable par chargement complet (avec --multi-pass)")
+    parser.add_argument("--approx-extents", action="store_true", default=None,
+                        help="Emprises approximatives des sources (sommets et points d'insertion)")
+    parser.add_argument("--spatial-index", action="store_true", default=None,
+                        help="Enregistrer l'index spatial de l'assemblage (extraction de zones)")
+    parser.add_argument("--shard-by", choices=SHARD_MODES,
+                        help="Découper la sortie en plusieurs DXF : par archive, par dalle ou par budget d'entités")
+    parser.add_argument("--shard-tile-size", type=float, metavar="COTE",
+                        help=f"Côté d'une dalle avec --shard-by tile (défaut : {SHARD_TILE_SIZE:g})")
+    parser.add_argument("--shard-max-entities", type=int, metavar="N",
+                        help="Nombre maximal d'entités par DXF découpé (défaut : 500000 avec --shard-by budget)")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS,
+                        help="Format du DXF assemblé : ascii (défaut), binary, gzip (.dxf.gz) ou zip")
+    parser.add_argument("--streaming", action="store_true", default=None,
+                        help="Écrire les entités de chaque source dès leur import (mémoire bornée par la plus grande source)")
+    parser.add_argument("--simplify", dest="simplify_tolerance", type=float, metavar="TOLERANCE",
+                        help="Simplifier les polylignes de l'assemblage (écart maximal, unités du dessin)")
+    parser.add_argument("--precision", dest="coordinate_precision", type=int, metavar="DECIMALES",
+                        help="Arrondir les coordonnées de l'assemblage à ce nombre de décimales")
+    parser.add_argument("--geopackage", action="store_true", default=None,
+                        help="Exporter aussi l'assemblage en GeoPackage (assemblage.gpkg, ouverture rapide dans QGIS)")
+    parser.add_argument("--geopackage-srs", type=int, metavar="EPSG",
+                        help=f"Code EPSG des coordonnées du GeoPackage (défaut : {GEOPACKAGE_SRS_ID}, 0 : non défini)")
+    parser.add_argument("--no-dedup", dest="dedup_blocks", action="store_false", default=None,
+                        help="Importer chaque définition de bloc telle quelle (sans réutiliser les blocs identiques)")
+    parser.add_argument("--in-memory", action="store_true", default=None,
+                        help="Fusion sans extraction sur disque")
+    parser.add_argument("--cache", dest="cache_dir", nargs="?", const=default_cache_dir(), metavar="DOSSIER",
+                        help="Cache des sources (dossier par défaut si non précisé)")
+    parser.add_argument("--incremental", action="store_true", default=None,
+                        help="Mise à jour incrémentale de assemblage.dxf")
+    parser.add_argument("--quiet", action="store_true", help="N'afficher que les erreurs et le bilan")
+
+    watch = parser.add_argument_group("surveillance d'un dossier de dépôt")
+    watch.add_argument("--watch", action="store_true",
+                       help="Rester actif et mettre l'assemblage à jour à chaque archive nouvelle ou modifiée")
+    watch.add_argument("--watch-settle", type=float, metavar="SECONDES",
+                       help=f"Délai sans modification du dossier avant traitement (défaut : {WATCH_SETTLE_SECONDS:g})")
+    watch.add_argument("--watch-interval", type=float, metavar="SECONDES",
+                       help=f"Intervalle de scrutation du dossier (défaut : {WATCH_POLL_INTERVAL:g})")
+    watch.add_argument("--watch-polling", action="store_true",
+                       help="Scrutation périodique même si inotify est disponible (partages réseau)")
+
+    region = parser.add_argument_group("extraction de zone (assemblage déjà indexé)")
+    region.add_argument("--region", metavar="XMIN,YMIN,XMAX,YMAX", help="Fenêtre à extraire")
+    region.add_argument("--region-sources", metavar="MOTIFS",
+                        help="Sources à extraire (motifs archive/membre séparés par des virgules)")
+    region.add_argument("--region-from", metavar="FICHIER",
+                        help="Assemblage indexé (défaut : assemblage.dxf du dossier --output)")
+    region.add_argument("--region-output", metavar="FICHIER", help="DXF de zone à écrire")
+    return parser
+
+
+def run_region_query(args, parser: argparse.ArgumentParser) -> int:
+    """Extrait une zone d'un assemblage indexé (mode --region / --region-sources).
+
+    Returns:
+        Code de sortie : 0 si la zone a été écrite, 1 sinon
+    """
+    window = None
+    if args.region:
+        try:
+            window = [float(v) for v in args.region.split(",")]
+        except ValueError:
+            window = []
+        if len(window) != 4:
+            parser.error("--region attend XMIN,YMIN,XMAX,YMAX")
+    sources = [p.strip() for p in (args.region_sources or "").split(",") if p.strip()]
+    assembly = args.region_from or (os.path.join(args.output, "assemblage.dxf") if args.output else None)
+    if not assembly:
+        parser.error("--region-from (ou --output) est requis pour extraire une zone")
+    if not args.region_output:
+        parser.error("--region-output est requis pour extraire une zone")
+
+    start = time.perf_counter()
+    try:
+        count, zone = extract_region(assembly, args.region_output, window, sources)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    print(f"✅ {count} entité(s) dans X:[{zone.xmin:.2f} à {zone.xmax:.2f}] Y:[{zone.ymin:.2f} à {zone.ymax:.2f}] "
+          f"({time.perf_counter() - start:.2f} s) → {args.region_output}", flush=True)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Point d'entrée du mode ligne de commande.
+
+    Returns:
+        Code de sortie : 0 si toutes les tâches ont réussi, 1 sinon
+    """
+    multiprocessing.freeze_support()
+    # Journal avec émojis : ne pas échouer sur une console ou une redirection non UTF-8
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.reconfigure(errors="replace")
+        except AttributeError:
+            pass
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Le journal du pipeline est déjà affiché : la journalisation ne garde que les anomalies
+    logging.getLogger().setLevel(logging.ERROR if args.quiet else logging.WARNING)
+
+    if args.region or args.region_sources:
+        return run_region_query(args, parser)
+
+    overrides = {key: getattr(args, key) for key in JOB_DEFAULTS
+                 if getattr(args, key, None) is not None}
+    if "dxf_folders" in overrides:
+        overrides["dxf_folders"] = _split_folders(overrides["dxf_folders"])
+
+    if args.jobs:
+        try:
+            file_defaults, entries = load_job_file(args.jobs)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        # defaults du fichier < options de la ligne de commande < options propres à chaque tâche
+        jobs = [{**JOB_DEFAULTS, **file_defaults, **overrides, **entry} for entry in entries]
+    else:
+        jobs = [{**JOB_DEFAULTS, **overrides}]
+
+    for idx, job in enumerate(jobs, start=1):
+        if not job["output"]:
+            parser.error(f"tâche {idx} : --output (ou \"output\") est requis")
+        if not job["archive_folder"] and not job["dxf_folders"]:
+            parser.error(f"tâche {idx} : --archive-folder ou --dxf-folders est requis")
+        try:
+            check_simplify_options(job["simplify_tolerance"], job["coordinate_precision"])
+        except ValueError as e:
+            parser.error(f"tâche {idx} : {e}")
+
+    if args.watch:
+        if len(jobs) != 1 or not jobs[0]["archive_folder"]:
+            parser.error("--watch surveille le dossier d'archives d'une seule tâche (--archive-folder)")
+        return run_watch(jobs[0], args)
+
+    report = {
+        "app_version": APP_VERSION,
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "jobs": [],
+    }
+    metrics_rows = [] if args.metrics else None
+    start = time.perf_counter()
+    for idx, job in enumerate(jobs, start=1):
+        if len(jobs) > 1:
+            print(f"===== Tâche {idx}/{len(jobs)} : {job['name'] or job['archive_folder'] or job['output']} =====",
+                  flush=True)
+        entry = run_job(job, args.quiet, metrics_rows)
+        report["jobs"].append(entry)
+        if entry["status"] == "cancelled":
+            # Ctrl+C : les tâches suivantes ne sont pas lancées
+            print("⏸️ Traitement interrompu", file=sys.stderr, flush=True)
+            break
+    report["elapsed"] = round(time.perf_counter() - start, 3)
+    report["succeeded"] = sum(1 for entry in report["jobs"] if entry["status"] == "ok")
+    report["failed"] = len(jobs) - report["succeeded"]
+
+    for entry in report["jobs"]:
+        print(f"{'✅' if entry['status'] == 'ok' else '❌'} {entry['name']} : {entry['status']} "
+              f"({entry['elapsed']:.1f} s, {entry['counts'].get('entities', 0)} entités) → {entry['output']}",
+              flush=True)
+    if args.report:
+        try:
+            write_report(args.report, report)
+        except OSError as e:
+            print(f"⚠️ Rapport non enregistré : {e}", file=sys.stderr)
+    if args.metrics:
+        try:
+            if args.metrics.lower().endswith(".csv"):
+                write_metrics_csv(args.metrics, metrics_rows, extra_fields=("job",))
+            else:
+                write_report(args.metrics, {
+                    "totals": {entry["name"]: entry["metrics"] for entry in report["jobs"]},
+                    "records": metrics_rows,
+                })
+        except OSError as e:
+            print(f"⚠️ Mesures non enregistrées : {e}", file=sys.stderr)
+
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
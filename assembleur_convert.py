@@ -0,0 +1,600 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : conversion DXF → DWG et ouverture dans AutoCAD
+- Interface commune des convertisseurs (DwgConverter) : un fichier, ou une file de fichiers ;
+  create_dwg_converter choisit le convertisseur (voir DWG_CONVERTERS)
+- AutoCAD par COM (AutocadConverter) : une session AutoCAD gardée ouverte d'une tâche à
+  l'autre et pilotée par un seul thread, qui traite les conversions dans l'ordre de la file
+- Fin de conversion détectée sans délai fixe : appels COM synchrones (Open, SaveAs,
+  ZoomExtents), attente de l'état « au repos » d'AutoCAD, puis contrôle du DWG écrit
+  (taille stable, fichier lisible, signature AC10xx)
+- ODA File Converter en ligne de commande (OdaConverter), sans AutoCAD : un appel du
+  convertisseur par lot de fichiers, plusieurs lots en parallèle, chacun avec un délai maximal
+
+La connexion COM passe par une fonction `dispatch` remplaçable : un objet application factice
+(Documents.Open, SaveAs, ZoomExtents, GetAcadState) permet d'exercer la file hors Windows.
+De même, tout exécutable acceptant les arguments d'ODA File Converter peut le remplacer.
+"""
+
+import glob
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Convertisseurs disponibles
+DWG_CONVERTERS = ("autocad", "oda")
+
+# Identifiant COM d'AutoCAD
+AUTOCAD_PROGID = "AutoCAD.Application"
+
+# Format d'enregistrement AutoCAD (AcSaveAsType) : DWG 2018
+AC_SAVEAS_DWG_2018 = 64
+
+# Délai maximal d'une conversion ou d'une ouverture (secondes)
+CONVERT_TIMEOUT = 300.0
+
+# Contrôle du DWG écrit : relevés identiques consécutifs, intervalle initial et maximal (secondes)
+STABLE_CHECKS = 2
+POLL_INTERVAL = 0.05
+POLL_INTERVAL_MAX = 0.5
+
+# Attente d'une opération de la file par l'appelant, en multiples du délai : chaque étape
+# (ouverture, repos, enregistrement, écriture du DWG) a déjà son propre délai dans la session
+QUEUE_WAIT_STEPS = 4
+
+# Signature des fichiers DWG (AC1015 à AC1032…)
+DWG_SIGNATURE = b"AC10"
+
+# ODA File Converter : version DWG écrite, variable d'environnement désignant l'exécutable
+ODA_OUTPUT_VERSION = "ACAD2018"
+ODA_ENV_VAR = "ODA_FILE_CONVERTER"
+
+# Erreurs COM « application occupée » (RPC_E_CALL_REJECTED, RPC_E_SERVERCALL_RETRYLATER) : appel retenté
+_COM_BUSY = (-2147418111, -2147417846)
+
+
+def dwg_path_for(dxf_path: str) -> str:
+    """Chemin du DWG converti à côté d'un DXF (assemblage.dxf → assemblage.dwg)."""
+    return str(Path(dxf_path).with_suffix(".dwg"))
+
+
+def wait_file_stable(path: str, timeout: float = CONVERT_TIMEOUT) -> int:
+    """Attend qu'un fichier soit complet : présent, non vide, lisible et de taille inchangée.
+
+    Args:
+        path: Chemin du fichier attendu
+        timeout: Délai maximal (secondes)
+
+    Returns:
+        Taille du fichier (octets)
+
+    Raises:
+        TimeoutError: Fichier absent ou encore en cours d'écriture après le délai
+    """
+    deadline = time.monotonic() + timeout
+    interval = POLL_INTERVAL
+    last = None
+    stable = 0
+    while True:
+        try:
+            stat = os.stat(path)
+            # Un fichier encore verrouillé par l'application qui l'écrit ne s'ouvre pas (Windows)
+            with open(path, "rb"):
+                pass
+            current = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            current = None
+        if current is not None and current[0] > 0 and current == last:
+            stable += 1
+            if stable >= STABLE_CHECKS:
+                return current[0]
+        else:
+            stable = 1 if current is not None and current[0] > 0 else 0
+        last = current
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Fichier non écrit ou incomplet après {timeout:.0f} s : {path}")
+        time.sleep(interval)
+        interval = min(interval * 2, POLL_INTERVAL_MAX)
+
+
+def check_dwg_file(path: str) -> int:
+    """Vérifie qu'un fichier est un DWG (signature AC10xx) et retourne sa taille.
+
+    Raises:
+        ValueError: Fichier vide ou sans signature DWG
+    """
+    with open(path, "rb") as f:
+        signature = f.read(6)
+    if not signature.startswith(DWG_SIGNATURE):
+        raise ValueError(f"Fichier DWG invalide (signature {signature!r}) : {path}")
+    return os.path.getsize(path)
+
+
+class DwgConverter:
+    """Interface d'un convertisseur DXF → DWG.
+
+    Les convertisseurs s'utilisent comme gestionnaires de contexte ; close() libère
+    leurs ressources (processus, session).
+    """
+
+    #: Nom du convertisseur (journal, rapport)
+    name = "dwg"
+
+    def convert(self, dxf_path: str, dwg_path: Optional[str] = None) -> str:
+        """Convertit un DXF en DWG.
+
+        Args:
+            dxf_path: DXF à convertir
+            dwg_path: DWG à écrire (défaut : à côté du DXF, voir dwg_path_for)
+
+        Returns:
+            Chemin du DWG écrit et contrôlé
+        """
+        raise NotImplementedError
+
+    def convert_many(self, dxf_paths: List[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """Convertit plusieurs DXF, chacun en DWG à côté de lui.
+
+        Returns:
+            (DXF, DWG écrit ou None, message d'erreur ou None) pour chaque fichier, dans l'ordre
+        """
+        results = []
+        for dxf_path in dxf_paths:
+            try:
+                results.append((dxf_path, self.convert(dxf_path), None))
+            except Exception as e:
+                logger.warning(f"Conversion DWG {dxf_path}: {e}")
+                results.append((dxf_path, None, str(e)))
+        return results
+
+    def close(self) -> None:
+        """Libère les ressources du convertisseur."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _com_busy(error: Exception) -> bool:
+    code = getattr(error, "hresult", None)
+    if code is None and error.args:
+        code = error.args[0]
+    return code in _COM_BUSY
+
+
+def _default_dispatch(new_instance: bool):
+    """Application AutoCAD par COM (ImportError si pywin32 est absent)."""
+    import win32com.client
+    if new_instance:
+        # DispatchEx force une nouvelle instance AutoCAD
+        return win32com.client.DispatchEx(AUTOCAD_PROGID)
+    return win32com.client.Dispatch(AUTOCAD_PROGID)
+
+
+class _AutocadSession:
+    """Application AutoCAD connectée, utilisée uniquement depuis le thread du convertisseur."""
+
+    def __init__(self, dispatch: Callable[[bool], object], new_instance: bool, timeout: float):
+        self._dispatch = dispatch
+        self._new_instance = new_instance
+        self.timeout = timeout
+        self._app = None
+
+    @property
+    def app(self):
+        """Application connectée ; reconnectée si la session précédente a été fermée."""
+        if self._app is not None:
+            try:
+                self.call(lambda: self._app.Version)
+            except Exception as e:
+                logger.info(f"Session AutoCAD perdue, reconnexion : {e}")
+                self._app = None
+        if self._app is None:
+            try:
+                self._app = self._dispatch(self._new_instance)
+            except ImportError:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Impossible de se connecter à AutoCAD. Est-il installé?\nErreur: {e}")
+        return self._app
+
+    def call(self, fn: Callable[[], object]):
+        """Appel COM, retenté tant qu'AutoCAD refuse les appels (occupé)."""
+        deadline = time.monotonic() + self.timeout
+        interval = POLL_INTERVAL
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if not _com_busy(e) or time.monotonic() >= deadline:
+                    raise
+            time.sleep(interval)
+            interval = min(interval * 2, POLL_INTERVAL_MAX)
+
+    def wait_idle(self) -> None:
+        """Attend qu'AutoCAD soit au repos (commande ou chargement terminé)."""
+        app = self.app
+        deadline = time.monotonic() + self.timeout
+        interval = POLL_INTERVAL
+        while not self.call(lambda: app.GetAcadState().IsQuiescent):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"AutoCAD occupé depuis plus de {self.timeout:.0f} s")
+            time.sleep(interval)
+            interval = min(interval * 2, POLL_INTERVAL_MAX)
+
+    def version(self) -> str:
+        app = self.app
+        return str(self.call(lambda: app.Version))
+
+    def _open_documents(self, *paths: str) -> list:
+        """Documents déjà ouverts sur l'un des chemins donnés."""
+        wanted = {os.path.normcase(os.path.abspath(p)) for p in paths}
+        documents = self.call(lambda: self.app.Documents)
+        found = []
+        for index in range(self.call(lambda: documents.Count)):
+            doc = self.call(lambda: documents.Item(index))
+            full_name = self.call(lambda: doc.FullName)
+            if full_name and os.path.normcase(os.path.abspath(full_name)) in wanted:
+                found.append(doc)
+        return found
+
+    def open(self, path: str):
+        app = self.app
+        doc = self.call(lambda: app.Documents.Open(path))
+        self.wait_idle()
+        return doc
+
+    def convert(self, dxf_path: str, dwg_path: str) -> str:
+        # Documents d'une exécution précédente encore ouverts : ils verrouilleraient le DWG
+        for doc in self._open_documents(dxf_path, dwg_path):
+            self.call(lambda: doc.Close(False))
+        try:
+            os.remove(dwg_path)
+        except FileNotFoundError:
+            pass
+        doc = self.open(dxf_path)
+        try:
+            self.call(lambda: doc.SaveAs(dwg_path, AC_SAVEAS_DWG_2018))
+            self.wait_idle()
+        finally:
+            try:
+                self.call(lambda: doc.Close(False))
+            except Exception as e:
+                logger.warning(f"Erreur fermeture {dxf_path}: {e}")
+        wait_file_stable(dwg_path, self.timeout)
+        check_dwg_file(dwg_path)
+        return dwg_path
+
+    def show(self, path: str, zoom: bool = True) -> None:
+        app = self.app
+        opened = self._open_documents(path)
+        if opened:
+            doc = opened[0]
+            self.call(doc.Activate)
+        else:
+            self.open(path)
+        self.call(lambda: setattr(app, "Visible", True))
+        if zoom:
+            self.call(app.ZoomExtents)
+            self.wait_idle()
+
+
+class AutocadConverter(DwgConverter):
+    """Conversion DXF → DWG et ouverture dans une session AutoCAD gardée ouverte.
+
+    Toutes les opérations passent par une file traitée par un thread unique, propriétaire
+    de la connexion COM : la session reste chaude d'une conversion et d'une tâche à l'autre.
+
+    Args:
+        second_instance: Session dans une nouvelle instance AutoCAD (DispatchEx)
+        dispatch: Fonction (nouvelle_instance) -> application AutoCAD (défaut : win32com)
+        timeout: Délai maximal d'une opération (secondes)
+    """
+
+    name = "autocad"
+
+    def __init__(self, second_instance: bool = False,
+                 dispatch: Optional[Callable[[bool], object]] = None, timeout: float = CONVERT_TIMEOUT):
+        self.second_instance = bool(second_instance)
+        self.timeout = timeout
+        self._session = _AutocadSession(dispatch or _default_dispatch, self.second_instance, timeout)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _submit(self, action: str, *args) -> Future:
+        future = Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="autocad-session", daemon=True)
+                self._thread.start()
+            self._queue.put((future, action, args))
+        return future
+
+    def _run(self) -> None:
+        try:
+            import pythoncom
+        except ImportError:
+            pythoncom = None
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                future, action, args = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(getattr(self._session, action)(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            # Les objets COM sont libérés dans le thread qui les a créés
+            self._session._app = None
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    def _wait(self, future: Future, timeout: Optional[float] = None):
+        return future.result(self.timeout * QUEUE_WAIT_STEPS if timeout is None else timeout)
+
+    def version(self, timeout: Optional[float] = None) -> str:
+        """Version d'AutoCAD (connecte la session si nécessaire)."""
+        return self._wait(self._submit("version"), timeout)
+
+    def convert(self, dxf_path: str, dwg_path: Optional[str] = None) -> str:
+        return self._wait(self._submit("convert", dxf_path, dwg_path or dwg_path_for(dxf_path)))
+
+    def convert_many(self, dxf_paths: List[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        # Toute la file est soumise d'un coup : la session enchaîne les conversions sans attente
+        futures = [(path, self._submit("convert", path, dwg_path_for(path))) for path in dxf_paths]
+        results = []
+        for path, future in futures:
+            try:
+                results.append((path, self._wait(future), None))
+            except Exception as e:
+                logger.warning(f"Conversion DWG {path}: {e}")
+                results.append((path, None, str(e)))
+        return results
+
+    def show(self, path: str, zoom: bool = True) -> None:
+        """Ouvre un dessin (ou active le document déjà ouvert), affiche AutoCAD et applique un zoom étendu."""
+        self._wait(self._submit("show", path, zoom))
+
+    def close(self) -> None:
+        """Arrête le thread de la session (AutoCAD reste ouvert pour l'utilisateur)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+                self._thread.join(self.timeout)
+            self._thread = None
+
+
+# Sessions AutoCAD partagées par toutes les tâches du processus (instance courante, seconde instance)
+_shared_autocad: Dict[bool, AutocadConverter] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_autocad_converter(second_instance: bool = False) -> AutocadConverter:
+    """Convertisseur AutoCAD partagé : la même session sert à toutes les tâches du processus."""
+    with _shared_lock:
+        converter = _shared_autocad.get(bool(second_instance))
+        if converter is None:
+            converter = _shared_autocad[bool(second_instance)] = AutocadConverter(second_instance)
+        return converter
+
+
+def find_oda_converter() -> Optional[str]:
+    """Recherche ODA File Converter (variable ODA_FILE_CONVERTER, installations Windows usuelles, puis PATH).
+
+    Returns:
+        Chemin de l'exécutable, ou None s'il est introuvable
+    """
+    configured = os.environ.get(ODA_ENV_VAR)
+    if configured:
+        return configured if os.path.isfile(configured) else shutil.which(configured)
+    candidates = sorted(glob.glob(r"C:\Program Files\ODA\ODAFileConverter*\ODAFileConverter.exe"), reverse=True)
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which("ODAFileConverter") or shutil.which("ODAFileConverter.exe")
+
+
+class OdaConverter(DwgConverter):
+    """Conversion DXF → DWG par ODA File Converter en ligne de commande.
+
+    ODA File Converter convertit un dossier entier par appel : les DXF à convertir sont
+    répartis en lots (un par processus, équilibrés par taille), liés dans un dossier de
+    travail, convertis par des processus parallèles, puis chaque DWG contrôlé est placé
+    à côté de son DXF.
+
+    Args:
+        executable: Chemin d'ODA File Converter (défaut : find_oda_converter)
+        workers: Nombre de processus de conversion simultanés (défaut : automatique)
+        timeout: Délai maximal d'un processus (secondes) ; au-delà, il est arrêté et son lot en échec
+        version: Version DWG écrite (ACAD2018, ACAD2013…)
+        audit: Demander au convertisseur de vérifier et corriger chaque dessin
+
+    Raises:
+        FileNotFoundError: ODA File Converter introuvable
+    """
+
+    name = "oda"
+
+    def __init__(self, executable: Optional[str] = None, workers: Optional[int] = None,
+                 timeout: float = CONVERT_TIMEOUT, version: str = ODA_OUTPUT_VERSION, audit: bool = True):
+        if executable:
+            # Nom seul : recherché dans le PATH
+            self.executable = shutil.which(executable) or (executable if os.path.isfile(executable) else None)
+        else:
+            self.executable = find_oda_converter()
+        if not self.executable:
+            raise FileNotFoundError("ODA File Converter introuvable (installez-le ou renseignez "
+                                    f"{ODA_ENV_VAR} : https://www.opendesign.com/guestfiles/oda_file_converter)")
+        self.workers = max(1, int(workers or min(4, os.cpu_count() or 1)))
+        self.timeout = timeout
+        self.version = version
+        self.audit = bool(audit)
+
+    def convert(self, dxf_path: str, dwg_path: Optional[str] = None) -> str:
+        dxf_path, converted, error = self._convert_batch([(dxf_path, dwg_path or dwg_path_for(dxf_path))])[0]
+        if converted is None:
+            raise RuntimeError(error)
+        return converted
+
+    def convert_many(self, dxf_paths: List[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        if not dxf_paths:
+            return []
+        batches = [[(path, dwg_path_for(path)) for path in batch]
+                   for batch in _balanced_batches(dxf_paths, min(self.workers, len(dxf_paths)))]
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+            for batch_results in executor.map(self._convert_batch, batches):
+                for result in batch_results:
+                    results[result[0]] = result
+        return [results[path] for path in dxf_paths]
+
+    def _command(self, input_dir: str, output_dir: str) -> List[str]:
+        # Arguments : dossier source, dossier cible, version, type, récursif, audit, filtre
+        return [self.executable, input_dir, output_dir, self.version, "DWG", "0",
+                "1" if self.audit else "0", "*.dxf"]
+
+    def _convert_batch(self, targets: List[Tuple[str, str]]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """Convertit un lot de DXF en un appel du convertisseur.
+
+        Args:
+            targets: Liste (chemin du DXF, chemin du DWG à écrire) ; seuls ces DWG sont remplacés
+        """
+        work_root = os.path.dirname(os.path.abspath(targets[0][0]))
+        try:
+            work_dir = tempfile.mkdtemp(prefix=".oda_", dir=work_root)
+        except OSError:
+            work_dir = tempfile.mkdtemp(prefix="oda_")
+        try:
+            input_dir = os.path.join(work_dir, "dxf")
+            output_dir = os.path.join(work_dir, "dwg")
+            os.makedirs(input_dir)
+            os.makedirs(output_dir)
+            # Noms uniques dans le lot (deux DXF homonymes de dossiers différents)
+            staged = []
+            for index, (path, dwg_path) in enumerate(targets):
+                # Un DWG d'une exécution précédente ne doit pas passer pour le résultat
+                try:
+                    os.remove(dwg_path)
+                except FileNotFoundError:
+                    pass
+                name = f"{index:05d}_{os.path.basename(path)}"
+                if not name.lower().endswith(".dxf"):
+                    name += ".dxf"
+                _link_or_copy(path, os.path.join(input_dir, name))
+                staged.append(name)
+
+            error = self._run(input_dir, output_dir)
+            results = []
+            for (path, dwg_path), name in zip(targets, staged):
+                converted = os.path.join(output_dir, os.path.splitext(name)[0] + ".dwg")
+                try:
+                    if error is not None and not os.path.exists(converted):
+                        raise RuntimeError(error)
+                    if not os.path.exists(converted):
+                        raise RuntimeError(_oda_error(converted) or "DWG non écrit par le convertisseur")
+                    check_dwg_file(converted)
+                    os.replace(converted, dwg_path)
+                    results.append((path, dwg_path, None))
+                except (OSError, RuntimeError, ValueError) as e:
+                    logger.warning(f"Conversion DWG {path}: {e}")
+                    results.append((path, None, str(e)))
+            return results
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run(self, input_dir: str, output_dir: str) -> Optional[str]:
+        """Exécute le convertisseur ; retourne un message d'erreur, ou None s'il s'est terminé normalement."""
+        env = dict(os.environ)
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        else:
+            # Interface Qt du convertisseur sans affichage (serveur)
+            env.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            completed = subprocess.run(self._command(input_dir, output_dir), stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, timeout=self.timeout, env=env, **kwargs)
+        except subprocess.TimeoutExpired:
+            return f"ODA File Converter arrêté après {self.timeout:.0f} s"
+        except OSError as e:
+            return f"Impossible de lancer ODA File Converter : {e}"
+        if completed.returncode != 0:
+            output = completed.stdout.decode("utf-8", errors="replace").strip()
+            return f"ODA File Converter a échoué (code {completed.returncode})" + (f" : {output[-500:]}" if output else "")
+        return None
+
+
+def _balanced_batches(paths: List[str], count: int) -> List[List[str]]:
+    """Répartit des fichiers en lots de tailles cumulées proches (ordre d'origine conservé dans chaque lot)."""
+    loads = [0] * count
+    batches = [[] for _ in range(count)]
+    sizes = {}
+    for path in paths:
+        try:
+            sizes[path] = os.path.getsize(path)
+        except OSError:
+            sizes[path] = 0
+    for path in sorted(paths, key=sizes.get, reverse=True):
+        target = loads.index(min(loads))
+        batches[target].append(path)
+        loads[target] += sizes[path]
+    order = {path: index for index, path in enumerate(paths)}
+    return [sorted(batch, key=order.get) for batch in batches if batch]
+
+
+def _link_or_copy(source: str, target: str) -> None:
+    """Lien physique vers un fichier (copie si le système de fichiers ne le permet pas)."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _oda_error(dwg_path: str) -> Optional[str]:
+    """Message du fichier d'erreur écrit par ODA File Converter pour un dessin (.dwg.err), ou None."""
+    try:
+        with open(dwg_path + ".err", "r", encoding="utf-8", errors="replace") as f:
+            return f.read().strip()[-500:] or None
+    except OSError:
+        return None
+
+
+def create_dwg_converter(backend: str = "autocad", second_instance: bool = False,
+                         oda_executable: Optional[str] = None, workers: Optional[int] = None) -> DwgConverter:
+    """Convertisseur DXF → DWG choisi (voir DWG_CONVERTERS).
+
+    Args:
+        backend: « autocad » (session partagée) ou « oda » (ODA File Converter)
+        second_instance: Seconde instance AutoCAD (autocad)
+        oda_executable: Chemin d'ODA File Converter (oda ; défaut : find_oda_converter)
+        workers: Processus de conversion simultanés (oda)
+
+    Raises:
+        ValueError: Convertisseur inconnu
+        FileNotFoundError: ODA File Converter introuvable
+    """
+    if backend == "autocad":
+        return shared_autocad_converter(second_instance)
+    if backend == "oda":
+        return OdaConverter(oda_executable, workers)
+    raise ValueError(f"Convertisseur DWG inconnu : {backend} (convertisseurs : {', '.join(DWG_CONVERTERS)})")
@@ -0,0 +1,2584 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : moteur de traitement, sans dépendance à Qt
+- Utilitaires, validation, cache des sources et manifeste d'assemblage
+- Moteur d'assemblage complet (extraction, validation, fusion, ouverture) utilisé par
+  l'interface graphique et par le mode ligne de commande : événements (journal,
+  progression, fin), annulation, et API asyncio pour exécuter plusieurs tâches à la fois
+"""
+
+import asyncio
+import functools
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import subprocess
+import traceback
+import time
+import shutil
+import logging
+import sqlite3
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import ezdxf
+from ezdxf.addons import Importer
+from ezdxf import recover
+from ezdxf.document import Drawing
+from ezdxf.entities import DXFEntity
+from ezdxf.filemanagement import dxf_stream_info
+from ezdxf.lldxf.tagger import binary_tags_loader
+from ezdxf.lldxf.validator import is_dxf_stream
+from ezdxf.tools.codepage import toencoding
+
+from assembleur_convert import DWG_CONVERTERS, create_dwg_converter, dwg_path_for, shared_autocad_converter
+from assembleur_dedup import ImportDeduplicator
+from assembleur_extents import Extents, compute_extents
+from assembleur_geopackage import GEOPACKAGE_SRS_ID, GeoPackageWriter, geopackage_path, remove_geopackage
+from assembleur_index import build_spatial_index, remove_spatial_index
+from assembleur_metrics import MetricsRecorder, StageMetrics, measure
+from assembleur_output import OUTPUT_FORMATS, output_format_of, output_path, output_stem, write_dxf, zip_member_name
+from assembleur_purge import PURGE_VERSION, purge_unused
+from assembleur_shards import SHARD_TILE_SIZE, ShardWriter, list_shards, remove_shards, shards_index_path
+from assembleur_simplify import check_simplify_options, simplify_document
+from assembleur_stream import EntitySpool
+
+
+# Version de l'outil (fait partie de la clé du cache des sources)
+APP_VERSION = "1.0.2"
+
+
+# ---------- Configuration logging ----------
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+
+# ---------- Utilitaires ----------
+def safe_mkdir(path: str) -> str:
+    """Crée un répertoire de manière sécurisée.
+    
+    Args:
+        path: Chemin du répertoire à créer
+        
+    Returns:
+        Le chemin créé
+        
+    Raises:
+        OSError: Si la création échoue
+    """
+    try:
+        os.makedirs(path, exist_ok=True)
+        return path
+    except OSError as e:
+        logger.error(f"Impossible de créer le répertoire {path}: {e}")
+        raise
+
+
+def is_path_within_directory(base: str, target: str) -> bool:
+    """Sécurise l'extraction (évite traversals: '../../' ou chemins absolus)."""
+    base = os.path.abspath(base)
+    target = os.path.abspath(target)
+    return os.path.commonprefix([base, target]) == base
+
+
+def list_dxfs_recursive(directories: List[str]) -> List[str]:
+    """Parcours récursif des dossiers et collecte les .dxf (insensible à la casse).
+    
+    Args:
+        directories: Liste des dossiers à parcourir
+        
+    Returns:
+        Liste des chemins vers les fichiers DXF trouvés
+    """
+    paths = []
+    for d in directories:
+        if not d or not os.path.isdir(d):
+            continue
+        for root, _, files in os.walk(d):
+            for f in files:
+                if f.lower().endswith(".dxf"):
+                    paths.append(os.path.join(root, f))
+    return paths
+
+
+def list_tarbz2_files(directory: str) -> List[str]:
+    """Liste tous les fichiers .tar.bz2 dans un dossier (non récursif).
+    
+    Args:
+        directory: Chemin du dossier à analyser
+        
+    Returns:
+        Liste des chemins absolus vers les archives .tar.bz2
+    """
+    if not directory or not os.path.isdir(directory):
+        return []
+    archives = []
+    for f in os.listdir(directory):
+        if f.lower().endswith(".tar.bz2"):
+            archives.append(os.path.join(directory, f))
+    return archives
+
+
+@contextmanager
+def temp_directory(prefix: str = "dxf_temp_"):
+    """Context manager pour créer et nettoyer automatiquement un dossier temporaire.
+    
+    Args:
+        prefix: Préfixe pour le nom du dossier temporaire
+        
+    Yields:
+        Chemin du dossier temporaire créé
+    """
+    tmp_dir = tempfile.mkdtemp(prefix=prefix)
+    logger.info(f"Dossier temporaire créé : {tmp_dir}")
+    try:
+        yield tmp_dir
+    finally:
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            logger.info(f"Dossier temporaire supprimé : {tmp_dir}")
+        except Exception as e:
+            logger.warning(f"Impossible de supprimer {tmp_dir}: {e}")
+
+
+class DxfMemorySource:
+    """Membre DXF d'une archive conservé en mémoire (mode sans extraction sur disque).
+    
+    Attributes:
+        name: Nom affiché (archive/membre)
+        member: Chemin du membre dans l'archive
+        data: Contenu brut du membre
+    """
+
+    __slots__ = ("name", "member", "data")
+
+    def __init__(self, name: str, member: str, data: bytes):
+        self.name = name
+        self.member = member
+        self.data = data
+
+    def __str__(self) -> str:
+        return self.name
+
+    def release(self) -> None:
+        """Libère le contenu une fois le membre importé."""
+        self.data = b""
+
+
+# Source DXF : chemin d'un fichier sur disque ou membre d'archive en mémoire
+DxfSource = Union[str, DxfMemorySource]
+
+
+def source_label(source: DxfSource) -> str:
+    """Nom court d'une source DXF pour le journal."""
+    return os.path.basename(str(source))
+
+
+# En-tête des fichiers DXF binaires
+_BINARY_DXF_SENTINEL = b"AutoCAD Binary DXF\r\n\x1a\x00"
+
+
+def read_dxf_bytes(data: bytes, name: str = "<mémoire>") -> Drawing:
+    """Charge un document DXF (ASCII ou binaire) depuis des octets, comme ezdxf.readfile.
+    
+    Args:
+        data: Contenu du fichier DXF
+        name: Nom de la source (messages d'erreur)
+        
+    Returns:
+        Document DXF chargé
+        
+    Raises:
+        IOError: Si les données ne sont pas du DXF
+    """
+    if data.startswith(_BINARY_DXF_SENTINEL):
+        return Drawing.load(binary_tags_loader(data, errors="surrogateescape"))
+
+    # L'en-tête est en ASCII : un décodage permissif suffit pour la détection
+    probe = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="ignore")
+    if not is_dxf_stream(probe):
+        raise IOError(f"File '{name}' is not a DXF file.")
+    probe.seek(0)
+    info = dxf_stream_info(probe)
+
+    # Décodage en flux : pas de copie complète du texte en mémoire
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding=info.encoding, errors="surrogateescape")
+    return ezdxf.read(stream)
+
+
+def load_dxf_file(filepath: DxfSource) -> Tuple[Optional[Drawing], Optional[str]]:
+    """Charge un fichier DXF en mémoire après les contrôles de base.
+    
+    Le document retourné peut être réutilisé tel quel (nettoyage, import)
+    sans relire le fichier.
+    
+    Args:
+        filepath: Chemin vers le fichier DXF, ou membre d'archive en mémoire
+        
+    Returns:
+        Tuple (document ou None, message_erreur)
+    """
+    if isinstance(filepath, DxfMemorySource):
+        if not filepath.data:
+            return None, f"Fichier vide : {filepath}"
+        try:
+            return read_dxf_bytes(filepath.data, filepath.name), None
+        except Exception as e:
+            return None, f"Fichier DXF invalide: {e}"
+
+    if not os.path.isfile(filepath):
+        return None, f"Fichier introuvable : {filepath}"
+    
+    if os.path.getsize(filepath) == 0:
+        return None, f"Fichier vide : {filepath}"
+    
+    try:
+        return ezdxf.readfile(filepath), None
+    except Exception as e:
+        return None, f"Fichier DXF invalide: {e}"
+
+
+def validate_dxf_file(filepath: DxfSource) -> Tuple[bool, Optional[str]]:
+    """Valide qu'un fichier DXF est lisible.
+    
+    Args:
+        filepath: Chemin vers le fichier DXF, ou membre d'archive en mémoire
+        
+    Returns:
+        Tuple (est_valide, message_erreur)
+    """
+    doc, error_msg = load_dxf_file(filepath)
+    return doc is not None, error_msg
+
+
+# Sous-entités non comptées comme entités de l'espace objet
+_SUB_ENTITY_TYPES = (b"VERTEX", b"SEQEND", b"ATTRIB")
+
+
+@dataclass
+class DxfValidationResult:
+    """Résultat de la validation rapide d'une source DXF."""
+    source: str
+    valid: bool = False
+    reason: Optional[str] = None
+    version: Optional[str] = None
+    encoding: Optional[str] = None
+    entity_count: int = 0
+    binary: bool = False
+
+
+def _scan_dxf_stream(stream: BinaryIO, result: DxfValidationResult) -> None:
+    """Parcourt un flux DXF ASCII paire par paire (code de groupe / valeur) sans construire
+    la base d'entités : structure des sections, section ENTITIES et marqueur EOF.
+    Renseigne `result` (version, encodage, nombre d'entités, motif de rejet).
+    """
+    readline = stream.readline
+    line_no = 0
+    section = None
+    expect_section_name = False
+    header_var = None
+    codepage = None
+    sections = set()
+    while True:
+        code_line = readline()
+        value_line = readline()
+        line_no += 2
+        if not code_line:
+            result.reason = "Fin de fichier inattendue (marqueur EOF absent)"
+            return
+        try:
+            code = int(code_line)
+        except ValueError:
+            result.reason = f"Code de groupe invalide ligne {line_no - 1}: {code_line.strip()[:20]!r}"
+            return
+        if not value_line:
+            result.reason = f"Valeur manquante après le code de groupe ligne {line_no - 1}"
+            return
+        if not 0 <= code <= 1071:
+            result.reason = f"Code de groupe hors plage ligne {line_no - 1}: {code}"
+            return
+        value = value_line.strip()
+
+        if expect_section_name:
+            if code != 2:
+                result.reason = f"Nom de section manquant ligne {line_no - 1}"
+                return
+            section = value
+            expect_section_name = False
+        elif code == 0:
+            if value == b"SECTION":
+                if section is not None:
+                    result.reason = f"Section {section.decode('ascii', 'replace')} non fermée ligne {line_no - 1}"
+                    return
+                expect_section_name = True
+            elif value == b"ENDSEC":
+                if section is None:
+                    result.reason = f"ENDSEC sans SECTION ligne {line_no - 1}"
+                    return
+                sections.add(section)
+                section = None
+            elif value == b"EOF":
+                if section is not None:
+                    result.reason = f"Section {section.decode('ascii', 'replace')} non fermée avant EOF"
+                    return
+                break
+            elif section is None:
+                result.reason = f"Objet {value[:20]!r} hors section ligne {line_no}"
+                return
+            elif section == b"ENTITIES" and value not in _SUB_ENTITY_TYPES:
+                result.entity_count += 1
+        elif section == b"HEADER":
+            if code == 9:
+                header_var = value
+            elif header_var == b"$ACADVER" and code == 1:
+                result.version = value.decode("ascii", "replace")
+            elif header_var == b"$DWGCODEPAGE" and code == 3:
+                codepage = value.decode("ascii", "replace")
+
+    if b"ENTITIES" not in sections:
+        result.reason = "Section ENTITIES absente"
+        return
+    result.version = result.version or "AC1009"
+    # Depuis R2007 (AC1021), les fichiers DXF sont toujours en UTF-8
+    result.encoding = "utf-8" if result.version >= "AC1021" else toencoding(codepage or "ANSI_1252")
+    result.valid = True
+
+
+def fast_validate_dxf(source: DxfSource, strict: bool = False) -> DxfValidationResult:
+    """Valide rapidement une source DXF en lisant le flux, sans charger le document.
+    
+    Le contrôle porte sur la structure code de groupe / valeur, les sections, la
+    présence de la section ENTITIES et le marqueur EOF. En mode strict (et pour les
+    DXF binaires), la source est en plus entièrement chargée ; en cas d'échec,
+    ezdxf.recover indique si elle serait récupérable.
+    
+    Args:
+        source: Source DXF (fichier ou membre en mémoire)
+        strict: Compléter par un chargement complet
+        
+    Returns:
+        Résultat structuré (validité, motif, version, encodage, nombre d'entités)
+    """
+    result = DxfValidationResult(str(source))
+    try:
+        if isinstance(source, DxfMemorySource):
+            if not source.data:
+                result.reason = f"Fichier vide : {source}"
+                return result
+            stream = io.BytesIO(source.data)
+        else:
+            if not os.path.isfile(source):
+                result.reason = f"Fichier introuvable : {source}"
+                return result
+            if os.path.getsize(source) == 0:
+                result.reason = f"Fichier vide : {source}"
+                return result
+            stream = open(source, "rb")
+        with stream:
+            if stream.read(len(_BINARY_DXF_SENTINEL)) == _BINARY_DXF_SENTINEL:
+                result.binary = True
+            else:
+                stream.seek(0)
+                _scan_dxf_stream(stream, result)
+    except OSError as e:
+        result.reason = f"Lecture impossible : {e}"
+        return result
+
+    if result.reason is not None:
+        result.reason = f"Fichier DXF invalide: {result.reason}"
+    elif not (strict or result.binary):
+        return result
+    else:
+        doc, error_msg = load_dxf_file(source)
+        if doc is not None:
+            result.valid = True
+            result.version = doc.dxfversion
+            result.encoding = doc.encoding
+            result.entity_count = len(doc.modelspace())
+            return result
+        result.valid = False
+        result.reason = error_msg
+
+    if not strict:
+        return result
+    try:
+        if isinstance(source, DxfMemorySource):
+            _, auditor = recover.read(io.BytesIO(source.data))
+        else:
+            _, auditor = recover.readfile(source)
+        result.reason += f" (récupérable avec ezdxf.recover : {len(auditor.fixes)} correction(s))"
+    except Exception:
+        pass
+    return result
+
+
+def iter_validate_dxf_files(sources: List[DxfSource], strict: bool = False,
+                            workers: int = 1) -> Iterator[DxfValidationResult]:
+    """Valide une liste de sources DXF, en parallèle si `workers` > 1.
+    
+    Les résultats sont produits dans l'ordre des sources ; interrompre l'itération
+    annule les validations encore en attente.
+    
+    Args:
+        sources: Sources DXF à valider
+        strict: Voir fast_validate_dxf
+        workers: Nombre de processus de validation
+        
+    Yields:
+        Un DxfValidationResult par source
+    """
+    if workers <= 1 or len(sources) < 2:
+        for source in sources:
+            yield fast_validate_dxf(source, strict)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(sources)),
+                                   mp_context=multiprocessing.get_context("spawn"))
+    try:
+        chunksize = max(1, len(sources) // (workers * 4))
+        yield from executor.map(functools.partial(fast_validate_dxf, strict=strict), sources, chunksize=chunksize)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def check_autocad_available(convert_to_dwg: bool = False,
+                             second_instance: bool = False) -> Tuple[bool, Optional[str]]:
+    """Vérifie si AutoCAD est disponible via COM.
+    
+    La vérification connecte la session AutoCAD partagée (shared_autocad_converter) :
+    elle reste ouverte pour la conversion et l'ouverture en fin de traitement.
+    
+    Args:
+        convert_to_dwg: Si True, vérifie que AutoCAD peut convertir en DWG
+        second_instance: Vérifier la session de la seconde instance AutoCAD
+        
+    Returns:
+        Tuple (est_disponible, message_erreur)
+    """
+    if not convert_to_dwg:
+        return True, None
+    
+    try:
+        version = shared_autocad_converter(second_instance).version(AUTOCAD_CHECK_TIMEOUT)
+        logger.info(f"AutoCAD disponible (version: {version})")
+        return True, None
+    except ImportError:
+        return False, "Module win32com non installé (requis pour conversion DWG)"
+    except Exception as e:
+        return False, f"AutoCAD ne peut pas être contacté: {e}"
+
+
+def find_qgis_executable() -> Optional[str]:
+    """Recherche l'exécutable QGIS (installations Windows usuelles, puis PATH).
+
+    Returns:
+        Chemin de l'exécutable, ou None si QGIS est introuvable
+    """
+    candidates = sorted(glob.glob(r"C:\Program Files\QGIS*\bin\qgis-bin.exe"), reverse=True)
+    candidates += [r"C:\OSGeo4W\bin\qgis-bin.exe", r"C:\OSGeo4W64\bin\qgis-bin.exe"]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which("qgis-bin") or shutil.which("qgis")
+
+
+def open_in_qgis(filepath: str) -> Tuple[bool, Optional[str]]:
+    """Ouvre un fichier dans QGIS, sans attendre la fermeture du logiciel.
+
+    Args:
+        filepath: Chemin du fichier à ouvrir
+
+    Returns:
+        Tuple (ouvert, message_erreur)
+    """
+    qgis = find_qgis_executable()
+    if qgis is None:
+        return False, "QGIS introuvable (installez QGIS : https://qgis.org/download/)"
+    try:
+        subprocess.Popen([qgis, filepath])
+    except OSError as e:
+        return False, f"Impossible de lancer QGIS : {e}"
+    return True, None
+
+
+# ---------- Cache des sources ----------
+def source_digest(source: DxfSource) -> Optional[str]:
+    """Empreinte SHA-256 du contenu d'une source DXF (None si la source est illisible)."""
+    digest = hashlib.sha256()
+    try:
+        if isinstance(source, DxfMemorySource):
+            digest.update(source.data)
+        else:
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(EXTRACT_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+
+# Taille maximale par défaut du cache disque des sources (éviction LRU au-delà)
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Dossier par défaut du cache des sources (profil utilisateur)."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "AssembleurDXF", "cache")
+
+
+class SourceCache:
+    """Cache disque des sources DXF validées et nettoyées, indexé par empreinte du contenu.
+    
+    La clé combine l'empreinte SHA-256 du contenu, l'option de nettoyage et les versions
+    de l'outil et d'ezdxf. Une source valide est stockée en DXF binaire (``<clé>.dxf``),
+    une source rejetée garde son motif de rejet (``<clé>.err``). L'index ``index.json``
+    ne sert qu'à l'éviction LRU : le cache reste lisible sans lui, ce qui permet aux
+    processus de fusion de le consulter sans partager l'index.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, cache_dir: str, do_cleanup: bool, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = safe_mkdir(cache_dir)
+        self.do_cleanup = bool(do_cleanup)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Clés lues ou écrites depuis le dernier flush -> taille sur disque
+        self.touched = {}
+        self._index = None
+
+    def __getstate__(self):
+        # L'index et les compteurs restent dans le processus principal
+        state = self.__dict__.copy()
+        state.update(_index=None, touched={}, hits=0, misses=0)
+        return state
+
+    def key_for(self, source: DxfSource) -> Optional[str]:
+        """Calcule la clé de cache d'une source (None si la source est illisible)."""
+        content = source_digest(source)
+        if content is None:
+            return None
+        # Les documents nettoyés dépendent aussi de la version de la purge
+        cleanup = f"{int(self.do_cleanup)}.{PURGE_VERSION}" if self.do_cleanup else "0"
+        options = f"{content}|cleanup={cleanup}|{APP_VERSION}|ezdxf={ezdxf.__version__}"
+        return hashlib.sha256(options.encode()).hexdigest()
+
+    def get(self, key: str) -> Tuple[Optional[Drawing], Optional[str], bool]:
+        """Cherche une source dans le cache.
+        
+        Args:
+            key: Clé de la source
+            
+        Returns:
+            Tuple (document ou None, message_erreur, trouvé)
+        """
+        dxf_path = os.path.join(self.cache_dir, key + ".dxf")
+        err_path = os.path.join(self.cache_dir, key + ".err")
+        try:
+            if os.path.isfile(dxf_path):
+                doc = ezdxf.readfile(dxf_path)
+                self._touch(key, dxf_path)
+                self.hits += 1
+                return doc, None, True
+            if os.path.isfile(err_path):
+                with open(err_path, "r", encoding="utf-8") as f:
+                    error_msg = f.read()
+                self._touch(key, err_path)
+                self.hits += 1
+                return None, error_msg, True
+        except Exception as e:
+            # Entrée corrompue : elle sera recalculée
+            logger.warning(f"Entrée de cache illisible {key}: {e}")
+            for path in (dxf_path, err_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self.misses += 1
+        return None, None, False
+
+    def put(self, key: str, doc: Optional[Drawing], error_msg: Optional[str]) -> None:
+        """Enregistre une source validée (et nettoyée) ou son motif de rejet.
+        
+        Args:
+            key: Clé de la source
+            doc: Document à stocker, ou None si la source est invalide
+            error_msg: Motif de rejet si la source est invalide
+        """
+        suffix = ".dxf" if doc is not None else ".err"
+        path = os.path.join(self.cache_dir, key + suffix)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if doc is not None:
+                doc.saveas(tmp_path, fmt="bin")
+            else:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(error_msg or "")
+            os.replace(tmp_path, path)
+            self._touch(key, path)
+        except Exception as e:
+            logger.warning(f"Écriture du cache impossible {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def record(self, touched: dict) -> None:
+        """Reporte les accès faits par un processus de fusion."""
+        self.touched.update(touched)
+
+    def flush(self) -> int:
+        """Met à jour l'index LRU et évince les entrées les plus anciennes au-delà de la taille maximale.
+        
+        Returns:
+            Nombre d'entrées évincées
+        """
+        index = self._load_index()
+        now = time.time()
+        for key, size in self.touched.items():
+            index[key] = {"size": size, "atime": now}
+        self.touched = {}
+
+        evicted = 0
+        total = sum(entry["size"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["atime"]):
+            if total <= self.max_bytes:
+                break
+            for suffix in (".dxf", ".err"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, key + suffix))
+                except OSError:
+                    pass
+            total -= index.pop(key)["size"]
+            evicted += 1
+
+        index_path = os.path.join(self.cache_dir, self.INDEX_NAME)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+        return evicted
+
+    def _touch(self, key: str, path: str) -> None:
+        self.touched[key] = os.path.getsize(path)
+
+    def _load_index(self) -> dict:
+        if self._index is not None:
+            return self._index
+        index = {}
+        index_path = os.path.join(self.cache_dir, self.INDEX_NAME)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            # Index absent ou corrompu : reconstruction depuis le contenu du dossier
+            for name in os.listdir(self.cache_dir):
+                key, ext = os.path.splitext(name)
+                if ext in (".dxf", ".err"):
+                    path = os.path.join(self.cache_dir, name)
+                    index[key] = {"size": os.path.getsize(path), "atime": os.path.getmtime(path)}
+        # Ignorer les entrées dont le fichier a disparu
+        self._index = {
+            key: entry for key, entry in index.items()
+            if os.path.isfile(os.path.join(self.cache_dir, key + ".dxf"))
+            or os.path.isfile(os.path.join(self.cache_dir, key + ".err"))
+        }
+        return self._index
+
+
+# ---------- Fusion (partagée entre le thread et les processus de travail) ----------
+# Nombre maximal de fichiers par lot envoyé à un processus de fusion
+MERGE_BATCH_MAX_FILES = 50
+
+# Bilan du dédoublonnage (clé d'ImportDeduplicator.stats -> compteur du moteur)
+_DEDUP_COUNTS = {
+    "blocks_reused": "blocks_deduplicated",
+    "bytes_saved": "dedup_bytes_saved",
+    "table_entries_shared": "table_entries_shared",
+    "table_conflicts": "table_conflicts",
+}
+
+# Taille des blocs copiés lors de l'extraction des archives (mémoire bornée)
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+
+# Mode sans extraction : taille maximale d'un membre gardé en mémoire, et budget total
+MEMORY_MEMBER_MAX_BYTES = 64 * 1024 * 1024
+MEMORY_BUDGET_BYTES = 1024 * 1024 * 1024
+
+# Délai de connexion à AutoCAD lors de la vérification préalable (secondes, démarrage compris)
+AUTOCAD_CHECK_TIMEOUT = 120.0
+
+# Événement d'arrêt partagé, installé dans chaque processus de travail
+_merge_stop_event = None
+
+
+def purge_dxf_document(doc: Drawing, dxf_path: DxfSource, log: Callable[[str], None]) -> bool:
+    """Nettoie en mémoire un document DXF déjà chargé (sans sauvegarde).
+    
+    Seuls les blocs, calques, types de ligne et styles de texte qui ne sont référencés
+    nulle part (entités, blocs imbriqués, cotes, objets) sont supprimés (voir purge_unused).
+    
+    Args:
+        doc: Document DXF à nettoyer
+        dxf_path: Chemin d'origine du document (pour le journal)
+        log: Fonction recevant les messages du journal
+        
+    Returns:
+        True si des éléments ont été supprimés, False sinon
+    """
+    try:
+        report = purge_unused(doc)
+    except Exception as e:
+        logger.warning(f"Erreur nettoyage {dxf_path}: {e}")
+        log(f"⚠️ Impossible de nettoyer {source_label(dxf_path)}: {e}")
+        return False
+    if not report.total:
+        return False
+    log(f"   🧹 Nettoyé: {report.summary()}")
+    return True
+
+
+def load_clean_dxf(source: DxfSource, do_cleanup: bool, log: Callable[[str], None],
+                   cache: Optional[SourceCache] = None,
+                   metrics: Optional[MetricsRecorder] = None) -> Tuple[Optional[Drawing], Optional[str]]:
+    """Charge, valide et nettoie (optionnel) une source DXF, en passant par le cache si fourni.
+    
+    Une source déjà en cache n'est ni revalidée ni renettoyée : le document stocké
+    (DXF binaire déjà nettoyé) est relu directement.
+    
+    Args:
+        source: Source DXF (fichier ou membre en mémoire)
+        do_cleanup: Nettoyer le document après chargement
+        log: Fonction recevant les messages du journal
+        cache: Cache des sources, ou None
+        metrics: Reçoit les mesures des étapes parse et cleanup, ou None
+        
+    Returns:
+        Tuple (document ou None, message_erreur)
+    """
+    label = source_label(source)
+    with measure(metrics, "parse", label):
+        key = cache.key_for(source) if cache is not None else None
+        if key is not None:
+            doc, error_msg, found = cache.get(key)
+            if found:
+                return doc, error_msg
+
+        doc, error_msg = load_dxf_file(source)
+    if doc is not None and do_cleanup:
+        with measure(metrics, "cleanup", label):
+            purge_dxf_document(doc, source, log)
+
+    if key is not None:
+        cache.put(key, doc, error_msg)
+    return doc, error_msg
+
+
+def log_source_extents(doc_src: Drawing, dxf_path: DxfSource, log: Callable[[str], None],
+                       approximate: bool = False,
+                       metrics: Optional[MetricsRecorder] = None) -> Optional[Extents]:
+    """Calcule l'emprise X/Y de l'espace objet d'une source et la journalise.
+    
+    Args:
+        doc_src: Document DXF source (déjà chargé)
+        dxf_path: Chemin d'origine du document source (pour le journal)
+        log: Fonction recevant les messages du journal
+        approximate: Emprise approximative (sommets et points d'insertion seulement)
+        metrics: Reçoit la mesure de l'étape extents, ou None
+        
+    Returns:
+        Emprise de la source, ou None si elle est vide ou incalculable
+    """
+    label = source_label(dxf_path)
+    with measure(metrics, "extents", label):
+        try:
+            box = compute_extents(doc_src.modelspace(), approximate)
+        except Exception as e:
+            logger.debug(f"Emprise incalculable {dxf_path}: {e}")
+            return None
+    if box is not None:
+        log(f"   📍 {label} → "
+            f"X:[{box.xmin:.2f} à {box.xmax:.2f}] "
+            f"Y:[{box.ymin:.2f} à {box.ymax:.2f}]" + (" (approx.)" if approximate else ""))
+    return box
+
+
+def import_dxf_document(doc_src: Drawing, doc_target: Drawing, dxf_path: DxfSource,
+                        log: Callable[[str], None], handles: Optional[List[str]] = None,
+                        metrics: Optional[MetricsRecorder] = None,
+                        dedup: Optional[ImportDeduplicator] = None) -> int:
+    """Importe l'espace objet d'un document source dans le document cible, sans transformation.
+    
+    Args:
+        doc_src: Document DXF source (déjà chargé)
+        doc_target: Document DXF de destination
+        dxf_path: Chemin d'origine du document source (pour le journal)
+        log: Fonction recevant les messages du journal
+        handles: Si fourni, reçoit les handles des entités créées dans le document cible
+        metrics: Reçoit les mesures des étapes import et finalize, ou None
+        dedup: Dédoublonneur des blocs et tables du document cible, ou None
+        
+    Returns:
+        Nombre d'entités importées
+    """
+    label = source_label(dxf_path)
+    msp_src = doc_src.modelspace()
+    msp_target = doc_target.modelspace()
+    first_new = len(msp_target)
+    with measure(metrics, "import", label):
+        # Importer directement SANS TRANSFORMATION - conservation des coordonnées géographiques
+        importer = dedup.importer(doc_src) if dedup is not None else Importer(doc_src, doc_target)
+        importer.import_modelspace()
+    with measure(metrics, "finalize", label):
+        importer.finalize()
+    if handles is not None:
+        # Les entités importées sont ajoutées à la fin de l'espace objet cible
+        handles.extend(e.dxf.handle for e in msp_target[first_new:])
+
+    entities_in = len(msp_src)
+    log(f"   ✅ {entities_in} entité(s) importée(s) aux coordonnées d'origine")
+    return entities_in
+
+
+def _init_merge_process(stop_event) -> None:
+    """Initialise un processus de fusion avec l'événement d'arrêt partagé."""
+    global _merge_stop_event
+    _merge_stop_event = stop_event
+
+
+def merge_dxf_batch(dxf_paths: List[DxfSource], partial_dxf: str, do_cleanup: bool,
+                    cache: Optional[SourceCache] = None,
+                    metrics: Optional[MetricsRecorder] = None,
+                    approximate_extents: bool = False, dedup_blocks: bool = True) -> dict:
+    """Charge, nettoie et importe un lot de DXF dans un document partiel (processus de travail).
+    
+    Chaque fichier n'est lu qu'une fois. Le document partiel est écrit en DXF binaire
+    pour accélérer sa relecture par le processus principal.
+    
+    Args:
+        dxf_paths: Lot de fichiers DXF à fusionner
+        partial_dxf: Chemin du document partiel à écrire
+        do_cleanup: Nettoyer chaque document avant import
+        cache: Cache des sources, ou None
+        metrics: Enregistreur (copie propre au processus) des mesures par source, ou None
+        approximate_extents: Emprises approximatives (sommets et points d'insertion seulement)
+        dedup_blocks: Réutiliser les définitions de blocs identiques déjà importées dans le lot
+        
+    Returns:
+        Dictionnaire {partial, files, merged, entities, counts, extents, dedup, messages, cache_hits,
+        cache_misses, cache_touched, metrics} ; ``counts`` donne, pour chaque source du lot,
+        le nombre d'entités ajoutées au document partiel, ``extents`` son emprise
+        [xmin, ymin, xmax, ymax] ou None, ``dedup`` le bilan du dédoublonnage (vide si désactivé)
+    """
+    doc_partial = ezdxf.new("R2010")
+    msp_partial = doc_partial.modelspace()
+    dedup = ImportDeduplicator(doc_partial) if dedup_blocks else None
+    messages = []
+    counts = [0] * len(dxf_paths)
+    extents = [None] * len(dxf_paths)
+    merged = 0
+    entities = 0
+    for pos, path in enumerate(dxf_paths):
+        if _merge_stop_event is not None and _merge_stop_event.is_set():
+            break
+        doc_src, error_msg = load_clean_dxf(path, do_cleanup, messages.append, cache, metrics)
+        if doc_src is None:
+            messages.append(f"⚠️ Fichier ignoré : {error_msg}")
+            continue
+        try:
+            box = log_source_extents(doc_src, path, messages.append, approximate_extents, metrics)
+            extents[pos] = box.as_list() if box is not None else None
+            before = len(msp_partial)
+            entities += import_dxf_document(doc_src, doc_partial, path, messages.append, metrics=metrics,
+                                            dedup=dedup)
+            counts[pos] = len(msp_partial) - before
+            merged += 1
+        except Exception as e:
+            logger.warning(f"Erreur import {path}: {e}", exc_info=True)
+            messages.append(f"⚠️ Erreur import {source_label(path)}: {e}")
+        finally:
+            doc_src = None
+
+    if merged:
+        with measure(metrics, "saveas", os.path.basename(partial_dxf)):
+            doc_partial.saveas(partial_dxf, fmt="bin")
+    return {
+        "partial": partial_dxf if merged else None,
+        "files": len(dxf_paths),
+        "merged": merged,
+        "entities": entities,
+        "counts": counts,
+        "extents": extents,
+        "dedup": dedup.stats() if dedup is not None else {},
+        "messages": messages,
+        "cache_hits": cache.hits if cache is not None else 0,
+        "cache_misses": cache.misses if cache is not None else 0,
+        "cache_touched": cache.touched if cache is not None else {},
+        "metrics": [r.as_dict() for r in metrics.records] if metrics is not None else [],
+    }
+
+
+# ---------- Manifeste d'assemblage (mise à jour incrémentale) ----------
+MANIFEST_FORMAT = 1
+
+
+def merge_manifest_path(output_dxf: str) -> str:
+    """Chemin du manifeste associé à un assemblage (assemblage.manifest.json), quel que soit son format."""
+    return output_stem(output_dxf) + ".manifest.json"
+
+
+def read_assembly(output_dxf: str) -> Drawing:
+    """Relit un assemblage écrit par write_dxf (DXF texte ou binaire, .dxf.gz ou .zip).
+    
+    Args:
+        output_dxf: Chemin du fichier assemblé
+        
+    Returns:
+        Document DXF chargé
+    """
+    fmt = output_format_of(output_dxf)
+    if fmt == "gzip":
+        with gzip.open(output_dxf, "rb") as f:
+            return read_dxf_bytes(f.read(), output_dxf)
+    if fmt == "zip":
+        return ezdxf.readzip(output_dxf, zip_member_name(output_dxf))
+    return ezdxf.readfile(output_dxf)
+
+
+def load_merge_manifest(output_dxf: str, do_cleanup: bool, output_format: str = "ascii",
+                        simplify: Optional[dict] = None) -> Optional[dict]:
+    """Charge le manifeste d'un assemblage s'il décrit bien le fichier de sortie actuel.
+    
+    Le manifeste est rejeté si la sortie a été modifiée depuis (taille ou date), ou si
+    l'option de nettoyage, le format de sortie, la simplification ou la version de l'outil
+    ont changé.
+    
+    Args:
+        output_dxf: Chemin du fichier DXF assemblé
+        do_cleanup: Option de nettoyage de l'exécution courante
+        output_format: Format de sortie de l'exécution courante
+        simplify: Simplification de l'exécution courante ({tolerance, precision}), ou None
+        
+    Returns:
+        Le manifeste, ou None s'il est absent ou périmé
+    """
+    try:
+        with open(merge_manifest_path(output_dxf), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        stat = os.stat(output_dxf)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get("format") != MANIFEST_FORMAT
+            or manifest.get("app_version") != APP_VERSION
+            or manifest.get("cleanup") != bool(do_cleanup)
+            or manifest.get("output_format", "ascii") != output_format
+            or manifest.get("simplify") != simplify
+            or manifest.get("output") != {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}):
+        return None
+    return manifest
+
+
+def save_merge_manifest(output_dxf: str, do_cleanup: bool, sources: dict, output_format: str = "ascii",
+                        archives: Optional[dict] = None, simplify: Optional[dict] = None) -> None:
+    """Enregistre le manifeste d'un assemblage qui vient d'être écrit.
+    
+    Args:
+        output_dxf: Chemin du fichier DXF assemblé
+        do_cleanup: Option de nettoyage utilisée
+        sources: Identifiant de source -> {digest, handles, extents}
+        output_format: Format de sortie utilisé
+        archives: Nom d'archive -> {size, mtime_ns, sources} (archives non réextraites tant
+            qu'elles sont inchangées), ou None
+        simplify: Simplification utilisée ({tolerance, precision}), ou None
+    """
+    stat = os.stat(output_dxf)
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "app_version": APP_VERSION,
+        "cleanup": bool(do_cleanup),
+        "output_format": output_format,
+        "output": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "sources": sources,
+        "archives": archives or {},
+        "simplify": simplify,
+    }
+    path = merge_manifest_path(output_dxf)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def remove_merge_manifest(output_dxf: str) -> None:
+    """Supprime le manifeste d'un assemblage (s'il existe)."""
+    try:
+        os.remove(merge_manifest_path(output_dxf))
+    except OSError:
+        pass
+
+
+# ---------- Moteur d'assemblage ----------
+# Types d'événements émis par le moteur
+EVENT_LOG = "log"
+EVENT_PROGRESS = "progress"
+EVENT_FINISHED = "finished"
+EVENT_METRIC = "metric"
+
+
+@dataclass
+class EngineEvent:
+    """Événement émis par le moteur d'assemblage.
+    
+    kind vaut EVENT_LOG (message), EVENT_PROGRESS (progress, 0..100),
+    EVENT_METRIC (data : mesures d'une étape, voir StageMetrics) ou
+    EVENT_FINISHED (status "ok", "error" ou "cancelled", et message).
+    """
+    kind: str
+    message: Optional[str] = None
+    progress: Optional[int] = None
+    status: Optional[str] = None
+    data: Optional[dict] = None
+    job: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+# Auditeur d'événements : appelé dans le thread qui exécute le moteur
+EngineListener = Callable[[EngineEvent], None]
+
+
+class AssemblyEngine:
+    """Moteur d'assemblage complet, indépendant de l'interface.
+    
+    Le journal, la progression et la fin du traitement sont publiés sous forme
+    d'EngineEvent aux auditeurs enregistrés (add_listener) ; l'arrêt passe par
+    stop() ou par l'événement d'annulation fourni. run() s'exécute dans n'importe
+    quel thread ; events() et run_async() l'exécutent depuis asyncio.
+    """
+
+    def __init__(self, archive_folder, directories, output_folder, do_cleanup=False, open_in_second_instance=False, convert_before_open=False, single_parse=True, merge_workers=1, extract_workers=None, in_memory=False,
+                 memory_member_limit=MEMORY_MEMBER_MAX_BYTES, memory_budget=MEMORY_BUDGET_BYTES,
+                 cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES, incremental=False,
+                 strict_validation=False, approximate_extents=False, spatial_index=False,
+                 shard_by=None, shard_tile_size=SHARD_TILE_SIZE, shard_max_entities=None,
+                 dedup_blocks=True, output_format="ascii", streaming=False,
+                 simplify_tolerance=None, coordinate_precision=None,
+                 geopackage=False, geopackage_srs=GEOPACKAGE_SRS_ID,
+                 dwg_converter="autocad", oda_converter=None, dwg_workers=None, open_in_autocad=True, name=None,
+                 listeners: Optional[List[EngineListener]] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 profile_stage=None, profiler="cprofile", profile_output=None):
+        # Nom de la tâche, repris dans les événements
+        self.name = name
+        self.archive_folder = (archive_folder or "").strip()
+        self.directories = directories or []
+        self.output_folder = output_folder
+        self.do_cleanup = do_cleanup
+        self.open_in_second_instance = bool(open_in_second_instance)
+        self.convert_before_open = bool(convert_before_open)
+        # Convertisseur DWG : AutoCAD (session partagée) ou ODA File Converter (chemin, processus simultanés)
+        if dwg_converter not in DWG_CONVERTERS:
+            raise ValueError(f"Convertisseur DWG inconnu : {dwg_converter} (convertisseurs : {', '.join(DWG_CONVERTERS)})")
+        self.dwg_converter = dwg_converter
+        self.oda_converter = oda_converter
+        self.dwg_workers = dwg_workers
+        # Lecture unique : validation, nettoyage et import sur le même document
+        self.single_parse = bool(single_parse)
+        # Nombre de processus de fusion (1 = fusion séquentielle dans ce thread)
+        self.merge_workers = max(1, int(merge_workers or 1))
+        # Nombre d'archives décompressées simultanément (None = automatique)
+        self.extract_workers = max(1, int(extract_workers or min(4, os.cpu_count() or 1)))
+        # Mode sans extraction : les membres DXF restent en mémoire (implique la lecture unique)
+        self.in_memory = bool(in_memory)
+        # Cache disque des sources validées/nettoyées (None = désactivé, implique la lecture unique)
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        # Mise à jour incrémentale de la sortie existante (manifeste à côté de assemblage.dxf)
+        self.incremental = bool(incremental)
+        if self.in_memory or self.cache_dir or self.incremental:
+            self.single_parse = True
+        # Validation préalable (sans lecture unique) : contrôle rapide du flux, ou chargement complet
+        self.strict_validation = bool(strict_validation)
+        # Emprises des sources : approximatives (sommets et points d'insertion) ou exactes
+        self.approximate_extents = bool(approximate_extents)
+        # Emprise de chaque source fusionnée (identifiant de source -> Extents, None si sans géométrie),
+        # calculée une seule fois puis reprise par le manifeste
+        self.source_extents = {}
+        # Index spatial des entités enregistré à côté de la sortie (extraction de zones)
+        self.spatial_index = bool(spatial_index)
+        # Sortie découpée en plusieurs DXF (archive, tile, budget ; None = assemblage unique)
+        self.shard_by = shard_by or None
+        self.shard_tile_size = shard_tile_size
+        self.shard_max_entities = shard_max_entities
+        # Définitions de blocs identiques importées une seule fois (références redirigées)
+        self.dedup_blocks = bool(dedup_blocks)
+        # Format du DXF assemblé : ascii, binary, gzip (assemblage.dxf.gz) ou zip (assemblage.zip)
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Format de sortie inconnu : {output_format} (formats : {', '.join(OUTPUT_FORMATS)})")
+        self.output_format = output_format
+        # Écriture en flux : entités de chaque source écrites dès leur import (mémoire bornée)
+        self.streaming = bool(streaming)
+        # Simplification des polylignes (écart maximal, None = désactivée) et arrondi des
+        # coordonnées (nombre de décimales, None = désactivé) avant l'écriture de l'assemblage
+        check_simplify_options(simplify_tolerance, coordinate_precision)
+        self.simplify_tolerance = simplify_tolerance or None
+        self.coordinate_precision = coordinate_precision
+        # Export GeoPackage de l'assemblage (assemblage.gpkg, ouverture rapide dans QGIS) et code
+        # EPSG de ses coordonnées ; writer actif pendant la fusion
+        self.geopackage = bool(geopackage)
+        self.geopackage_srs = geopackage_srs
+        self._geopackage = None
+        # Identifiants stables des fichiers extraits (archive/membre)
+        self.source_ids = {}
+        # Taille et date des archives listées (nom -> {size, mtime_ns}), reprises par le manifeste
+        self.archive_stats = {}
+        # Sources des archives inchangées depuis le dernier assemblage, non extraites (mise à jour incrémentale)
+        self.kept_sources = set()
+        self.memory_member_limit = memory_member_limit
+        self._memory_budget_left = memory_budget
+        self._memory_lock = threading.Lock()
+        # Ouverture du résultat dans AutoCAD en fin de traitement
+        self.open_in_autocad = bool(open_in_autocad)
+        # Annulation : partageable entre plusieurs moteurs ou positionnée depuis un autre thread
+        self.cancel_event = cancel_event or threading.Event()
+        self._listeners = list(listeners or [])
+        # Bilan de l'exécution : statut final, mesures de chaque étape et compteurs
+        self.status = None
+        self.message = None
+        self.counts = {}
+        # Profilage optionnel d'une étape (fichier .prof pour cProfile, .html pour pyinstrument)
+        self.metrics = MetricsRecorder(profile_stage, profiler)
+        self.metrics.add_listener(self._publish_metric)
+        if profile_stage and not profile_output:
+            extension = "html" if profiler == "pyinstrument" else "prof"
+            profile_output = os.path.join(output_folder, f"profil_{profile_stage}.{extension}")
+        self.profile_output = profile_output
+
+    # --- Événements ---
+    def add_listener(self, listener: EngineListener) -> None:
+        """Enregistre un auditeur des événements du moteur."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: EngineListener) -> None:
+        """Retire un auditeur enregistré."""
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _publish(self, event: EngineEvent) -> None:
+        event.job = self.name
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                # Un auditeur défaillant n'interrompt pas le traitement
+                logger.warning(f"Erreur d'un auditeur d'événements: {e}", exc_info=True)
+
+    def emit_log(self, message: str) -> None:
+        self._publish(EngineEvent(EVENT_LOG, message=message))
+
+    def emit_progress(self, value: int) -> None:
+        self._publish(EngineEvent(EVENT_PROGRESS, progress=value))
+
+    def emit_finished_ok(self, message: str) -> None:
+        self.status, self.message = "ok", message
+        self._publish(EngineEvent(EVENT_FINISHED, message=message, status="ok"))
+
+    def emit_finished_err(self, message: str) -> None:
+        self.status = "cancelled" if self.is_stopped() else "error"
+        self.message = message
+        self._publish(EngineEvent(EVENT_FINISHED, message=message, status=self.status))
+
+    def _publish_metric(self, record: StageMetrics) -> None:
+        self._publish(EngineEvent(EVENT_METRIC, data=record.as_dict()))
+
+    @property
+    def stage_times(self) -> dict:
+        """Durée cumulée de chaque étape (s)."""
+        return {stage: total["wall"] for stage, total in self.metrics.totals().items()}
+
+    def summary(self) -> dict:
+        """Bilan sérialisable de la dernière exécution (statut, message, mesures, compteurs)."""
+        return {
+            "job": self.name,
+            "status": self.status,
+            "message": self.message,
+            "stages": self.stage_times,
+            "metrics": self.metrics.totals(),
+            "counts": dict(self.counts),
+        }
+
+    def stage(self, name: str, source: Optional[str] = None):
+        """Mesure une étape du traitement (voir assembleur_metrics.STAGES).
+        
+        Args:
+            name: Nom de l'étape
+            source: Source concernée, ou None pour l'étape globale
+        """
+        return self.metrics.measure(name, source)
+    
+    def stop(self):
+        """Demande l'arrêt du traitement."""
+        self.cancel_event.set()
+        self.emit_log("⏸️ Arrêt demandé...")
+    
+    def is_stopped(self) -> bool:
+        """Vérifie si l'arrêt a été demandé."""
+        return self.cancel_event.is_set()
+
+    def run(self):
+        """Exécute le traitement complet dans le thread courant (bloquant)."""
+        self.status = self.message = None
+        self.metrics.clear()
+        self.counts = {}
+        self.source_extents = {}
+        self.archive_stats = {}
+        self.kept_sources = set()
+        try:
+            start_ts = datetime.now()
+            self.emit_log(f"▶️ Début du traitement : {start_ts:%Y-%m-%d %H:%M:%S}")
+
+            if not self.archive_folder and not self.directories:
+                raise RuntimeError("Aucune source fournie. Sélectionnez un dossier d'archives .tar.bz2.")
+
+            safe_mkdir(self.output_folder)
+
+            # Utilisation du context manager pour gestion automatique des temporaires
+            with temp_directory(prefix="dxf_merge_") as tmp_root:
+                extract_dir = safe_mkdir(os.path.join(tmp_root, "extracted"))
+                self.emit_log(f"📦 Dossier temporaire d'extraction : {extract_dir}")
+                
+                self._process_files(extract_dir, start_ts)
+
+        except Exception as e:
+            logger.error(f"Erreur dans le traitement: {e}", exc_info=True)
+            self.emit_finished_err(f"❌ Erreur: {e}\n{traceback.format_exc()}")
+        finally:
+            if self.metrics.profile_stage:
+                self._dump_profile()
+
+    def _dump_profile(self) -> None:
+        """Écrit le profil de l'étape profilée (profile_output)."""
+        try:
+            if self.metrics.dump_profile(self.profile_output):
+                self.emit_log(f"📈 Profil de l'étape {self.metrics.profile_stage} : {self.profile_output}")
+            else:
+                self.emit_log(f"ℹ️ Aucun profil collecté pour l'étape {self.metrics.profile_stage}")
+        except OSError as e:
+            self.emit_log(f"⚠️ Profil non enregistré : {e}")
+    
+    # --- API asyncio ---
+    async def events(self, executor=None) -> AsyncIterator[EngineEvent]:
+        """Exécute le traitement dans un exécuteur et diffuse ses événements.
+
+        Plusieurs moteurs peuvent être parcourus en même temps dans une même boucle.
+        Si l'itération est interrompue (tâche annulée, aclose), l'arrêt du moteur est
+        demandé et sa fin est attendue.
+
+        Args:
+            executor: Exécuteur du traitement (None = exécuteur par défaut de la boucle)
+
+        Yields:
+            Événements du moteur, jusqu'à l'événement EVENT_FINISHED inclus
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def forward(event: EngineEvent) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+        self.add_listener(forward)
+        future = loop.run_in_executor(executor, self.run)
+        # Marque de fin, placée après les événements déjà transmis par le traitement
+        future.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            await future
+        finally:
+            if not future.done():
+                self.stop()
+                await asyncio.wait([future])
+            self.remove_listener(forward)
+
+    async def run_async(self, executor=None) -> dict:
+        """Exécute le traitement sans bloquer la boucle asyncio.
+
+        Args:
+            executor: Exécuteur du traitement (None = exécuteur par défaut de la boucle)
+
+        Returns:
+            Bilan de l'exécution (voir summary)
+        """
+        async for _ in self.events(executor):
+            pass
+        return self.summary()
+
+    def _process_files(self, extract_dir: str, start_ts: datetime):
+        """Traite les fichiers (extraction, fusion, conversion).
+        
+        Args:
+            extract_dir: Dossier d'extraction temporaire
+            start_ts: Timestamp de début
+        """
+        try:
+
+            dxf_files = []
+            output_dxf = os.path.join(self.output_folder, "assemblage.dxf")
+            if not self.shard_by:
+                output_dxf = output_path(output_dxf, self.output_format)
+
+            # ---- 1) Extraction DXF depuis toutes les archives .tar.bz2 (si dossier fourni) ----
+            if self.archive_folder:
+                self.emit_log(f"📂 Dossier d'archives sélectionné : {self.archive_folder}")
+                with self.stage("listing"):
+                    archive_files = list_tarbz2_files(self.archive_folder)
+                    for archive_path in archive_files:
+                        stat = os.stat(archive_path)
+                        self.archive_stats[os.path.basename(archive_path)] = {
+                            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                self.counts["archives"] = len(archive_files)
+                self.emit_log(f"🔍 {len(archive_files)} archive(s) .tar.bz2 trouvée(s)")
+
+                kept = self._unchanged_archives(output_dxf)
+                if kept:
+                    self.counts["archives_unchanged"] = len(kept)
+                    self.emit_log(f"⏭️ {len(kept)} archive(s) inchangée(s) depuis le dernier assemblage : non extraite(s)")
+                
+                with self.stage("extraction"):
+                    extracted = self.extract_archives(
+                        [a for a in archive_files if os.path.basename(a) not in kept], extract_dir)
+                dxf_files.extend(self._resolve_kept_members(archive_files, kept, extracted))
+                if self.is_stopped():
+                    self.emit_finished_err("⏸️ Traitement annulé par l'utilisateur")
+                    return
+                
+                self.emit_log(f"✅ Total DXF extraits depuis toutes les archives : {len(dxf_files)}")
+            else:
+                self.emit_progress(10)
+            
+            if self.is_stopped():
+                self.emit_finished_err("⏸️ Traitement annulé par l'utilisateur")
+                return
+
+            # ---- 2) Récolte DXF depuis les dossiers sélectionnés ----
+            if self.directories:
+                self.emit_log("🔎 Recherche de DXF dans les dossiers sélectionnés…")
+                self.emit_log("   " + " | ".join(self.directories))
+                with self.stage("collect"):
+                    from_dirs = list_dxfs_recursive(self.directories)
+                self.emit_log(f"✅ DXF trouvés dans les dossiers : {len(from_dirs)}")
+                dxf_files.extend(from_dirs)
+            else:
+                self.emit_progress(20)
+
+            # Déduplication tout en préservant l'ordre
+            dxf_files = list(dict.fromkeys(dxf_files))
+
+            self.counts["dxf_found"] = len(dxf_files)
+            self.emit_log(f"📊 Total DXF à fusionner : {len(dxf_files)}"
+                          + (f" (+ {len(self.kept_sources)} inchangé(s))" if self.kept_sources else ""))
+            if not dxf_files and not self.kept_sources:
+                raise RuntimeError("Aucun fichier DXF à traiter (archive/dossiers vides).")
+            
+            # Validation des fichiers DXF (en lecture unique, elle est faite pendant la fusion)
+            if not self.single_parse:
+                self.emit_log("🔍 Validation des fichiers DXF" + (" (stricte)..." if self.strict_validation else "..."))
+                valid_dxf_files = []
+                with self.stage("validation"):
+                    results = iter_validate_dxf_files(dxf_files, self.strict_validation, self.merge_workers)
+                    for dxf_path, result in zip(dxf_files, results):
+                        if self.is_stopped():
+                            results.close()
+                            self.emit_finished_err("⏸️ Traitement annulé par l'utilisateur")
+                            return
+                        
+                        if result.valid:
+                            valid_dxf_files.append(dxf_path)
+                        else:
+                            self.emit_log(f"⚠️ Fichier ignoré : {result.reason}")
+                
+                if not valid_dxf_files:
+                    raise RuntimeError("Aucun fichier DXF valide trouvé.")
+                
+                self.emit_log(f"✅ {len(valid_dxf_files)} fichier(s) DXF valide(s) sur {len(dxf_files)}")
+                dxf_files = valid_dxf_files
+
+            # ---- 3) Fusion DXF → assemblage.dxf ----
+            if self.is_stopped():
+                self.emit_finished_err("⏸️ Traitement annulé par l'utilisateur")
+                return
+
+            with self.stage("merge"):
+                self.merge_dxfs(dxf_files, output_dxf)
+            
+            if self.is_stopped():
+                self.emit_finished_err("⏸️ Traitement annulé par l'utilisateur")
+                return
+            
+            if self.shard_by:
+                self.emit_log(f"🧩 Fusion terminée → {shards_index_path(output_dxf)}")
+                if self.open_in_autocad:
+                    self.emit_log("ℹ️ Sortie découpée : pas d'ouverture automatique dans AutoCAD")
+            else:
+                self.emit_log(f"🧩 Fusion terminée → {output_dxf}")
+
+            # ---- 4) Conversion DWG des DXF découpés, par ODA File Converter, ou sans ouverture dans AutoCAD ----
+            open_path = output_dxf
+            # Avec AutoCAD, l'assemblage est converti au moment de son ouverture (étape 5)
+            convert_in_autocad = (self.convert_before_open and self.dwg_converter == "autocad"
+                                  and self.open_in_autocad)
+            if self.convert_before_open and (self.shard_by or not convert_in_autocad):
+                if self.output_format in ("gzip", "zip"):
+                    self.emit_log("ℹ️ Sortie compressée : pas de conversion DWG")
+                else:
+                    converted = self.convert_to_dwg(list_shards(output_dxf) if self.shard_by else [output_dxf])
+                    if converted and not self.shard_by:
+                        open_path = converted[0]
+
+            if self.is_stopped():
+                self.emit_finished_err("⏸️ Traitement annulé par l'utilisateur")
+                return
+
+            # ---- 5) Ouverture automatique dans AutoCAD avec zoom ----
+            if self.open_in_autocad and self.output_format in ("gzip", "zip"):
+                self.emit_log("ℹ️ Sortie compressée : pas d'ouverture automatique dans AutoCAD")
+            elif self.open_in_autocad and not self.shard_by:
+                try:
+                    self.emit_log(f"🚀 Ouverture du fichier dans AutoCAD : {open_path}")
+                    with self.stage("autocad"):
+                        self.open_in_autocad_with_zoom(open_path, self.open_in_second_instance, convert_in_autocad)
+                except Exception as e:
+                    self.emit_log(f"⚠️ Impossible d'ouvrir automatiquement : {e}")
+                    # Fallback: ouverture simple sans zoom
+                    try:
+                        os.startfile(output_dxf)
+                    except Exception:
+                        pass
+
+            if self.is_stopped():
+                self.emit_finished_err("⏸️ Traitement annulé par l'utilisateur")
+                return
+            
+            self.emit_progress(100)
+            end_ts = datetime.now()
+            elapsed = (end_ts - start_ts).total_seconds()
+            self.emit_finished_ok(f"Terminé en {elapsed:.1f} s.")
+
+        except Exception as e:
+            logger.error(f"Erreur finale: {e}", exc_info=True)
+            self.emit_finished_err(f"❌ Erreur: {e}\n{traceback.format_exc()}")
+
+    # ---------- Sous-étapes ----------
+    def open_in_autocad_with_zoom(self, filepath, use_second_instance=False, convert_before_open=False):
+        """Ouvre le fichier dans AutoCAD (modèle) et applique un zoom étendu.
+
+        La session AutoCAD est partagée et reste ouverte d'une tâche à l'autre
+        (voir shared_autocad_converter) : seule la première ouverture paie le démarrage.
+
+        Args:
+            filepath: Chemin du fichier à ouvrir (DXF)
+            use_second_instance: Si True, ouvre le fichier dans une seconde instance AutoCAD
+            convert_before_open: Si True, convertit en DWG via AutoCAD avant de zoomer
+        """
+        try:
+            # Validation du fichier source
+            if not os.path.exists(filepath):
+                raise FileNotFoundError(f"Le fichier source n'existe pas: {filepath}")
+            
+            if os.path.getsize(filepath) == 0:
+                raise ValueError(f"Le fichier source est vide: {filepath}")
+            
+            # Connexion à AutoCAD via COM (session partagée, connectée au premier appel)
+            converter = shared_autocad_converter(use_second_instance)
+            if use_second_instance:
+                self.emit_log("   🆕 Ouverture dans une seconde instance AutoCAD")
+            self.emit_log(f"   📐 AutoCAD connecté (version {converter.version()})")
+            
+            target_path = filepath
+            # Conversion en DWG si demandé (via AutoCAD, AutoCAD masqué jusqu'à l'ouverture)
+            if convert_before_open:
+                dwg_path = dwg_path_for(filepath)
+                self.emit_log(f"   💾 Conversion DXF -> DWG demandée: {dwg_path}")
+                try:
+                    start = time.perf_counter()
+                    with self.stage("dwg", os.path.basename(filepath)):
+                        target_path = converter.convert(filepath, dwg_path)
+                    self.counts["dwg_bytes"] = os.path.getsize(dwg_path)
+                    self.emit_log(f"   ✅ Fichier DWG créé ({os.path.getsize(dwg_path)} octets) "
+                                  f"en {time.perf_counter() - start:.1f} s")
+                except ImportError:
+                    raise
+                except Exception as e:
+                    self.emit_log(f"   ⚠️ Conversion DWG échouée ({e}). Continuant avec le DXF...")
+                    logger.error(f"Erreur conversion DWG: {e}", exc_info=True)
+            
+            # Ouvrir le document, rester en espace objet (Model) et effectuer un zoom étendu
+            converter.show(target_path, zoom=True)
+            self.emit_log(f"   📂 Document ouvert : {os.path.basename(target_path)}")
+            self.emit_log("   📦 Espace objet (Model)")
+            self.emit_log("   🔍 Zoom étendu appliqué")
+            
+        except ImportError:
+            logger.warning("Module win32com non disponible")
+            self.emit_log("   ⚠️ Module win32com non disponible, ouverture simple")
+            try:
+                os.startfile(filepath)
+            except Exception as e:
+                self.emit_log(f"   ⚠️ Ouverture simple échouée: {e}")
+        except Exception as e:
+            logger.warning(f"Erreur contrôle AutoCAD: {e}", exc_info=True)
+            self.emit_log(f"   ⚠️ Erreur: {e}")
+            # Fallback: essayer juste d'ouvrir le fichier
+            try:
+                os.startfile(filepath)
+                self.emit_log("   ℹ️ Ouverture simple du fichier...")
+            except Exception as e2:
+                self.emit_log(f"   ❌ Impossible d'ouvrir le fichier: {e2}")
+    
+    def convert_to_dwg(self, dxf_paths: List[str]) -> List[str]:
+        """Convertit des DXF en DWG, chacun à côté de lui, avec le convertisseur choisi (dwg_converter).
+        
+        Args:
+            dxf_paths: DXF à convertir (assemblage ou DXF découpés)
+            
+        Returns:
+            Chemins des DWG écrits et contrôlés
+        """
+        if not dxf_paths:
+            return []
+        try:
+            converter = create_dwg_converter(self.dwg_converter, self.open_in_second_instance,
+                                             self.oda_converter, self.dwg_workers)
+            label = f"AutoCAD {converter.version()}" if self.dwg_converter == "autocad" else "ODA File Converter"
+            self.emit_log(f"💾 Conversion DXF -> DWG de {len(dxf_paths)} fichier(s) ({label})")
+            with self.stage("dwg"):
+                results = converter.convert_many(dxf_paths)
+        except ImportError:
+            self.emit_log("⚠️ Module win32com non disponible : DXF non convertis en DWG")
+            return []
+        except Exception as e:
+            logger.warning(f"Erreur conversion DWG: {e}", exc_info=True)
+            self.emit_log(f"⚠️ Conversion DWG impossible : {e}")
+            return []
+        converted = []
+        for dxf_path, dwg_path, error in results:
+            if dwg_path is None:
+                self.emit_log(f"   ⚠️ {os.path.basename(dxf_path)} : conversion échouée ({error})")
+            else:
+                converted.append(dwg_path)
+                self.counts["dwg_bytes"] = self.counts.get("dwg_bytes", 0) + os.path.getsize(dwg_path)
+        self.counts["dwg_converted"] = len(converted)
+        self.emit_log(f"✅ {len(converted)} DWG écrit(s) sur {len(dxf_paths)}")
+        return converted
+    
+    def extract_archives(self, archive_files: List[str], extract_dir: str) -> List[DxfSource]:
+        """Extrait les DXF de plusieurs archives .tar.bz2 en parallèle (pool de threads).
+        
+        Chaque archive est extraite dans son propre sous-dossier. Si plusieurs archives
+        contiennent le même fichier, la dernière archive l'emporte, à la position de la
+        première occurrence (comme une extraction séquentielle dans un même dossier).
+        
+        Args:
+            archive_files: Liste des archives .tar.bz2
+            extract_dir: Dossier de destination pour l'extraction
+            
+        Returns:
+            Liste des sources DXF extraites (fichiers, ou membres en mémoire en mode sans extraction)
+        """
+        if not archive_files:
+            return []
+
+        total_archives = len(archive_files)
+        total_bytes = sum(os.path.getsize(a) for a in archive_files) or 1
+        done_bytes = 0
+        lock = threading.Lock()
+
+        def on_progress(consumed: int) -> None:
+            nonlocal done_bytes
+            with lock:
+                done_bytes += consumed
+                value = 5 + int(35 * min(1.0, done_bytes / total_bytes))
+            # Progression ~ 5..40 % pendant extraction
+            self.emit_progress(value)
+
+        def extract_one(idx: int, archive_path: str) -> Tuple[str, List[DxfSource]]:
+            if self.is_stopped():
+                return "", []
+            name = os.path.basename(archive_path)
+            self.emit_log(f"📦 Extraction de l'archive {idx}/{total_archives}: {name}")
+            archive_dir = safe_mkdir(os.path.join(extract_dir, f"{idx:04d}"))
+            with self.stage("extraction", name):
+                paths = self.extract_dxf_only(archive_path, archive_dir, on_progress)
+            for path in paths:
+                if not isinstance(path, DxfMemorySource):
+                    member = os.path.relpath(path, archive_dir).replace(os.sep, "/")
+                    self.source_ids[path] = f"{name}/{member}"
+            self.emit_log(f"   ✅ {name} : {len(paths)} DXF extrait(s)")
+            return archive_dir, paths
+
+        workers = min(self.extract_workers, total_archives)
+        if workers > 1:
+            self.emit_log(f"⚙️ Extraction parallèle : {workers} archive(s) à la fois")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda item: extract_one(*item), enumerate(archive_files, start=1)))
+
+        by_member = {}
+        for archive_dir, paths in results:
+            for path in paths:
+                if isinstance(path, DxfMemorySource):
+                    key = os.path.normpath(path.member)
+                else:
+                    key = os.path.relpath(path, archive_dir)
+                by_member[key] = path
+        return list(by_member.values())
+
+    def extract_dxf_only(self, archive_path: str, extract_dir: str,
+                         on_progress: Optional[Callable[[int], None]] = None) -> List[DxfSource]:
+        """Extrait uniquement les fichiers .dxf de l'archive .tar.bz2, de façon sécurisée.
+        
+        L'archive est lue en flux, en une seule passe (pas d'index préalable des membres),
+        et chaque membre est copié par blocs de taille fixe. En mode sans extraction, les
+        membres sont gardés en mémoire tant qu'ils respectent la taille maximale et le
+        budget mémoire ; les autres sont écrits dans le dossier d'extraction.
+        
+        Args:
+            archive_path: Chemin vers l'archive .tar.bz2
+            extract_dir: Dossier de destination pour l'extraction
+            on_progress: Reçoit le nombre d'octets compressés consommés depuis le
+                dernier appel ; à défaut, la progression de l'archive est émise directement
+            
+        Returns:
+            Liste des sources DXF extraites
+        """
+        dxf_paths = []
+        archive_name = os.path.basename(archive_path)
+        archive_size = max(1, os.path.getsize(archive_path))
+        consumed = 0
+
+        def report(position: int) -> None:
+            nonlocal consumed
+            if on_progress is not None:
+                on_progress(position - consumed)
+            else:
+                # Progression ~ 5..40 % pendant extraction
+                self.emit_progress(5 + int(35 * min(1.0, position / archive_size)))
+            consumed = position
+
+        with open(archive_path, "rb") as raw, tarfile.open(fileobj=raw, mode="r|bz2") as tar:
+            for m in tar:
+                if self.is_stopped():
+                    break
+                report(raw.tell())
+                if not m.name.lower().endswith(".dxf"):
+                    continue
+
+                # Chemin de sortie sécurisé
+                out_path = os.path.join(extract_dir, os.path.normpath(m.name))
+                if not is_path_within_directory(extract_dir, out_path):
+                    self.emit_log(f"⛔ Chemin suspect ignoré: {m.name}")
+                    continue
+
+                if self.in_memory and self._reserve_memory(m.size):
+                    try:
+                        f = tar.extractfile(m)
+                        if f is None:
+                            self.emit_log(f"⚠️ Impossible d'extraire: {m.name}")
+                            continue
+                        dxf_paths.append(DxfMemorySource(f"{archive_name}/{m.name}", m.name, f.read()))
+                    except Exception as e:
+                        logger.warning(f"Erreur extraction {m.name}: {e}")
+                        self.emit_log(f"⚠️ Erreur extraction {m.name}: {e}")
+                    continue
+
+                # Créer le dossier cible
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+                # Copier le flux par blocs (mémoire bornée quelle que soit la taille du membre)
+                try:
+                    f = tar.extractfile(m)
+                    if f is None:
+                        self.emit_log(f"⚠️ Impossible d'extraire: {m.name}")
+                        continue
+                    with open(out_path, "wb") as fout:
+                        shutil.copyfileobj(f, fout, EXTRACT_CHUNK_SIZE)
+                except Exception as e:
+                    logger.warning(f"Erreur extraction {m.name}: {e}")
+                    self.emit_log(f"⚠️ Erreur extraction {m.name}: {e}")
+                    continue
+                
+                # S'assurer que le fichier n'est pas en lecture seule
+                os.chmod(out_path, 0o666)
+
+                dxf_paths.append(out_path)
+        report(archive_size)
+
+        if not dxf_paths:
+            self.emit_log("ℹ️ Aucun DXF trouvé dans l'archive.")
+        return dxf_paths
+
+    def _unchanged_archives(self, output_dxf: str) -> dict:
+        """Archives inchangées (taille et date) depuis l'assemblage décrit par un manifeste valide.
+        
+        Uniquement en mise à jour incrémentale d'un assemblage unique : leurs sources sont
+        reprises telles quelles, sans extraction ni lecture.
+        
+        Args:
+            output_dxf: Chemin du fichier assemblé
+            
+        Returns:
+            Nom d'archive -> entrée du manifeste ({size, mtime_ns, sources})
+        """
+        if not self.incremental or self.shard_by or self.streaming or not self.archive_stats:
+            return {}
+        manifest = load_merge_manifest(output_dxf, self.do_cleanup, self.output_format,
+                                       self._simplify_settings())
+        if manifest is None:
+            return {}
+        known = manifest.get("archives") or {}
+        return {name: known[name] for name, stat in self.archive_stats.items()
+                if name in known and known[name].get("size") == stat["size"]
+                and known[name].get("mtime_ns") == stat["mtime_ns"]}
+
+    def _resolve_kept_members(self, archive_files: List[str], kept: dict,
+                              extracted: List[DxfSource]) -> List[DxfSource]:
+        """Départage les membres de même nom entre archives extraites et archives inchangées.
+        
+        Comme pour une extraction complète, la dernière archive (ordre de la liste) l'emporte.
+        Remplit kept_sources avec les sources retenues des archives inchangées.
+        
+        Args:
+            archive_files: Archives listées, dans l'ordre
+            kept: Archives inchangées (voir _unchanged_archives)
+            extracted: Sources extraites des autres archives
+            
+        Returns:
+            Sources extraites retenues
+        """
+        position = {os.path.basename(path): idx for idx, path in enumerate(archive_files)}
+        kept_members = {}
+        for name, entry in kept.items():
+            for sid in entry.get("sources", []):
+                kept_members[os.path.normpath(sid[len(name) + 1:])] = (position[name], sid)
+                self.kept_sources.add(sid)
+        if not kept_members:
+            return extracted
+        retained = []
+        for source in extracted:
+            name, _, member = self.source_id(source).partition("/")
+            other = kept_members.get(os.path.normpath(member))
+            if other is None:
+                retained.append(source)
+            elif position.get(name, -1) > other[0]:
+                self.kept_sources.discard(other[1])
+                retained.append(source)
+        return retained
+
+    def _archive_manifest(self, sids) -> dict:
+        """Entrée « archives » du manifeste : taille, date et sources fusionnées de chaque archive."""
+        archives = {name: {**stat, "sources": []} for name, stat in self.archive_stats.items()}
+        for sid in sids:
+            name, sep, _ = sid.partition("/")
+            if sep and name in archives:
+                archives[name]["sources"].append(sid)
+        return archives
+
+    def _reserve_memory(self, size: int) -> bool:
+        """Réserve la place d'un membre dans le budget mémoire du mode sans extraction.
+        
+        Args:
+            size: Taille du membre décompressé
+            
+        Returns:
+            True si le membre peut rester en mémoire, False s'il doit passer par le disque
+        """
+        if size > self.memory_member_limit:
+            return False
+        with self._memory_lock:
+            if size > self._memory_budget_left:
+                return False
+            self._memory_budget_left -= size
+            return True
+
+    def cleanup_dxf(self, doc: Drawing, dxf_path: DxfSource) -> bool:
+        """Nettoie en mémoire un document DXF déjà chargé en supprimant les éléments inutilisés.
+        
+        Le document nettoyé est importé tel quel : le fichier d'origine n'est ni réécrit ni relu.
+        
+        Args:
+            doc: Document DXF chargé (modifié en place)
+            dxf_path: Chemin d'origine du document (pour le journal)
+            
+        Returns:
+            True si des éléments ont été supprimés, False sinon
+        """
+        with self.stage("cleanup", source_label(dxf_path)):
+            return purge_dxf_document(doc, dxf_path, self.emit_log)
+
+    def merge_dxfs(self, dxf_paths: List[DxfSource], output_dxf: str) -> None:
+        """Fusionne tous les DXF en conservant leurs coordonnées d'origine (pour plans cadastre géoréférencés).
+        
+        Args:
+            dxf_paths: Liste des sources DXF à fusionner (fichiers ou membres en mémoire)
+            output_dxf: Chemin du fichier de sortie dans le format choisi (voir output_path) ;
+                en sortie découpée, chemin de assemblage.dxf (les DXF sont écrits à côté)
+        """
+        cache = self._open_cache()
+        self._geopackage = self._open_geopackage(output_dxf)
+        try:
+            if self.shard_by:
+                if self.incremental:
+                    self.emit_log("ℹ️ Mise à jour incrémentale indisponible en sortie découpée : assemblage complet")
+                if self._simplify_settings() is not None:
+                    self.emit_log("ℹ️ Simplification indisponible en sortie découpée (limites entre DXF non raccordées)")
+                remove_merge_manifest(output_dxf)
+                self._merge_dxfs_sharded(dxf_paths, output_dxf, cache)
+                return
+
+            if self.incremental and self.streaming:
+                self.emit_log("ℹ️ Mise à jour incrémentale indisponible en écriture en flux : assemblage complet")
+            if not self.incremental or self.streaming:
+                # Un manifeste d'une exécution précédente ne décrit plus la nouvelle sortie
+                remove_merge_manifest(output_dxf)
+                if self.merge_workers > 1 and len(dxf_paths) > 1:
+                    self._merge_dxfs_parallel(dxf_paths, output_dxf, cache)
+                else:
+                    self._merge_dxfs_serial(dxf_paths, output_dxf, cache)
+                return
+
+            sources = [(source, self.source_id(source), source_digest(source)) for source in dxf_paths]
+            manifest = load_merge_manifest(output_dxf, self.do_cleanup, self.output_format,
+                                       self._simplify_settings())
+            if manifest is not None:
+                self._merge_dxfs_incremental(sources, output_dxf, manifest, cache)
+                return
+            if self.kept_sources:
+                # Les archives non extraites ne peuvent pas être réimportées
+                raise RuntimeError("Assemblage modifié pendant le traitement : relancez la mise à jour")
+
+            self.emit_log("ℹ️ Aucun manifeste valide pour la sortie existante : assemblage complet")
+            remove_merge_manifest(output_dxf)
+            handles_by_source = {}
+            if self.merge_workers > 1 and len(dxf_paths) > 1:
+                self._merge_dxfs_parallel(dxf_paths, output_dxf, cache, handles_by_source)
+            else:
+                self._merge_dxfs_serial(dxf_paths, output_dxf, cache, handles_by_source)
+            if self.is_stopped():
+                return
+            if not handles_by_source:
+                self.emit_log("⚠️ Manifeste non enregistré : la prochaine exécution refera un assemblage complet")
+            else:
+                entries = {
+                    sid: {"digest": digest, "handles": handles_by_source.get(idx, []),
+                          "extents": self._extents_entry(sid)}
+                    for idx, (_, sid, digest) in enumerate(sources) if digest is not None
+                }
+                save_merge_manifest(output_dxf, self.do_cleanup, entries, self.output_format,
+                                    self._archive_manifest(entries), self._simplify_settings())
+                self.emit_log(f"🗂️ Manifeste enregistré : {merge_manifest_path(output_dxf)}")
+        except BaseException:
+            self._discard_geopackage()
+            raise
+        finally:
+            self._finish_geopackage()
+            if cache is not None:
+                self._close_cache(cache)
+
+    def source_id(self, source: DxfSource) -> str:
+        """Identifiant stable d'une source d'une exécution à l'autre (archive/membre ou chemin absolu)."""
+        if isinstance(source, DxfMemorySource):
+            return source.name
+        return self.source_ids.get(source) or os.path.abspath(source)
+
+    def _extents_entry(self, sid: str) -> Optional[List[float]]:
+        """Emprise d'une source sous la forme enregistrée dans le manifeste."""
+        box = self.source_extents.get(sid)
+        return box.as_list() if box is not None else None
+
+    def _simplify_settings(self) -> Optional[dict]:
+        """Simplification appliquée à l'assemblage, telle qu'enregistrée dans le manifeste (None si aucune)."""
+        if self.simplify_tolerance is None and self.coordinate_precision is None:
+            return None
+        return {"tolerance": self.simplify_tolerance, "precision": self.coordinate_precision}
+
+    def _merge_dxfs_incremental(self, sources: List[Tuple[DxfSource, str, Optional[str]]],
+                                output_dxf: str, manifest: dict, cache: Optional[SourceCache] = None) -> None:
+        """Met à jour l'assemblage existant : retire les entités des sources supprimées ou
+        modifiées, puis importe uniquement les sources nouvelles ou modifiées.
+        
+        Args:
+            sources: Liste (source, identifiant, empreinte) des sources actuelles
+            output_dxf: Chemin du fichier DXF assemblé existant
+            manifest: Manifeste de l'assemblage existant
+            cache: Cache des sources, ou None
+        """
+        known = manifest["sources"]
+        # Sources des archives inchangées (non extraites) : reprises du manifeste
+        kept = {sid for sid in self.kept_sources if sid in known}
+        current_ids = {sid for _, sid, _ in sources} | kept
+        unchanged = kept | {sid for _, sid, digest in sources
+                            if digest is not None and sid in known and known[sid]["digest"] == digest}
+        stale = [sid for sid in known if sid not in unchanged]
+        to_import = [(source, sid, digest) for source, sid, digest in sources if sid not in unchanged]
+        removed = sum(1 for sid in stale if sid not in current_ids)
+
+        # Les emprises des sources inchangées sont reprises du manifeste
+        for sid in unchanged:
+            self.source_extents[sid] = Extents.from_list(known[sid].get("extents"))
+
+        self.emit_log(f"🔄 Mise à jour incrémentale : {len(unchanged)} source(s) inchangée(s), "
+                      f"{len(to_import)} à importer, {removed} supprimée(s)")
+        if not stale and not to_import:
+            if manifest.get("archives") != self._archive_manifest(known):
+                # Archive réécrite à l'identique : seules les dates du manifeste changent
+                save_merge_manifest(output_dxf, self.do_cleanup, known, self.output_format,
+                                    self._archive_manifest(known), self._simplify_settings())
+            self.emit_log("✅ Assemblage déjà à jour")
+            if self._geopackage is not None:
+                self._export_current_assembly(output_dxf)
+            return
+
+        with self.stage("parse", os.path.basename(output_dxf)):
+            doc_final = read_assembly(output_dxf)
+        msp = doc_final.modelspace()
+
+        # Retirer les entités des sources supprimées ou modifiées
+        deleted = 0
+        for sid in stale:
+            for handle in known[sid]["handles"]:
+                entity = doc_final.entitydb.get(handle)
+                if entity is not None and entity.is_alive:
+                    doc_final.entitydb.delete_entity(entity)
+                    deleted += 1
+        if deleted:
+            msp.purge()
+            doc_final.entitydb.purge()
+            self.emit_log(f"   🗑️ {deleted} entité(s) retirée(s) de l'assemblage")
+
+        entries = {sid: known[sid] for sid in unchanged}
+        dedup = ImportDeduplicator(doc_final) if self.dedup_blocks else None
+        imported_entities = 0
+        merged_files = 0
+        total = len(to_import)
+        for idx, (source, sid, digest) in enumerate(to_import, start=1):
+            if self.is_stopped():
+                return
+            doc_src, error_msg = load_clean_dxf(source, self.do_cleanup, self.emit_log, cache, self.metrics)
+            handles = []
+            if doc_src is None:
+                self.emit_log(f"⚠️ Fichier ignoré : {error_msg}")
+            else:
+                try:
+                    self.source_extents[sid] = log_source_extents(
+                        doc_src, source, self.emit_log, self.approximate_extents, self.metrics)
+                    imported_entities += import_dxf_document(doc_src, doc_final, source, self.emit_log, handles,
+                                                             self.metrics, dedup)
+                    merged_files += 1
+                except Exception as e:
+                    logger.warning(f"Erreur import {source}: {e}", exc_info=True)
+                    self.emit_log(f"⚠️ Erreur import {source_label(source)}: {e}")
+                finally:
+                    doc_src = None
+            if isinstance(source, DxfMemorySource):
+                source.release()
+            if digest is not None:
+                entries[sid] = {"digest": digest, "handles": handles,
+                                "extents": self._extents_entry(sid)}
+            # Progression 40..92 % pendant fusion
+            self.emit_progress(40 + int(52 * idx / max(1, total)))
+
+        self.counts["dxf_merged"] = merged_files
+        self._record_dedup(dedup.stats() if dedup is not None else {})
+        self._save_merged_output(doc_final, output_dxf, imported_entities)
+        save_merge_manifest(output_dxf, self.do_cleanup, entries, self.output_format,
+                            self._archive_manifest(entries), self._simplify_settings())
+
+    def _open_cache(self) -> Optional[SourceCache]:
+        """Ouvre le cache des sources si activé (None sinon ou si le dossier est inaccessible)."""
+        if not self.cache_dir:
+            return None
+        try:
+            cache = SourceCache(self.cache_dir, self.do_cleanup, self.cache_max_bytes)
+        except OSError as e:
+            self.emit_log(f"⚠️ Cache des sources indisponible : {e}")
+            return None
+        self.emit_log(f"💾 Cache des sources : {self.cache_dir}")
+        return cache
+
+    def _close_cache(self, cache: SourceCache) -> None:
+        """Enregistre l'index du cache et journalise son bilan."""
+        try:
+            evicted = cache.flush()
+        except OSError as e:
+            self.emit_log(f"⚠️ Index du cache non enregistré : {e}")
+            return
+        self.counts["cache_hits"] = cache.hits
+        self.counts["cache_misses"] = cache.misses
+        self.emit_log(f"💾 Cache : {cache.hits} source(s) réutilisée(s), {cache.misses} analysée(s)"
+                      + (f", {evicted} entrée(s) évincée(s)" if evicted else ""))
+
+    def _merge_dxfs_serial(self, dxf_paths: List[DxfSource], output_dxf: str,
+                           cache: Optional[SourceCache] = None,
+                           handles_by_source: Optional[dict] = None) -> None:
+        """Fusion séquentielle dans le thread de traitement.
+        
+        Args:
+            dxf_paths: Liste des sources DXF à fusionner
+            output_dxf: Chemin du fichier DXF de sortie
+            cache: Cache des sources, ou None
+            handles_by_source: Si fourni, reçoit pour chaque indice de source les handles
+                des entités créées dans l'assemblage
+        """
+        # Créer un DXF final (R2010 pour compatibilité large)
+        doc_final = ezdxf.new("R2010")
+        dedup = ImportDeduplicator(doc_final) if self.dedup_blocks else None
+        total = len(dxf_paths)
+        imported_entities = 0
+        merged_files = 0
+
+        self.emit_log(f"🗺️ Assemblage de {total} fichiers cadastre avec coordonnées géographiques d'origine")
+
+        with self._entity_spool(doc_final, output_dxf) as spool:
+            # Progression démarre à ~40% (après extraction/recherche)
+            for idx, path in enumerate(dxf_paths, start=1):
+                if self.is_stopped():
+                    return
+            
+                if self.single_parse:
+                    # Lecture unique : le document chargé sert à la validation, au nettoyage et à l'import
+                    doc_src, error_msg = load_clean_dxf(path, self.do_cleanup, self.emit_log, cache, self.metrics)
+                    if doc_src is None:
+                        self.emit_log(f"⚠️ Fichier ignoré : {error_msg}")
+                        if isinstance(path, DxfMemorySource):
+                            path.release()
+                        self.emit_progress(40 + int(52 * idx / max(1, total)))
+                        continue
+            
+                try:
+                    if not self.single_parse:
+                        with self.stage("parse", source_label(path)):
+                            doc_src = ezdxf.readfile(path)
+                        if self.do_cleanup:
+                            # Nettoyage optionnel en mémoire, sur le document qui sera importé
+                            self.cleanup_dxf(doc_src, path)
+                    handles = handles_by_source.setdefault(idx - 1, []) if handles_by_source is not None else None
+                    self.source_extents[self.source_id(path)] = log_source_extents(
+                        doc_src, path, self.emit_log, self.approximate_extents, self.metrics)
+                    imported_entities += import_dxf_document(doc_src, doc_final, path, self.emit_log, handles,
+                                                             self.metrics, dedup)
+                    if spool is not None:
+                        self._export_geopackage(doc_final.modelspace(), source_label(path))
+                        with self.stage("spool", source_label(path)):
+                            spool.flush()
+                    merged_files += 1
+                except Exception as e:
+                    logger.warning(f"Erreur import {path}: {e}", exc_info=True)
+                    self.emit_log(f"⚠️ Erreur import {source_label(path)}: {e}")
+                finally:
+                    # Libérer le document source avant de charger le suivant
+                    doc_src = None
+                    if isinstance(path, DxfMemorySource):
+                        path.release()
+
+                # Progression 40..92 % pendant fusion
+                self.emit_progress(40 + int(52 * idx / max(1, total)))
+
+            self.counts["dxf_merged"] = merged_files
+            if self.single_parse:
+                if not merged_files:
+                    raise RuntimeError("Aucun fichier DXF valide trouvé.")
+                self.emit_log(f"✅ {merged_files} fichier(s) DXF valide(s) sur {total}")
+
+            self._record_dedup(dedup.stats() if dedup is not None else {})
+            self._save_merged_output(doc_final, output_dxf, imported_entities, spool)
+
+    def _merge_dxfs_parallel(self, dxf_paths: List[DxfSource], output_dxf: str,
+                             cache: Optional[SourceCache] = None,
+                             handles_by_source: Optional[dict] = None) -> None:
+        """Fusion parallèle : des processus de travail chargent, nettoient et importent
+        des lots de DXF dans des documents partiels, combinés ensuite dans l'ordre des lots.
+        
+        Args:
+            dxf_paths: Liste des sources DXF à fusionner
+            output_dxf: Chemin du fichier DXF de sortie
+            cache: Cache des sources, ou None
+            handles_by_source: Si fourni, reçoit pour chaque indice de source les handles
+                des entités créées dans l'assemblage
+        """
+        total = len(dxf_paths)
+        workers = min(self.merge_workers, total)
+        batch_size = max(1, min(MERGE_BATCH_MAX_FILES, math.ceil(total / (workers * 4))))
+        batches = [dxf_paths[i:i + batch_size] for i in range(0, total, batch_size)]
+
+        self.emit_log(f"🗺️ Assemblage de {total} fichiers cadastre avec coordonnées géographiques d'origine")
+        self.emit_log(f"⚙️ Fusion parallèle : {workers} processus, {len(batches)} lot(s) de {batch_size} fichier(s) max")
+
+        doc_final = ezdxf.new("R2010")
+        msp_final = doc_final.modelspace()
+        dedup = ImportDeduplicator(doc_final) if self.dedup_blocks else None
+        imported_entities = 0
+        merged_files = 0
+        done_files = 0
+
+        # "spawn" : les processus de travail ne doivent pas hériter de l'état Qt du processus principal
+        ctx = multiprocessing.get_context("spawn")
+        stop_event = ctx.Event()
+
+        with temp_directory(prefix="dxf_partials_") as partial_dir, \
+                self._entity_spool(doc_final, output_dxf) as spool:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                           initializer=_init_merge_process, initargs=(stop_event,))
+            try:
+                futures = {}
+                for batch_idx, batch in enumerate(batches):
+                    partial_dxf = os.path.join(partial_dir, f"partiel_{batch_idx:05d}.dxf")
+                    fut = executor.submit(merge_dxf_batch, batch, partial_dxf, self.do_cleanup, cache,
+                                          self.metrics, self.approximate_extents, self.dedup_blocks)
+                    futures[fut] = batch_idx
+
+                # Les lots terminés sont combinés dans l'ordre de soumission (sortie déterministe)
+                results = {}
+                next_batch = 0
+                pending = set(futures)
+                while pending:
+                    if self.is_stopped():
+                        stop_event.set()
+                        for fut in pending:
+                            fut.cancel()
+                        return
+
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        batch_idx = futures[fut]
+                        try:
+                            result = fut.result()
+                        except Exception as e:
+                            logger.warning(f"Erreur lot {batch_idx}: {e}", exc_info=True)
+                            self.emit_log(f"⚠️ Erreur du lot {batch_idx + 1}: {e}")
+                            result = {"partial": None, "files": len(batches[batch_idx]),
+                                      "merged": 0, "entities": 0, "counts": [], "extents": [], "dedup": {},
+                                      "messages": [],
+                                      "cache_hits": 0, "cache_misses": 0, "cache_touched": {},
+                                      "metrics": []}
+                        for msg in result["messages"]:
+                            self.emit_log(msg)
+                        self.metrics.extend(result["metrics"])
+                        self._record_dedup(result["dedup"])
+                        if cache is not None:
+                            cache.record(result["cache_touched"])
+                            cache.hits += result["cache_hits"]
+                            cache.misses += result["cache_misses"]
+                        for source, box in zip(batches[batch_idx], result["extents"]):
+                            if box is not None:
+                                self.source_extents[self.source_id(source)] = Extents.from_list(box)
+                        for source in batches[batch_idx]:
+                            if isinstance(source, DxfMemorySource):
+                                source.release()
+                        done_files += result["files"]
+                        results[batch_idx] = result
+                        # Progression 40..92 % pendant fusion
+                        self.emit_progress(40 + int(52 * done_files / max(1, total)))
+
+                    while next_batch in results:
+                        result = results.pop(next_batch)
+                        first_source = next_batch * batch_size
+                        next_batch += 1
+                        if not result["partial"]:
+                            continue
+                        partial_name = os.path.basename(result["partial"])
+                        try:
+                            with self.stage("parse", partial_name):
+                                doc_partial = ezdxf.readfile(result["partial"])
+                            first_new = len(msp_final)
+                            with self.stage("import", partial_name):
+                                importer = dedup.importer(doc_partial) if dedup is not None \
+                                    else Importer(doc_partial, doc_final)
+                                importer.import_modelspace()
+                            with self.stage("finalize", partial_name):
+                                importer.finalize()
+                            imported_entities += result["entities"]
+                            merged_files += result["merged"]
+                            if handles_by_source is not None and not self._split_partial_handles(
+                                    msp_final[first_new:], result["counts"], first_source, handles_by_source):
+                                # Correspondance impossible : pas de manifeste, la prochaine exécution refera tout
+                                logger.warning("Entités du document partiel non attribuables aux sources")
+                                handles_by_source.clear()
+                                handles_by_source = None
+                            if spool is not None:
+                                self._export_geopackage(doc_final.modelspace(), partial_name)
+                                with self.stage("spool", partial_name):
+                                    spool.flush()
+                        except Exception as e:
+                            logger.warning(f"Erreur combinaison lot {next_batch}: {e}", exc_info=True)
+                            self.emit_log(f"⚠️ Erreur combinaison du lot {next_batch}: {e}")
+                        finally:
+                            doc_partial = None
+                            try:
+                                os.remove(result["partial"])
+                            except OSError:
+                                pass
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+            self.counts["dxf_merged"] = merged_files
+            if not merged_files:
+                raise RuntimeError("Aucun fichier DXF valide trouvé.")
+            self.emit_log(f"✅ {merged_files} fichier(s) DXF valide(s) sur {total}")
+
+            self._record_dedup(dedup.stats() if dedup is not None else {})
+            self._save_merged_output(doc_final, output_dxf, imported_entities, spool)
+
+    def _merge_dxfs_sharded(self, dxf_paths: List[DxfSource], output_dxf: str,
+                            cache: Optional[SourceCache] = None) -> None:
+        """Fusion découpée : chaque source est importée dans le DXF de son archive, de sa dalle
+        ou du lot en cours, et chaque DXF est écrit dès qu'il est complet (voir ShardWriter).
+        
+        Args:
+            dxf_paths: Liste des sources DXF à fusionner
+            output_dxf: Chemin de l'assemblage (les DXF découpés sont écrits à côté)
+            cache: Cache des sources, ou None
+        """
+        removed = remove_shards(output_dxf)
+        if removed:
+            self.emit_log(f"🗑️ {removed} DXF découpé(s) de l'exécution précédente supprimé(s)")
+        writer = ShardWriter(output_dxf, self.shard_by, self.shard_tile_size, self.shard_max_entities,
+                             self.emit_log, self.metrics, self.spatial_index, self.approximate_extents,
+                             self.dedup_blocks, self.output_format, self._export_geopackage)
+        total = len(dxf_paths)
+        imported_entities = 0
+        merged_files = 0
+
+        self.emit_log(f"🧱 Assemblage découpé ({self.shard_by}) de {total} fichiers cadastre "
+                      f"avec coordonnées géographiques d'origine")
+        if self.merge_workers > 1:
+            self.emit_log("ℹ️ Sortie découpée : fusion séquentielle")
+        if self.spatial_index and self.output_format != "ascii":
+            self.emit_log("ℹ️ Index spatial disponible uniquement pour une sortie DXF texte (ascii)")
+
+        for idx, path in enumerate(dxf_paths, start=1):
+            if self.is_stopped():
+                writer.discard()
+                return
+            doc_src, error_msg = load_clean_dxf(path, self.do_cleanup, self.emit_log, cache, self.metrics)
+            if doc_src is None:
+                self.emit_log(f"⚠️ Fichier ignoré : {error_msg}")
+            else:
+                sid = self.source_id(path)
+                try:
+                    box = log_source_extents(doc_src, path, self.emit_log, self.approximate_extents, self.metrics)
+                    self.source_extents[sid] = box
+                    entities_in = writer.add(doc_src, sid, box, source_label(path))
+                    imported_entities += entities_in
+                    merged_files += 1
+                    self.emit_log(f"   ✅ {entities_in} entité(s) importée(s) aux coordonnées d'origine")
+                except Exception as e:
+                    logger.warning(f"Erreur import {path}: {e}", exc_info=True)
+                    self.emit_log(f"⚠️ Erreur import {source_label(path)}: {e}")
+                finally:
+                    doc_src = None
+            if isinstance(path, DxfMemorySource):
+                path.release()
+            # Progression 40..92 % pendant fusion
+            self.emit_progress(40 + int(52 * idx / max(1, total)))
+
+        shards = writer.close()
+        self._record_dedup(writer.dedup_stats())
+        self._log_dedup()
+        self.counts["dxf_merged"] = merged_files
+        self.counts["entities"] = imported_entities
+        self.counts["shards"] = len(shards)
+        if not merged_files:
+            raise RuntimeError("Aucun fichier DXF valide trouvé.")
+        self.emit_log(f"✅ {merged_files} fichier(s) DXF valide(s) sur {total}")
+        self.emit_log(f"📄 Total entités importées : {imported_entities} dans {len(shards)} DXF")
+        self.emit_log(f"🗂️ Index des DXF découpés : {shards_index_path(output_dxf)}")
+
+    @contextmanager
+    def _entity_spool(self, doc_final: Drawing, output_dxf: str) -> Iterator[Optional[EntitySpool]]:
+        """Fichier temporaire de la section ENTITIES en écriture en flux (None sinon), supprimé en sortie.
+        
+        Args:
+            doc_final: Document assemblé
+            output_dxf: Chemin du fichier de sortie (le fichier temporaire est écrit à côté)
+        """
+        if not self.streaming:
+            yield None
+            return
+        spool = EntitySpool(doc_final, self.output_format, os.path.dirname(os.path.abspath(output_dxf)))
+        self.emit_log("🌊 Écriture en flux : entités de chaque source écrites dès leur import")
+        try:
+            yield spool
+        finally:
+            spool.close()
+
+    def _record_dedup(self, stats: dict) -> None:
+        """Cumule le bilan d'un dédoublonneur (ImportDeduplicator.stats) dans les compteurs."""
+        for key, count_key in _DEDUP_COUNTS.items():
+            if stats.get(key):
+                self.counts[count_key] = self.counts.get(count_key, 0) + stats[key]
+
+    def _log_dedup(self) -> None:
+        """Journalise le bilan du dédoublonnage des blocs et des tables."""
+        reused = self.counts.get("blocks_deduplicated", 0)
+        if reused:
+            saved = self.counts.get("dedup_bytes_saved", 0)
+            self.emit_log(f"♻️ {reused} définition(s) de bloc identique(s) réutilisée(s), "
+                          f"~{saved / 1024:.1f} Ko évités")
+        conflicts = self.counts.get("table_conflicts", 0)
+        if conflicts:
+            self.emit_log(f"⚠️ {conflicts} entrée(s) de table homonyme(s) mais différente(s) : "
+                          f"première définition conservée")
+
+    @staticmethod
+    def _split_partial_handles(new_entities: list, counts: List[int], first_source: int,
+                               handles_by_source: dict) -> bool:
+        """Répartit les entités issues d'un document partiel entre les sources de son lot.
+        
+        Args:
+            new_entities: Entités ajoutées à l'assemblage par le document partiel
+            counts: Nombre d'entités de chaque source du lot, dans l'ordre
+            first_source: Indice de la première source du lot
+            handles_by_source: Reçoit les handles par indice de source
+            
+        Returns:
+            False si les entités ne correspondent pas aux nombres annoncés
+        """
+        if sum(counts) != len(new_entities):
+            return False
+        pos = 0
+        for offset, count in enumerate(counts):
+            handles_by_source[first_source + offset] = [e.dxf.handle for e in new_entities[pos:pos + count]]
+            pos += count
+        return True
+
+    def _simplify_output(self, doc_final: Drawing, output_dxf: str) -> None:
+        """Arrondit les coordonnées et simplifie les polylignes de l'assemblage, puis journalise le bilan.
+        
+        Appliquée au document complet : les limites partagées entre feuilles y sont toutes
+        présentes et restent raccordées (voir simplify_document).
+        
+        Args:
+            doc_final: Document assemblé
+            output_dxf: Chemin du fichier DXF de sortie
+        """
+        with self.stage("simplify", os.path.basename(output_dxf)):
+            stats = simplify_document(doc_final, self.simplify_tolerance, self.coordinate_precision)
+        self.counts["simplify_vertices_before"] = stats.vertices_before
+        self.counts["simplify_vertices_after"] = stats.vertices_after
+        self.counts["simplify_junctions"] = stats.junctions
+        self.counts["coordinates_rounded"] = stats.rounded
+        self.counts["simplify_bytes_saved"] = stats.bytes_saved
+        if self.simplify_tolerance is not None:
+            removed = stats.vertices_before - stats.vertices_after
+            share = 100.0 * removed / stats.vertices_before if stats.vertices_before else 0.0
+            self.emit_log(f"✂️ Simplification (tolérance {self.simplify_tolerance:g}) : "
+                          f"{stats.vertices_before} → {stats.vertices_after} sommet(s) (-{share:.1f} %), "
+                          f"{stats.simplified} entité(s) simplifiée(s), {stats.junctions} jonction(s) conservée(s)")
+        if self.coordinate_precision is not None:
+            self.emit_log(f"🎯 {stats.rounded} coordonnée(s) arrondie(s) à {self.coordinate_precision} décimale(s)")
+        self.emit_log(f"   ~{stats.bytes_saved / (1024 * 1024):.1f} Mo évités (estimation DXF texte)")
+
+    def _open_geopackage(self, output_dxf: str) -> Optional[GeoPackageWriter]:
+        """Ouvre l'export GeoPackage si activé (None sinon ou si le fichier ne peut pas être créé)."""
+        if not self.geopackage:
+            return None
+        path = geopackage_path(output_dxf)
+        try:
+            return GeoPackageWriter(path, self.geopackage_srs)
+        except (RuntimeError, OSError, sqlite3.Error) as e:
+            logger.warning(f"Export GeoPackage indisponible {path}: {e}", exc_info=True)
+            self.emit_log(f"⚠️ Export GeoPackage indisponible : {e}")
+            remove_geopackage(output_dxf)
+            return None
+
+    def _export_geopackage(self, entities: Iterable[DXFEntity], label: str) -> None:
+        """Exporte des entités de l'assemblage dans le GeoPackage (sans effet si l'export est désactivé).
+
+        Une erreur d'écriture abandonne l'export sans interrompre l'assemblage.
+
+        Args:
+            entities: Entités à exporter (assemblage, source en flux ou DXF découpé)
+            label: Nom de l'élément exporté (mesures)
+        """
+        if self._geopackage is None:
+            return
+        try:
+            with self.stage("geopackage", label):
+                self._geopackage.add(entities)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Erreur export GeoPackage {label}: {e}", exc_info=True)
+            self.emit_log(f"⚠️ Export GeoPackage abandonné : {e}")
+            self._geopackage.discard(remove_existing=True)
+            self._geopackage = None
+
+    def _export_current_assembly(self, output_dxf: str) -> None:
+        """Assemblage à jour : conserve le GeoPackage existant s'il est aussi récent, sinon l'exporte
+        depuis l'assemblage relu."""
+        path = geopackage_path(output_dxf)
+        try:
+            current = os.path.getmtime(path) >= os.path.getmtime(output_dxf)
+        except OSError:
+            current = False
+        if current:
+            self._geopackage.discard()
+            self._geopackage = None
+            return
+        with self.stage("parse", os.path.basename(output_dxf)):
+            doc_final = read_assembly(output_dxf)
+        self._export_geopackage(doc_final.modelspace(), os.path.basename(output_dxf))
+
+    def _discard_geopackage(self) -> None:
+        """Abandonne l'export GeoPackage en cours (assemblage en erreur)."""
+        if self._geopackage is not None:
+            self._geopackage.discard()
+            self._geopackage = None
+
+    def _finish_geopackage(self) -> None:
+        """Termine l'export GeoPackage en cours et journalise son bilan (abandonné si le traitement est arrêté)."""
+        writer, self._geopackage = self._geopackage, None
+        if writer is None:
+            return
+        if self.is_stopped():
+            writer.discard()
+            return
+        if not writer.features:
+            writer.discard(remove_existing=True)
+            self.emit_log("ℹ️ GeoPackage non écrit : aucune entité exportable")
+            return
+        try:
+            with self.stage("geopackage", os.path.basename(writer.path)):
+                report = writer.close()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Erreur export GeoPackage {writer.path}: {e}", exc_info=True)
+            self.emit_log(f"⚠️ GeoPackage non écrit : {e}")
+            writer.discard(remove_existing=True)
+            return
+        self.counts["geopackage_features"] = report["features"]
+        self.counts["geopackage_skipped"] = sum(report["skipped"].values())
+        self.counts["geopackage_bytes"] = report["bytes"]
+        tables = ", ".join(f"{name} {count}" for name, count in report["tables"].items())
+        self.emit_log(f"🌐 {os.path.basename(report['path'])} : {report['features']} entité(s) ({tables}), "
+                      f"{report['bytes'] / (1024 * 1024):.1f} Mo")
+        if report["skipped"]:
+            skipped = ", ".join(f"{kind} {count}" for kind, count in sorted(report["skipped"].items()))
+            self.emit_log(f"   ℹ️ Non exportées (sans équivalent SIG) : {skipped}")
+
+    def _save_merged_output(self, doc_final: Drawing, output_dxf: str, imported_entities: int,
+                            spool: Optional[EntitySpool] = None) -> None:
+        """Sauvegarde le document assemblé et journalise le bilan.
+        
+        Args:
+            doc_final: Document assemblé
+            output_dxf: Chemin du fichier DXF de sortie
+            imported_entities: Nombre total d'entités importées
+            spool: Section ENTITIES déjà écrite (écriture en flux), ou None
+        """
+        if spool is not None:
+            self.counts["streamed_entities"] = spool.entities
+            self.emit_log(f"🌊 {spool.entities} entité(s) écrite(s) en flux "
+                          f"({spool.size / (1024 * 1024):.1f} Mo), recopiée(s) dans la sortie")
+        if self._simplify_settings() is not None:
+            if spool is not None:
+                self.emit_log("ℹ️ Simplification indisponible en écriture en flux (entités déjà écrites)")
+            else:
+                self._simplify_output(doc_final, output_dxf)
+        start = time.perf_counter()
+        with self.stage("saveas", os.path.basename(output_dxf)):
+            size = write_dxf(doc_final, output_dxf, self.output_format, spool)
+        self.counts["output_bytes"] = size
+        self.emit_log(f"💾 {os.path.basename(output_dxf)} ({self.output_format}) : "
+                      f"{size / (1024 * 1024):.1f} Mo écrits en {time.perf_counter() - start:.1f} s")
+        
+        # S'assurer que le fichier n'est pas en lecture seule
+        try:
+            os.chmod(output_dxf, 0o666)
+        except Exception:
+            pass
+
+        # Un index d'une exécution précédente ne décrit plus la nouvelle sortie
+        remove_spatial_index(output_dxf)
+        if self.spatial_index and self.output_format != "ascii":
+            self.emit_log("ℹ️ Index spatial disponible uniquement pour une sortie DXF texte (ascii)")
+        elif self.spatial_index and spool is not None:
+            self.emit_log("ℹ️ Index spatial indisponible en écriture en flux (entités déjà libérées)")
+        elif self.spatial_index:
+            try:
+                with self.stage("index", os.path.basename(output_dxf)):
+                    index_path = build_spatial_index(doc_final, output_dxf, self.source_extents,
+                                                     self.approximate_extents)
+                self.emit_log(f"🧭 Index spatial enregistré : {index_path}")
+            except Exception as e:
+                logger.warning(f"Erreur index spatial {output_dxf}: {e}", exc_info=True)
+                self.emit_log(f"⚠️ Index spatial non enregistré : {e}")
+
+        if spool is None:
+            # En flux, les entités ont été exportées source par source avant leur libération
+            self._export_geopackage(doc_final.modelspace(), os.path.basename(output_dxf))
+        
+        self.counts["entities"] = imported_entities
+        self._log_dedup()
+        self.emit_log(f"📄 Total entités importées : {imported_entities}")
+        self.emit_log("🗺️ Plan cadastre assemblé avec coordonnées géographiques conservées")
+
+
+def run_assembly(options: dict, listener: Optional[EngineListener] = None) -> dict:
+    """Exécute une tâche d'assemblage et retourne son bilan.
+    
+    Fonction de module aux arguments sérialisables : utilisable telle quelle avec
+    un ProcessPoolExecutor (sans auditeur) pour répartir des tâches entre processus.
+    
+    Args:
+        options: Arguments nommés d'AssemblyEngine
+        listener: Auditeur des événements, ou None
+        
+    Returns:
+        Bilan de l'exécution (voir AssemblyEngine.summary)
+    """
+    engine = AssemblyEngine(**options)
+    if listener is not None:
+        engine.add_listener(listener)
+    engine.run()
+    return engine.summary()
+
+
+async def run_engines_async(engines: List[AssemblyEngine], max_concurrent: Optional[int] = None,
+                            executor=None) -> List[dict]:
+    """Exécute plusieurs moteurs en parallèle depuis asyncio.
+    
+    Args:
+        engines: Moteurs à exécuter (leurs auditeurs reçoivent les événements)
+        max_concurrent: Nombre maximal de tâches simultanées (None = sans limite)
+        executor: Exécuteur des traitements (None = exécuteur par défaut de la boucle)
+        
+    Returns:
+        Bilans des exécutions, dans l'ordre des moteurs
+    """
+    semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+    async def run_one(engine: AssemblyEngine) -> dict:
+        if semaphore is None:
+            return await engine.run_async(executor)
+        async with semaphore:
+            return await engine.run_async(executor)
+
+    return list(await asyncio.gather(*(run_one(engine) for engine in engines)))
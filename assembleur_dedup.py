@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : dédoublonnage des définitions de blocs et des tables à l'import
+- Empreinte de contenu de chaque définition de bloc (géométrie, attributs, point de base,
+  blocs imbriqués) calculée sans les handles ni les propriétaires
+- Un bloc dont une définition identique, de même nom ou renommée depuis ce nom, existe déjà
+  dans le document cible n'est pas réimporté : ses références (INSERT) y sont redirigées
+- Les entrées de table homonymes (calques, types de ligne, styles) sont comparées par contenu :
+  identiques, elles sont partagées ; différentes, la définition déjà présente est conservée
+  (comportement d'ezdxf) et le conflit est compté
+- Bilan : définitions réutilisées et octets DXF évités (estimation de la sortie texte)
+
+Les blocs anonymes (*U, *D…), les présentations et les références externes sont importés tels quels.
+"""
+
+import hashlib
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from ezdxf.addons import Importer
+from ezdxf.document import Drawing
+from ezdxf.lldxf import const
+from ezdxf.lldxf.tagwriter import TagCollector
+
+logger = logging.getLogger(__name__)
+
+
+# Codes de groupe ignorés par les empreintes : handles, propriétaires et pointeurs
+# (propres à chaque document), groupes d'application (102)
+_POINTER_CODES = frozenset([5, 102, 105, 1005, 480, 481] + list(range(320, 370)) + list(range(390, 400)))
+
+# Entités dont le code 2 désigne un bloc (remplacé par l'empreinte de ce bloc)
+_BLOCK_REFERENCE_TYPES = ("INSERT", "DIMENSION")
+
+# Entrée d'en-tête d'un bloc : son nom (codes 2 et 3) ne fait pas partie du contenu
+_BLOCK_NAME_CODES = (2, 3)
+
+# Nom renommé par l'Importer en cas de collision : nom d'origine suivi d'un numéro
+_RENAMED_SUFFIX = re.compile(r"\d+")
+
+
+def _tags(entity, dxfversion: str) -> list:
+    collector = TagCollector(dxfversion=dxfversion)
+    entity.export_dxf(collector)
+    return collector.tags
+
+
+def _tag_bytes(tags: list) -> int:
+    """Taille estimée des balises dans un DXF texte (code et valeur sur deux lignes)."""
+    return sum(len(str(tag.code)) + len(str(tag.value)) + 2 for tag in tags)
+
+
+def _block_definition(doc: Drawing, name: str):
+    """Définition de bloc comparable par contenu (hors présentations et références externes), ou None."""
+    block = doc.blocks.get(name)
+    if block is None or block.block is None or block.is_any_layout:
+        return None
+    if block.block.dxf.get("flags", 0) & (const.BLK_XREF | const.BLK_XREF_OVERLAY | const.BLK_EXTERNAL):
+        return None
+    return block
+
+
+class _Fingerprints:
+    """Empreintes et tailles des définitions de blocs d'un document (mémorisées)."""
+
+    def __init__(self, doc: Drawing):
+        self.doc = doc
+        self._prints: Dict[str, Optional[str]] = {}
+        self._sizes: Dict[str, int] = {}
+
+    def block(self, name: str) -> Optional[str]:
+        """Empreinte du contenu d'un bloc, ou None s'il n'est pas dédoublonnable (anonyme compris)."""
+        if not name or name.startswith("*"):
+            return None
+        return self._content(name)
+
+    def _content(self, name: str) -> Optional[str]:
+        if name in self._prints:
+            return self._prints[name]
+        block = _block_definition(self.doc, name)
+        # Marqueur posé avant le calcul : une définition récursive n'est pas dédoublonnée
+        self._prints[name] = None
+        if block is None:
+            return None
+        dxfversion = self.doc.dxfversion
+        digest = hashlib.blake2b(digest_size=20)
+        size = 0
+        header = _tags(block.block, dxfversion)
+        size += _tag_bytes(header)
+        self._update(digest, header, skip=_BLOCK_NAME_CODES)
+        for entity in block:
+            tags = _tags(entity, dxfversion)
+            size += _tag_bytes(tags)
+            if not self._update(digest, tags):
+                return None
+        self._sizes[name] = size + _tag_bytes(_tags(block.endblk, dxfversion))
+        self._prints[name] = digest.hexdigest()
+        return self._prints[name]
+
+    def size(self, name: str) -> int:
+        """Taille estimée (octets DXF texte) d'une définition dont l'empreinte est connue."""
+        return self._sizes.get(name, 0)
+
+    def _update(self, digest, tags: list, skip: Tuple[int, ...] = ()) -> bool:
+        kind = None
+        for tag in tags:
+            code, value = tag.code, tag.value
+            if code in _POINTER_CODES or code in skip:
+                continue
+            if code == 0:
+                kind = value
+            elif code == 2 and kind in _BLOCK_REFERENCE_TYPES:
+                # Bloc imbriqué : comparé par contenu, son nom diffère d'un document à l'autre
+                value = self._content(value)
+                if value is None:
+                    return False
+                kind = None
+            digest.update(f"{code}\x1f{value!r}\x1e".encode("utf-8"))
+        return True
+
+
+class ImportDeduplicator:
+    """Dédoublonne les blocs et compare les entrées de table importés dans un même document cible.
+
+    Un dédoublonneur accompagne un document cible pendant toute la fusion : chaque import
+    passe par importer(doc_src), dont l'Importer réutilise les définitions déjà présentes.
+
+    Args:
+        doc_target: Document cible (ses blocs existants sont indexés, mise à jour incrémentale comprise)
+    """
+
+    def __init__(self, doc_target: Drawing):
+        self.target = doc_target
+        # Empreinte -> [(nom d'origine, nom dans la cible)]
+        self._blocks: Dict[str, List[Tuple[str, str]]] = {}
+        # (table, nom) -> empreinte de l'entrée de la cible
+        self._table_prints: Dict[Tuple[str, str], str] = {}
+        self.blocks_reused = 0
+        self.bytes_saved = 0
+        self.table_entries_shared = 0
+        self.table_conflicts = 0
+        target_prints = _Fingerprints(doc_target)
+        for block in doc_target.blocks:
+            fingerprint = target_prints.block(block.name)
+            if fingerprint is not None:
+                self._blocks.setdefault(fingerprint, []).append((block.name, block.name))
+
+    def importer(self, doc_src: Drawing) -> Importer:
+        """Importer du document source vers la cible, avec réutilisation des définitions identiques."""
+        return _DedupImporter(doc_src, self.target, self)
+
+    def stats(self) -> dict:
+        """Bilan du dédoublonnage (compteurs cumulés sur tous les imports)."""
+        return {
+            "blocks_reused": self.blocks_reused,
+            "bytes_saved": self.bytes_saved,
+            "table_entries_shared": self.table_entries_shared,
+            "table_conflicts": self.table_conflicts,
+        }
+
+    def match_block(self, prints: _Fingerprints, name: str) -> Optional[str]:
+        """Nom, dans la cible, d'une définition identique au bloc source `name`, ou None."""
+        fingerprint = prints.block(name)
+        if fingerprint is None:
+            return None
+        for origin, target_name in self._blocks.get(fingerprint, ()):
+            if (origin == name or target_name == name
+                    or (target_name.startswith(name) and _RENAMED_SUFFIX.fullmatch(target_name[len(name):]))):
+                if target_name in self.target.blocks:
+                    self.blocks_reused += 1
+                    self.bytes_saved += prints.size(name)
+                    return target_name
+        return None
+
+    def register_blocks(self, prints: _Fingerprints, imported: Dict[str, str]) -> None:
+        """Indexe les blocs importés (nom source -> nom cible) pour les imports suivants."""
+        for name, target_name in imported.items():
+            fingerprint = prints.block(name)
+            if fingerprint is None:
+                continue
+            entries = self._blocks.setdefault(fingerprint, [])
+            if (name, target_name) not in entries:
+                entries.append((name, target_name))
+
+    def compare_table_entry(self, table: str, source_entry, dxfversion: str) -> None:
+        """Compare une entrée de table source à l'entrée homonyme déjà présente dans la cible."""
+        name = source_entry.dxf.name
+        key = (table, name.lower())
+        target_print = self._table_prints.get(key)
+        if target_print is None:
+            target_entry = getattr(self.target.tables, table).get(name)
+            target_print = self._table_prints[key] = _table_fingerprint(target_entry, self.target.dxfversion)
+        if _table_fingerprint(source_entry, dxfversion) == target_print:
+            self.table_entries_shared += 1
+        else:
+            self.table_conflicts += 1
+            logger.debug(f"Entrée {name} de la table {table} différente de la définition conservée")
+
+
+def _table_fingerprint(entry, dxfversion: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    for tag in _tags(entry, dxfversion):
+        if tag.code not in _POINTER_CODES:
+            digest.update(f"{tag.code}\x1f{tag.value!r}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _DedupImporter(Importer):
+    """Importer qui redirige les blocs déjà présents dans la cible au lieu de les renommer."""
+
+    def __init__(self, source: Drawing, target: Drawing, dedup: ImportDeduplicator):
+        super().__init__(source, target)
+        self._dedup = dedup
+        self._prints = _Fingerprints(source)
+
+    def import_block(self, block_name: str, rename=True) -> str:
+        if rename and block_name not in self.imported_blocks:
+            target_name = self._dedup.match_block(self._prints, block_name)
+            if target_name is not None:
+                # Les références résolues par finalize() reçoivent le nom de la définition existante
+                self.imported_blocks[block_name] = target_name
+                return target_name
+        return super().import_block(block_name, rename)
+
+    def import_table(self, name: str, entries="*", replace=False) -> None:
+        if not replace and not isinstance(entries, str):
+            entries = list(entries)
+            source_table = getattr(self.source.tables, name)
+            target_table = getattr(self.target.tables, name)
+            for entry_name in entries:
+                if entry_name in target_table and entry_name in source_table:
+                    self._dedup.compare_table_entry(name, source_table.get(entry_name), self.source.dxfversion)
+        super().import_table(name, entries, replace)
+
+    def finalize(self) -> None:
+        super().finalize()
+        new_blocks = {name: target_name for name, target_name in self.imported_blocks.items()
+                      if target_name in self.target.blocks}
+        self._dedup.register_blocks(self._prints, new_blocks)
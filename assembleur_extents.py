@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : calcul rapide de l'emprise (X/Y) d'un espace objet
+- Coordonnées regroupées par type d'entité puis réduites en un seul calcul NumPy
+- Mode exact : même résultat que ezdxf.bbox.extents, qui ne traite plus que les
+  entités sans chemin rapide (textes, hachures, arcs de polylignes…)
+- Mode approximatif : sommets et points d'insertion seulement, sans géométrie des
+  blocs ni des textes
+
+Sans NumPy, le calcul revient à ezdxf.bbox.extents.
+"""
+
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from ezdxf import bbox
+from ezdxf.entities import DXFEntity
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@dataclass(frozen=True)
+class Extents:
+    """Emprise 2D d'un ensemble d'entités (coordonnées SCG)."""
+    xmin: float
+    ymin: float
+    xmax: float
+    ymax: float
+
+    def as_list(self) -> List[float]:
+        return [self.xmin, self.ymin, self.xmax, self.ymax]
+
+    @classmethod
+    def from_list(cls, values: Optional[Sequence[float]]) -> Optional["Extents"]:
+        """Relit une emprise enregistrée par as_list (None si absente)."""
+        if not values:
+            return None
+        return cls(*map(float, values))
+
+    def union(self, other: Optional["Extents"]) -> "Extents":
+        if other is None:
+            return self
+        return Extents(min(self.xmin, other.xmin), min(self.ymin, other.ymin),
+                       max(self.xmax, other.xmax), max(self.ymax, other.ymax))
+
+
+# Extrusion par défaut : SCO confondu avec le SCG
+WCS_EXTRUSION = (0.0, 0.0, 1.0)
+
+# Nombre de valeurs par sommet de LWPOLYLINE (x, y, largeur début, largeur fin, renflement)
+LWPOLYLINE_VERTEX_SIZE = 5
+
+# Types réduits à leur point d'insertion en mode approximatif
+_INSERTION_POINT_TYPES = {"INSERT": "insert", "TEXT": "insert", "MTEXT": "insert"}
+
+
+def in_wcs(entity: DXFEntity) -> bool:
+    """Vrai si l'entité est dessinée dans le plan XY du SCG (coordonnées SCO = SCG)."""
+    return tuple(entity.dxf.get("extrusion", WCS_EXTRUSION)) == WCS_EXTRUSION
+
+
+class _Collector:
+    """Accumule les coordonnées X/Y à réduire et les entités laissées à ezdxf.bbox."""
+
+    def __init__(self):
+        # Couples (x, y) à plat
+        self.xy = array("d")
+        # Sommets de LWPOLYLINE (tableaux n x 2)
+        self.vertices = []
+        self.rest = []
+        self.boxes = []
+
+    def add_box(self, box: Optional[Extents]) -> None:
+        if box is not None:
+            self.boxes.append(box)
+
+    def reduce(self, approximate: bool, cache: Optional[bbox.Cache]) -> Optional[Extents]:
+        result = None
+        blocks = self.vertices
+        if self.xy:
+            blocks = blocks + [np.frombuffer(self.xy, dtype=np.float64).reshape(-1, 2)]
+        if blocks:
+            coords = np.concatenate(blocks)
+            low = coords.min(axis=0)
+            high = coords.max(axis=0)
+            result = Extents(float(low[0]), float(low[1]), float(high[0]), float(high[1])).union(result)
+        for box in self.boxes:
+            result = box.union(result)
+        if self.rest:
+            box = bbox.extents(self.rest, fast=approximate, cache=cache)
+            if box.has_data:
+                result = Extents(box.extmin.x, box.extmin.y, box.extmax.x, box.extmax.y).union(result)
+        return result
+
+
+def compute_extents(entities: Iterable[DXFEntity], approximate: bool = False) -> Optional[Extents]:
+    """Calcule l'emprise X/Y d'un ensemble d'entités (espace objet, bloc ou requête).
+
+    Chemins rapides du mode exact : LINE, POINT, LWPOLYLINE sans renflement, CIRCLE,
+    et INSERT sans rotation (emprise du bloc calculée une fois par définition).
+    Les autres entités passent par ezdxf.bbox.extents.
+
+    Args:
+        entities: Entités à mesurer
+        approximate: Mode approximatif (sommets et points d'insertion seulement)
+
+    Returns:
+        Emprise, ou None si les entités n'ont pas de géométrie
+    """
+    if np is None:
+        box = bbox.extents(entities, fast=approximate)
+        if not box.has_data:
+            return None
+        return Extents(box.extmin.x, box.extmin.y, box.extmax.x, box.extmax.y)
+    return _compute(entities, approximate, {}, bbox.Cache())
+
+
+def _compute(entities: Iterable[DXFEntity], approximate: bool, block_boxes: dict,
+             cache: bbox.Cache) -> Optional[Extents]:
+    collector = _Collector()
+    xy = collector.xy
+    for entity in entities:
+        kind = entity.dxftype()
+        dxf = entity.dxf
+        if kind == "LINE":
+            start, end = dxf.start, dxf.end
+            xy.extend((start.x, start.y, end.x, end.y))
+        elif kind == "POINT":
+            location = dxf.location
+            xy.extend((location.x, location.y))
+        elif kind == "LWPOLYLINE":
+            # Tableau NumPy (n, 5) ou array("d") à plat selon la version d'ezdxf
+            values = np.asarray(entity.lwpoints.values, dtype=np.float64).reshape(-1, LWPOLYLINE_VERTEX_SIZE)
+            if approximate or (in_wcs(entity) and not values[:, 4].any()):
+                collector.vertices.append(values[:, :2])
+            else:
+                collector.rest.append(entity)
+        elif kind in ("CIRCLE", "ARC") and (kind == "CIRCLE" or approximate) and (approximate or in_wcs(entity)):
+            center, radius = dxf.center, abs(dxf.radius)
+            xy.extend((center.x - radius, center.y - radius, center.x + radius, center.y + radius))
+        elif approximate and kind in _INSERTION_POINT_TYPES:
+            point = dxf.get(_INSERTION_POINT_TYPES[kind])
+            if point is not None:
+                xy.extend((point.x, point.y))
+        elif kind == "INSERT" and not approximate and _simple_insert(entity):
+            collector.add_box(_insert_extents(entity, block_boxes, cache))
+        else:
+            collector.rest.append(entity)
+    return collector.reduce(approximate, cache)
+
+
+def _simple_insert(insert) -> bool:
+    """Vrai si l'emprise de la référence se déduit de celle du bloc (sans rotation ni attributs)."""
+    return (not insert.dxf.rotation
+            and insert.dxf.row_count == 1 and insert.dxf.column_count == 1
+            and not insert.attribs
+            and in_wcs(insert))
+
+
+def _insert_extents(insert, block_boxes: dict, cache: bbox.Cache) -> Optional[Extents]:
+    """Emprise d'une référence de bloc : emprise du bloc mise à l'échelle puis translatée."""
+    name = insert.dxf.name
+    if name not in block_boxes:
+        block = insert.doc.blocks.get(name) if insert.doc is not None else None
+        # Marqueur posé avant le calcul : une définition récursive reste sans emprise
+        block_boxes[name] = None
+        if block is not None:
+            box = _compute(block, False, block_boxes, cache)
+            base = block.block.dxf.base_point
+            block_boxes[name] = (box, base.x, base.y)
+    entry = block_boxes[name]
+    if entry is None or entry[0] is None:
+        return None
+    box, base_x, base_y = entry
+    origin = insert.dxf.insert
+    sx, sy = insert.dxf.xscale, insert.dxf.yscale
+    xs = (origin.x + sx * (box.xmin - base_x), origin.x + sx * (box.xmax - base_x))
+    ys = (origin.y + sy * (box.ymin - base_y), origin.y + sy * (box.ymax - base_y))
+    return Extents(min(xs), min(ys), max(xs), max(ys))
+
+
+def entity_extents(entities: Sequence[DXFEntity], approximate: bool = False) -> "np.ndarray":
+    """Calcule l'emprise X/Y de chaque entité (index spatial de l'assemblage).
+
+    Mêmes chemins rapides que compute_extents, entité par entité. Nécessite NumPy.
+
+    Args:
+        entities: Entités à mesurer
+        approximate: Mode approximatif (sommets et points d'insertion seulement)
+
+    Returns:
+        Tableau (n, 4) [xmin, ymin, xmax, ymax], NaN pour une entité sans géométrie
+    """
+    if np is None:
+        raise RuntimeError("NumPy est requis pour calculer l'emprise de chaque entité")
+    boxes = np.full((len(entities), 4), np.nan)
+    block_boxes = {}
+    cache = bbox.Cache()
+    for row, entity in enumerate(entities):
+        try:
+            box = _entity_box(entity, approximate, block_boxes, cache)
+        except Exception:
+            # Géométrie invalide : l'entité reste sans emprise
+            box = None
+        if box is not None:
+            boxes[row] = box
+    return boxes
+
+
+def _entity_box(entity: DXFEntity, approximate: bool, block_boxes: dict, cache: bbox.Cache):
+    """Emprise (xmin, ymin, xmax, ymax) d'une entité, ou None."""
+    kind = entity.dxftype()
+    dxf = entity.dxf
+    if kind == "LINE":
+        start, end = dxf.start, dxf.end
+        return min(start.x, end.x), min(start.y, end.y), max(start.x, end.x), max(start.y, end.y)
+    if kind == "POINT":
+        location = dxf.location
+        return location.x, location.y, location.x, location.y
+    if kind == "LWPOLYLINE":
+        values = np.asarray(entity.lwpoints.values, dtype=np.float64).reshape(-1, LWPOLYLINE_VERTEX_SIZE)
+        if len(values) and (approximate or (in_wcs(entity) and not values[:, 4].any())):
+            low = values[:, :2].min(axis=0)
+            high = values[:, :2].max(axis=0)
+            return low[0], low[1], high[0], high[1]
+    elif kind in ("CIRCLE", "ARC") and (kind == "CIRCLE" or approximate) and (approximate or in_wcs(entity)):
+        center, radius = dxf.center, abs(dxf.radius)
+        return center.x - radius, center.y - radius, center.x + radius, center.y + radius
+    elif approximate and kind in _INSERTION_POINT_TYPES:
+        point = dxf.get(_INSERTION_POINT_TYPES[kind])
+        return (point.x, point.y, point.x, point.y) if point is not None else None
+    elif kind == "INSERT" and not approximate and _simple_insert(entity):
+        box = _insert_extents(entity, block_boxes, cache)
+        return (box.xmin, box.ymin, box.xmax, box.ymax) if box is not None else None
+    box = bbox.extents([entity], fast=approximate, cache=cache)
+    if not box.has_data:
+        return None
+    return box.extmin.x, box.extmin.y, box.extmax.x, box.extmax.y
@@ -0,0 +1,577 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : export GeoPackage de l'assemblage (ouverture rapide dans QGIS)
+- GeoPackage 1.3 écrit directement avec sqlite3, sans GDAL : une table par type de géométrie
+  (points, lignes, polygones) en coordonnées du dessin (Lambert 93 par défaut)
+- Champs du pilote DXF d'OGR (Layer, EntityHandle, Linetype, Text) : les styles et expressions
+  QGIS écrits pour assemblage.dxf restent valables ; plus Entity, Color (couleur effective),
+  Block, Rotation, Height et Attributes (attributs des blocs, JSON)
+- Entités reçues au fil de l'assemblage (écriture en flux, sortie découpée) ou en une fois,
+  insérées par lots dans de grandes transactions ; index spatial R-tree chargé en bloc en fin
+  d'écriture (STR), emprise et nombre d'entités de chaque table renseignés : QGIS n'a rien
+  à recalculer à l'ouverture
+- Polylignes fermées exportées en polygones ; arcs, renflements, cercles, ellipses et
+  splines approchés par des segments ; hachures, cotes et autres entités ignorées (comptées)
+"""
+
+import json
+import math
+import logging
+import os
+import sqlite3
+import struct
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from ezdxf import path as ezpath
+from ezdxf.entities import DXFEntity
+
+from assembleur_extents import LWPOLYLINE_VERTEX_SIZE, in_wcs
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+# Système de coordonnées des plans cadastre : RGF93 v1 / Lambert-93
+GEOPACKAGE_SRS_ID = 2154
+
+# Nombre d'entités insérées par transaction (par table)
+GEOPACKAGE_BATCH_ROWS = 50000
+
+# Écart maximal entre une courbe et les segments qui l'approchent (unités du dessin)
+GEOPACKAGE_FLATTEN_DISTANCE = 0.01
+
+# Définitions WKT des systèmes connus (les autres codes EPSG sont résolus par QGIS)
+_WKT_4326 = (
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],'
+    'AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+    'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AXIS["Latitude",NORTH],AXIS["Longitude",EAST],'
+    'AUTHORITY["EPSG","4326"]]'
+)
+_SRS_DEFINITIONS = {
+    2154: ("RGF93 v1 / Lambert-93",
+           'PROJCS["RGF93 v1 / Lambert-93",GEOGCS["RGF93 v1",DATUM["Reseau_Geodesique_Francais_1993_v1",'
+           'SPHEROID["GRS 1980",6378137,298.257222101,AUTHORITY["EPSG","7019"]],TOWGS84[0,0,0,0,0,0,0],'
+           'AUTHORITY["EPSG","6171"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+           'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4171"]],'
+           'PROJECTION["Lambert_Conformal_Conic_2SP"],PARAMETER["latitude_of_origin",46.5],'
+           'PARAMETER["central_meridian",3],PARAMETER["standard_parallel_1",49],'
+           'PARAMETER["standard_parallel_2",44],PARAMETER["false_easting",700000],'
+           'PARAMETER["false_northing",6600000],UNIT["metre",1,AUTHORITY["EPSG","9001"]],'
+           'AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","2154"]]'),
+    4326: ("WGS 84 geodetic", _WKT_4326),
+}
+
+# Tables d'entités : type de géométrie et champs propres (en plus de ceux de toutes les tables)
+_TABLES = {
+    "points": ("POINT", ("Text TEXT", "Block TEXT", "Rotation REAL", "Height REAL", "Attributes TEXT")),
+    "lignes": ("LINESTRING", ()),
+    "polygones": ("POLYGON", ()),
+}
+_COMMON_FIELDS = ("Layer TEXT", "Entity TEXT", "EntityHandle TEXT", "Color INTEGER", "Linetype TEXT")
+
+# Types WKB
+_WKB_POINT = 1
+_WKB_LINESTRING = 2
+_WKB_POLYGON = 3
+
+# En-tête binaire GeoPackage : « GP », version 0, drapeaux (petit-boutiste, avec ou sans emprise XY)
+_GPKG_HEADER = struct.Struct("<2sBBi")
+_FLAGS_NO_ENVELOPE = 0x01
+_FLAGS_XY_ENVELOPE = 0x03
+
+# Couleur « DuCalque » (ACI)
+_BYLAYER = 256
+
+# Cellule d'un nœud R-tree SQLite : identifiant et emprise (minx, maxx, miny, maxy) en grand-boutiste
+_RTREE_CELL = np.dtype([("id", ">i8"), ("box", ">f4", 4)]) if np is not None else None
+
+_METADATA_SQL = (
+    "CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, "
+    "organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, "
+    "description TEXT)",
+    "CREATE TABLE gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, "
+    "identifier TEXT UNIQUE, description TEXT DEFAULT '', "
+    "last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')), "
+    "min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER, "
+    "CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id))",
+    "CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, "
+    "geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL, "
+    "CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name), "
+    "CONSTRAINT uk_gc_table_name UNIQUE (table_name), "
+    "CONSTRAINT fk_gc_tn FOREIGN KEY (table_name) REFERENCES gpkg_contents(table_name), "
+    "CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys (srs_id))",
+    "CREATE TABLE gpkg_extensions (table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL, "
+    "definition TEXT NOT NULL, scope TEXT NOT NULL, "
+    "CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name))",
+    # Nombre d'entités lu par GDAL/QGIS à l'ouverture (sinon un COUNT(*) par table)
+    "CREATE TABLE gpkg_ogr_contents (table_name TEXT NOT NULL PRIMARY KEY, feature_count INTEGER DEFAULT NULL)",
+)
+
+# Déclencheurs de l'extension R-tree (GeoPackage 1.3), créés une fois les entités écrites :
+# ils maintiennent l'index lors des modifications faites ensuite dans QGIS
+_RTREE_TRIGGERS = (
+    """CREATE TRIGGER "rtree_{t}_geom_insert" AFTER INSERT ON "{t}"
+WHEN (new.geom NOT NULL AND NOT ST_IsEmpty(NEW.geom))
+BEGIN
+  INSERT OR REPLACE INTO "rtree_{t}_geom" VALUES (NEW.fid,
+    ST_MinX(NEW.geom), ST_MaxX(NEW.geom), ST_MinY(NEW.geom), ST_MaxY(NEW.geom));
+END""",
+    """CREATE TRIGGER "rtree_{t}_geom_update1" AFTER UPDATE OF geom ON "{t}"
+WHEN OLD.fid = NEW.fid AND (NEW.geom NOTNULL AND NOT ST_IsEmpty(NEW.geom))
+BEGIN
+  INSERT OR REPLACE INTO "rtree_{t}_geom" VALUES (NEW.fid,
+    ST_MinX(NEW.geom), ST_MaxX(NEW.geom), ST_MinY(NEW.geom), ST_MaxY(NEW.geom));
+END""",
+    """CREATE TRIGGER "rtree_{t}_geom_update2" AFTER UPDATE OF geom ON "{t}"
+WHEN OLD.fid = NEW.fid AND (NEW.geom ISNULL OR ST_IsEmpty(NEW.geom))
+BEGIN
+  DELETE FROM "rtree_{t}_geom" WHERE id = OLD.fid;
+END""",
+    """CREATE TRIGGER "rtree_{t}_geom_update3" AFTER UPDATE ON "{t}"
+WHEN OLD.fid != NEW.fid AND (NEW.geom NOTNULL AND NOT ST_IsEmpty(NEW.geom))
+BEGIN
+  DELETE FROM "rtree_{t}_geom" WHERE id = OLD.fid;
+  INSERT OR REPLACE INTO "rtree_{t}_geom" VALUES (NEW.fid,
+    ST_MinX(NEW.geom), ST_MaxX(NEW.geom), ST_MinY(NEW.geom), ST_MaxY(NEW.geom));
+END""",
+    """CREATE TRIGGER "rtree_{t}_geom_update4" AFTER UPDATE ON "{t}"
+WHEN OLD.fid != NEW.fid AND (NEW.geom ISNULL OR ST_IsEmpty(NEW.geom))
+BEGIN
+  DELETE FROM "rtree_{t}_geom" WHERE id IN (OLD.fid, NEW.fid);
+END""",
+    """CREATE TRIGGER "rtree_{t}_geom_delete" AFTER DELETE ON "{t}"
+WHEN old.geom NOT NULL
+BEGIN
+  DELETE FROM "rtree_{t}_geom" WHERE id = OLD.fid;
+END""",
+)
+
+
+def geopackage_path(output_dxf: str) -> str:
+    """Chemin de l'export GeoPackage associé à un assemblage (assemblage.gpkg), quel que soit son format."""
+    from assembleur_output import output_stem
+    return output_stem(output_dxf) + ".gpkg"
+
+
+def remove_geopackage(output_dxf: str) -> bool:
+    """Supprime l'export GeoPackage d'un assemblage (il ne décrit plus la nouvelle sortie).
+
+    Returns:
+        True si un fichier a été supprimé
+    """
+    try:
+        os.remove(geopackage_path(output_dxf))
+        return True
+    except OSError:
+        return False
+
+
+def _point_blob(srs_id: int, x: float, y: float) -> bytes:
+    """Géométrie GeoPackage d'un point (sans emprise)."""
+    return _GPKG_HEADER.pack(b"GP", 0, _FLAGS_NO_ENVELOPE, srs_id) + struct.pack("<BIdd", 1, _WKB_POINT, x, y)
+
+
+def _curve_blob(srs_id: int, wkb_type: int, xy: "np.ndarray", box) -> bytes:
+    """Géométrie GeoPackage d'une ligne ou d'un polygone à un anneau (avec emprise XY)."""
+    head = _GPKG_HEADER.pack(b"GP", 0, _FLAGS_XY_ENVELOPE, srs_id) + struct.pack("<4d", *box)
+    if wkb_type == _WKB_POLYGON:
+        head += struct.pack("<BIII", 1, _WKB_POLYGON, 1, len(xy))
+    else:
+        head += struct.pack("<BII", 1, _WKB_LINESTRING, len(xy))
+    return head + xy.astype("<f8", copy=False).tobytes()
+
+
+def _float32_outward(values: "np.ndarray", upper: bool) -> "np.ndarray":
+    """Arrondit des coordonnées en simple précision vers l'extérieur de l'emprise (comme le module rtree)."""
+    rounded = values.astype(np.float32)
+    if upper:
+        low = rounded < values
+        rounded[low] = np.nextafter(rounded[low], np.float32(np.inf))
+    else:
+        high = rounded > values
+        rounded[high] = np.nextafter(rounded[high], np.float32(-np.inf))
+    return rounded
+
+
+def _pack_rtree(db: sqlite3.Connection, rtree: str, boxes: "np.ndarray") -> None:
+    """Charge en bloc l'index R-tree d'une table (entités de fid 1 à n), sans insertion ligne à ligne.
+
+    Les nœuds sont regroupés par tranches (Sort-Tile-Recursive) puis écrits directement dans
+    les tables internes du module rtree de SQLite (_node, _rowid, _parent), dans son format :
+    profondeur et nombre de cellules, puis cellules (identifiant, emprise en simple précision).
+
+    Args:
+        db: Connexion (transaction ouverte), table virtuelle rtree créée et vide
+        rtree: Nom de la table virtuelle rtree
+        boxes: Emprises (minx, maxx, miny, maxy) des entités, dans l'ordre des fid
+    """
+    node_size = db.execute(f'SELECT length(data) FROM "{rtree}_node" WHERE nodeno = 1').fetchone()[0]
+    capacity = (node_size - 4) // _RTREE_CELL.itemsize
+    ids = np.arange(1, len(boxes) + 1, dtype=np.int64)
+    coords = np.empty((len(boxes), 4), dtype=np.float32)
+    coords[:, 0::2] = _float32_outward(boxes[:, 0::2], upper=False)
+    coords[:, 1::2] = _float32_outward(boxes[:, 1::2], upper=True)
+
+    # Niveaux construits des feuilles vers la racine : cellules triées puis découpées en nœuds
+    levels = []
+    while True:
+        count = len(ids)
+        nodes = math.ceil(count / capacity)
+        if nodes > 1:
+            # Tranches verticales de nœuds entiers, puis tri par ordonnée dans chaque tranche
+            center_x = coords[:, 0].astype(np.float64) + coords[:, 1]
+            center_y = coords[:, 2].astype(np.float64) + coords[:, 3]
+            slice_size = math.ceil(math.sqrt(nodes)) * capacity
+            slices = np.empty(count, dtype=np.int64)
+            slices[np.argsort(center_x, kind="stable")] = np.arange(count) // slice_size
+            order = np.lexsort((center_y, slices))
+            ids, coords = ids[order], coords[order]
+        starts = np.arange(0, count, capacity)
+        levels.append((ids, coords, starts))
+        if nodes == 1:
+            break
+        # Nœuds du niveau supérieur : emprise de leurs cellules (identifiants attribués ensuite)
+        ids = np.arange(nodes, dtype=np.int64)
+        coords = np.empty((nodes, 4), dtype=np.float32)
+        coords[:, 0::2] = np.minimum.reduceat(levels[-1][1][:, 0::2], starts)
+        coords[:, 1::2] = np.maximum.reduceat(levels[-1][1][:, 1::2], starts)
+
+    # Numérotation des nœuds : racine 1, puis niveau par niveau vers les feuilles
+    depth = len(levels) - 1
+    first = 1
+    numbers = []
+    for ids, coords, starts in reversed(levels):
+        numbers.append(np.arange(first, first + len(starts), dtype=np.int64))
+        first += len(starts)
+    numbers.reverse()
+
+    node_rows = []
+    parent_rows = []
+    for level, (ids, coords, starts) in enumerate(levels):
+        if level > 0:
+            # Cellules des nœuds internes : numéros des nœuds fils
+            ids = numbers[level - 1][ids]
+        cells = np.empty(len(ids), dtype=_RTREE_CELL)
+        cells["id"] = ids
+        cells["box"] = coords
+        ends = np.append(starts[1:], len(ids))
+        for nodeno, start, end in zip(numbers[level].tolist(), starts.tolist(), ends.tolist()):
+            header = struct.pack(">HH", depth if nodeno == 1 else 0, end - start)
+            data = header + cells[start:end].tobytes()
+            node_rows.append((nodeno, data + bytes(node_size - len(data))))
+        if level > 0:
+            parents = np.repeat(numbers[level], np.diff(np.append(starts, len(ids))))
+            parent_rows.extend(zip(ids.tolist(), parents.tolist()))
+        else:
+            leaves = np.repeat(numbers[0], np.diff(np.append(starts, len(ids))))
+            db.executemany(f'INSERT INTO "{rtree}_rowid" (rowid, nodeno) VALUES (?, ?)',
+                           zip(ids.tolist(), leaves.tolist()))
+    db.execute(f'DELETE FROM "{rtree}_node"')
+    db.executemany(f'INSERT INTO "{rtree}_node" (nodeno, data) VALUES (?, ?)', node_rows)
+    db.executemany(f'INSERT INTO "{rtree}_parent" (nodeno, parentnode) VALUES (?, ?)', parent_rows)
+
+
+class _Table:
+    """Table d'entités en cours d'écriture : lignes en attente, emprise et nombre d'entités."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.geometry_type, extra = _TABLES[name]
+        self.fields = _COMMON_FIELDS + extra
+        self.created = False
+        self.rows = []
+        # Emprises des entités dans l'ordre des fid (minx, maxx, miny, maxy à la suite)
+        self.boxes = array("d")
+        self.count = 0
+
+    def insert_sql(self) -> str:
+        names = ", ".join(field.split()[0] for field in self.fields)
+        marks = ", ".join("?" * (len(self.fields) + 2))
+        return f'INSERT INTO "{self.name}" (fid, geom, {names}) VALUES ({marks})'
+
+
+class GeoPackageWriter:
+    """Écrit les entités d'un ou plusieurs documents DXF dans un GeoPackage.
+
+    Le fichier est écrit sous un nom temporaire, puis renommé à la fermeture (close).
+
+    Args:
+        path: Chemin du GeoPackage (.gpkg)
+        srs_id: Code EPSG des coordonnées du dessin (0 : système non défini)
+        flatten_distance: Écart maximal des segments approchant les courbes (unités du dessin)
+        batch_rows: Nombre d'entités insérées par transaction
+
+    Raises:
+        RuntimeError: Si NumPy n'est pas disponible
+    """
+
+    def __init__(self, path: str, srs_id: int = GEOPACKAGE_SRS_ID,
+                 flatten_distance: float = GEOPACKAGE_FLATTEN_DISTANCE, batch_rows: int = GEOPACKAGE_BATCH_ROWS):
+        if np is None:
+            raise RuntimeError("NumPy est requis pour l'export GeoPackage")
+        self.path = path
+        self.srs_id = int(srs_id) if srs_id and int(srs_id) > 0 else -1
+        self.flatten_distance = float(flatten_distance)
+        self.batch_rows = max(1, int(batch_rows))
+        self.tables = {name: _Table(name) for name in _TABLES}
+        self.skipped = Counter()
+        self._layer_colors: Dict[int, Dict[str, int]] = {}
+        self._tmp = path + ".tmp"
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+        self._db = sqlite3.connect(self._tmp, isolation_level=None)
+        # Fichier neuf renommé en fin d'écriture : ni journal ni synchronisation pendant le remplissage
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.execute("PRAGMA cache_size = -65536")
+        self._db.execute("PRAGMA application_id = 1196444487")  # « GPKG »
+        self._db.execute("PRAGMA user_version = 10300")
+        self._db.execute("BEGIN")
+        for sql in _METADATA_SQL:
+            self._db.execute(sql)
+        self._db.executemany(
+            "INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+            [("Undefined cartesian SRS", -1, "NONE", -1, "undefined", "undefined cartesian coordinate reference system"),
+             ("Undefined geographic SRS", 0, "NONE", 0, "undefined", "undefined geographic coordinate reference system"),
+             ("WGS 84 geodetic", 4326, "EPSG", 4326, _WKT_4326,
+              "longitude/latitude coordinates in decimal degrees on the WGS 84 spheroid")])
+        if self.srs_id not in (-1, 4326):
+            name, definition = _SRS_DEFINITIONS.get(self.srs_id, (f"EPSG:{self.srs_id}", "undefined"))
+            self._db.execute("INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+                             (name, self.srs_id, "EPSG", self.srs_id, definition, None))
+        self._db.execute("COMMIT")
+
+    @property
+    def features(self) -> int:
+        """Nombre d'entités exportées."""
+        return sum(table.count for table in self.tables.values())
+
+    # --- Conversion des entités ---
+    def add(self, entities: Iterable[DXFEntity]) -> int:
+        """Exporte des entités (espace objet d'un document assemblé, d'une source ou d'un DXF découpé).
+
+        Args:
+            entities: Entités à exporter
+
+        Returns:
+            Nombre d'entités exportées
+        """
+        before = self.features
+        for entity in entities:
+            try:
+                self._add_entity(entity)
+            except Exception as e:
+                # Géométrie invalide : l'entité est ignorée
+                logger.debug(f"Entité non exportée {entity}: {e}")
+                self.skipped[entity.dxftype()] += 1
+        for table in self.tables.values():
+            if table.rows:
+                self._flush(table)
+        return self.features - before
+
+    def _add_entity(self, entity: DXFEntity) -> None:
+        kind = entity.dxftype()
+        dxf = entity.dxf
+        if kind in ("POINT", "TEXT", "MTEXT", "INSERT"):
+            point = dxf.location if kind == "POINT" else dxf.insert
+            text = block = rotation = height = attributes = None
+            if kind == "TEXT":
+                text, rotation, height = dxf.text, dxf.rotation, dxf.height
+                if "%%" in text or "^" in text or "\n" in text or "\r" in text:
+                    # Codes spéciaux (%%c, notation ^) : décodage complet, coûteux
+                    text = entity.plain_text()
+            elif kind == "MTEXT":
+                text, rotation, height = entity.plain_text(), entity.get_rotation(), dxf.char_height
+            elif kind == "INSERT":
+                block, rotation = dxf.name, dxf.rotation
+                if entity.attribs:
+                    attributes = json.dumps({attrib.dxf.tag: attrib.dxf.text for attrib in entity.attribs},
+                                            ensure_ascii=False)
+            self._row("points", _point_blob(self.srs_id, point.x, point.y), (point.x, point.x, point.y, point.y),
+                      entity, kind, (text, block, rotation, height, attributes))
+            return
+        if kind == "LINE":
+            # Cas le plus fréquent : géométrie écrite sans passer par NumPy
+            start, end = dxf.start, dxf.end
+            box = (min(start.x, end.x), max(start.x, end.x), min(start.y, end.y), max(start.y, end.y))
+            blob = (_GPKG_HEADER.pack(b"GP", 0, _FLAGS_XY_ENVELOPE, self.srs_id)
+                    + struct.pack("<4dBII4d", *box, 1, _WKB_LINESTRING, 2, start.x, start.y, end.x, end.y))
+            self._row("lignes", blob, box, entity, kind, ())
+            return
+        if kind == "LWPOLYLINE":
+            values = np.asarray(entity.lwpoints.values, dtype=np.float64).reshape(-1, LWPOLYLINE_VERTEX_SIZE)
+            closed = entity.closed
+            if in_wcs(entity) and not values[:, 4].any():
+                xy = values[:, :2]
+            else:
+                xy = self._flatten(entity)
+        elif kind == "POLYLINE":
+            if not (entity.is_2d_polyline or entity.is_3d_polyline):
+                self.skipped[kind] += 1
+                return
+            closed = entity.is_closed
+            if entity.is_3d_polyline or (in_wcs(entity) and not entity.has_arc):
+                xy = np.array([tuple(vertex.dxf.location)[:2] for vertex in entity.vertices], dtype=np.float64)
+            else:
+                xy = self._flatten(entity)
+        elif kind in ("ARC", "CIRCLE", "ELLIPSE", "SPLINE"):
+            xy = self._flatten(entity)
+            closed = False
+        else:
+            self.skipped[kind] += 1
+            return
+        if len(xy) < 2:
+            self.skipped[kind] += 1
+            return
+        if closed:
+            if len(xy) >= 3 and np.any(xy[0] != xy[-1]):
+                xy = np.concatenate((xy, xy[:1]))
+            closed = len(xy) >= 4
+        low = xy.min(axis=0)
+        high = xy.max(axis=0)
+        box = (float(low[0]), float(high[0]), float(low[1]), float(high[1]))
+        table = "polygones" if closed else "lignes"
+        self._row(table, _curve_blob(self.srs_id, _WKB_POLYGON if closed else _WKB_LINESTRING,
+                                     np.ascontiguousarray(xy), box), box, entity, kind, ())
+
+    def _flatten(self, entity: DXFEntity) -> "np.ndarray":
+        """Sommets X/Y (SCG) d'une courbe approchée par des segments."""
+        points = list(ezpath.make_path(entity).flattening(self.flatten_distance))
+        return np.array([(point.x, point.y) for point in points], dtype=np.float64).reshape(-1, 2)
+
+    def _layer_color(self, entity: DXFEntity, layer: str) -> Optional[int]:
+        """Couleur (ACI) du calque d'une entité « DuCalque »."""
+        doc = entity.doc
+        if doc is None:
+            return None
+        colors = self._layer_colors.get(id(doc))
+        if colors is None:
+            colors = self._layer_colors[id(doc)] = {layer.dxf.name.lower(): abs(layer.dxf.color)
+                                                    for layer in doc.layers}
+        return colors.get(layer.lower())
+
+    def _row(self, name: str, blob: bytes, box, entity: DXFEntity, kind: str, extra: tuple) -> None:
+        table = self.tables[name]
+        table.count += 1
+        dxf = entity.dxf
+        layer = dxf.layer
+        # Couleur effective : celle du calque pour une entité « DuCalque »
+        color = dxf.get("color", _BYLAYER)
+        if color == _BYLAYER:
+            color = self._layer_color(entity, layer)
+        table.rows.append((table.count, blob, layer, kind, dxf.handle, color, dxf.get("linetype", "BYLAYER")) + extra)
+        table.boxes.extend(box)
+        if len(table.rows) >= self.batch_rows:
+            self._flush(table)
+
+    # --- Écriture ---
+    def _create(self, table: _Table) -> None:
+        """Crée une table d'entités, son index R-tree et ses entrées de métadonnées."""
+        fields = ", ".join(table.fields)
+        db = self._db
+        db.execute(f'CREATE TABLE "{table.name}" (fid INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, '
+                   f'geom {table.geometry_type}, {fields})')
+        db.execute(f'CREATE VIRTUAL TABLE "rtree_{table.name}_geom" USING rtree(id, minx, maxx, miny, maxy)')
+        db.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) VALUES (?, ?, ?, ?)",
+                   (table.name, "features", table.name, self.srs_id))
+        db.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', ?, ?, 0, 0)",
+                   (table.name, table.geometry_type, self.srs_id))
+        db.execute("INSERT INTO gpkg_extensions VALUES (?, 'geom', 'gpkg_rtree_index', "
+                   "'http://www.geopackage.org/spec120/#extension_rtree', 'write-only')", (table.name,))
+        table.created = True
+
+    def _flush(self, table: _Table) -> None:
+        """Insère les entités en attente d'une table en une transaction."""
+        db = self._db
+        db.execute("BEGIN")
+        if not table.created:
+            self._create(table)
+        db.executemany(table.insert_sql(), table.rows)
+        db.execute("COMMIT")
+        table.rows = []
+
+    def close(self) -> dict:
+        """Termine le GeoPackage (emprises, nombres d'entités, déclencheurs) et le renomme.
+
+        Returns:
+            Bilan : {path, features, tables (nom -> nombre d'entités), skipped (type -> nombre), bytes}
+        """
+        db = self._db
+        for table in self.tables.values():
+            if table.rows:
+                self._flush(table)
+        db.execute("BEGIN")
+        for table in self.tables.values():
+            if not table.created:
+                continue
+            boxes = np.frombuffer(table.boxes, dtype=np.float64).reshape(-1, 4)
+            table.boxes = array("d")
+            _pack_rtree(db, f"rtree_{table.name}_geom", boxes)
+            min_x, min_y = boxes[:, 0].min(), boxes[:, 2].min()
+            max_x, max_y = boxes[:, 1].max(), boxes[:, 3].max()
+            db.execute("UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ?, "
+                       "last_change = strftime('%Y-%m-%dT%H:%M:%fZ','now') WHERE table_name = ?",
+                       (float(min_x), float(min_y), float(max_x), float(max_y), table.name))
+            db.execute("INSERT INTO gpkg_ogr_contents VALUES (?, ?)", (table.name, table.count))
+            for trigger in _RTREE_TRIGGERS:
+                db.execute(trigger.format(t=table.name))
+        db.execute("COMMIT")
+        db.close()
+        self._db = None
+        os.replace(self._tmp, self.path)
+        return {
+            "path": self.path,
+            "features": self.features,
+            "tables": {table.name: table.count for table in self.tables.values() if table.count},
+            "skipped": dict(self.skipped),
+            "bytes": os.path.getsize(self.path),
+        }
+
+    def discard(self, remove_existing: bool = False) -> None:
+        """Abandonne l'export (traitement annulé ou en erreur) : le fichier temporaire est supprimé.
+
+        Args:
+            remove_existing: Supprimer aussi le GeoPackage d'une exécution précédente (il ne
+                décrit plus la nouvelle sortie)
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            try:
+                os.remove(self._tmp)
+            except OSError:
+                pass
+        if remove_existing:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def export_geopackage(entities: Iterable[DXFEntity], path: str, srs_id: int = GEOPACKAGE_SRS_ID,
+                      flatten_distance: float = GEOPACKAGE_FLATTEN_DISTANCE) -> dict:
+    """Exporte des entités (espace objet d'un assemblage) dans un GeoPackage.
+
+    Args:
+        entities: Entités à exporter
+        path: Chemin du GeoPackage (.gpkg)
+        srs_id: Code EPSG des coordonnées du dessin (0 : système non défini)
+        flatten_distance: Écart maximal des segments approchant les courbes (unités du dessin)
+
+    Returns:
+        Bilan de l'export (voir GeoPackageWriter.close)
+    """
+    writer = GeoPackageWriter(path, srs_id, flatten_distance)
+    try:
+        writer.add(entities)
+        return writer.close()
+    finally:
+        writer.discard()
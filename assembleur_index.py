@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : index spatial de l'assemblage et extraction de zones
+- Index enregistré à côté de la sortie (assemblage.index.npz) : emprise et position
+  (octets) de chaque entité dans la section ENTITIES, grille régulière des emprises,
+  emprise de chaque source
+- Extraction d'une zone (fenêtre X/Y ou sources choisies) : le DXF de zone est recopié
+  octet par octet depuis l'assemblage, sans relire ni réimporter le dessin complet
+
+L'index ne concerne que les assemblages DXF texte ; il nécessite NumPy.
+"""
+
+import fnmatch
+import json
+import logging
+import mmap
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ezdxf.document import Drawing
+
+from assembleur_extents import Extents, entity_extents
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+INDEX_FORMAT = 1
+
+# Nombre de cellules visé par entité et taille maximale de la grille (par axe)
+GRID_ENTITIES_PER_CELL = 8
+GRID_MAX_CELLS = 1024
+
+# Au-delà de ce nombre de cellules couvertes, une entité est testée à chaque requête
+GRID_MAX_CELLS_PER_ENTITY = 16
+
+# Taille des blocs recopiés lors de l'extraction d'une zone
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Début de la section ENTITIES, enregistrements d'entité (type et handle), fin de section
+_ENTITIES_SECTION = re.compile(rb"(?<=\n)  2\r?\nENTITIES\r?\n")
+_ENTITY_RECORD = re.compile(rb"(?<=\n)  0\r?\n([^\r\n]+)\r?\n  5\r?\n([^\r\n]+)\r?\n")
+_END_SECTION = re.compile(rb"(?<=\n)  0\r?\nENDSEC\r?\n")
+
+
+def spatial_index_path(output_dxf: str) -> str:
+    """Chemin de l'index spatial associé à un assemblage (assemblage.index.npz)."""
+    return os.path.splitext(output_dxf)[0] + ".index.npz"
+
+
+def remove_spatial_index(output_dxf: str) -> None:
+    """Supprime l'index spatial d'un assemblage (s'il existe)."""
+    try:
+        os.remove(spatial_index_path(output_dxf))
+    except OSError:
+        pass
+
+
+def _scan_entities(output_dxf: str, top_level: Dict[str, int]) -> Tuple[int, int, "np.ndarray"]:
+    """Repère la position des entités dans la section ENTITIES d'un DXF texte.
+
+    Les sous-entités (ATTRIB, VERTEX, SEQEND) restent dans le bloc d'octets de leur entité parente.
+
+    Args:
+        output_dxf: Chemin du DXF texte
+        top_level: Handle -> rang de chaque entité de premier niveau
+
+    Returns:
+        Tuple (début de la section, fin de la section, tableau (n, 2) début/fin de chaque entité)
+
+    Raises:
+        ValueError: Section introuvable ou entités non retrouvées (DXF binaire, fichier modifié)
+    """
+    ranges = np.full((len(top_level), 2), -1, dtype=np.int64)
+    with open(output_dxf, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        section = _ENTITIES_SECTION.search(data)
+        if section is None:
+            raise ValueError("section ENTITIES introuvable (DXF binaire ?)")
+        start = section.end()
+        end_match = _END_SECTION.search(data, start)
+        if end_match is None:
+            raise ValueError("fin de la section ENTITIES introuvable")
+        end = end_match.start()
+
+        previous = None
+        for match in _ENTITY_RECORD.finditer(data, start, end):
+            row = top_level.get(match.group(2).decode("ascii", "replace"))
+            if row is None:
+                continue
+            if previous is not None:
+                ranges[previous, 1] = match.start()
+            ranges[row, 0] = match.start()
+            previous = row
+        if previous is not None:
+            ranges[previous, 1] = end
+    if (ranges < 0).any():
+        raise ValueError("entités absentes de la section ENTITIES")
+    return start, end, ranges
+
+
+def _build_grid(boxes: "np.ndarray") -> dict:
+    """Répartit les emprises dans une grille régulière (liste d'entités par cellule).
+
+    Returns:
+        Dictionnaire {origin, cell, shape, cell_starts, cell_items, large}
+    """
+    valid = ~np.isnan(boxes).any(axis=1)
+    rows = np.flatnonzero(valid)
+    if not len(rows):
+        return {"origin": [0.0, 0.0], "cell": 1.0, "shape": [1, 1],
+                "cell_starts": np.zeros(2, dtype=np.int64), "cell_items": np.zeros(0, dtype=np.int64),
+                "large": np.zeros(0, dtype=np.int64)}
+    x0, y0 = boxes[rows, 0].min(), boxes[rows, 1].min()
+    width = max(boxes[rows, 2].max() - x0, 1e-9)
+    height = max(boxes[rows, 3].max() - y0, 1e-9)
+    cells = max(1, len(rows) // GRID_ENTITIES_PER_CELL)
+    cell = max(np.sqrt(width * height / cells), width / GRID_MAX_CELLS, height / GRID_MAX_CELLS)
+    nx = min(GRID_MAX_CELLS, int(width // cell) + 1)
+    ny = min(GRID_MAX_CELLS, int(height // cell) + 1)
+
+    def cell_range(low, high, origin, count):
+        first = np.clip(((low - origin) // cell).astype(np.int64), 0, count - 1)
+        last = np.clip(((high - origin) // cell).astype(np.int64), 0, count - 1)
+        return first, last
+
+    cx0, cx1 = cell_range(boxes[rows, 0], boxes[rows, 2], x0, nx)
+    cy0, cy1 = cell_range(boxes[rows, 1], boxes[rows, 3], y0, ny)
+    spanx = cx1 - cx0 + 1
+    covered = spanx * (cy1 - cy0 + 1)
+    small = covered <= GRID_MAX_CELLS_PER_ENTITY
+
+    # Une entrée (cellule, entité) par cellule couverte
+    counts = covered[small]
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    width_cells = spanx[small][owners]
+    cell_x = cx0[small][owners] + offsets % width_cells
+    cell_y = cy0[small][owners] + offsets // width_cells
+    cell_ids = cell_y * nx + cell_x
+    order = np.argsort(cell_ids, kind="stable")
+    cell_items = rows[small][owners][order]
+    cell_starts = np.zeros(nx * ny + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cell_ids, minlength=nx * ny), out=cell_starts[1:])
+    return {"origin": [float(x0), float(y0)], "cell": float(cell), "shape": [int(nx), int(ny)],
+            "cell_starts": cell_starts, "cell_items": cell_items.astype(np.int64),
+            "large": rows[~small].astype(np.int64)}
+
+
+def build_spatial_index(doc: Drawing, output_dxf: str, source_extents: Optional[dict] = None,
+                        approximate: bool = False) -> str:
+    """Construit et enregistre l'index spatial d'un assemblage qui vient d'être écrit (DXF texte).
+
+    Args:
+        doc: Document assemblé (tel qu'enregistré dans output_dxf)
+        output_dxf: Chemin du fichier DXF assemblé
+        source_extents: Emprise de chaque source (identifiant -> Extents), ou None
+        approximate: Emprises approximatives (sommets et points d'insertion seulement)
+
+    Returns:
+        Chemin de l'index enregistré
+
+    Raises:
+        RuntimeError: NumPy absent
+        ValueError: Sortie illisible (DXF binaire, entités introuvables)
+    """
+    if np is None:
+        raise RuntimeError("NumPy est requis pour l'index spatial")
+    # Entités de l'espace objet (indexées), puis de l'espace papier actif (toujours extraites)
+    modelspace = list(doc.modelspace())
+    paperspace = list(doc.layouts.active_layout())
+    entities = modelspace + paperspace
+    top_level = {e.dxf.handle: row for row, e in enumerate(entities)}
+    prefix_end, suffix_start, ranges = _scan_entities(output_dxf, top_level)
+    boxes = entity_extents(modelspace, approximate)
+    grid = _build_grid(boxes)
+
+    stat = os.stat(output_dxf)
+    meta = {
+        "format": INDEX_FORMAT,
+        "output": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "prefix_end": prefix_end,
+        "suffix_start": suffix_start,
+        "approximate": bool(approximate),
+        "grid": {key: grid[key] for key in ("origin", "cell", "shape")},
+        "sources": {sid: (box.as_list() if box is not None else None)
+                    for sid, box in (source_extents or {}).items()},
+    }
+    path = spatial_index_path(output_dxf)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, meta=np.array(json.dumps(meta)), ranges=ranges, boxes=boxes,
+             cell_starts=grid["cell_starts"], cell_items=grid["cell_items"], large=grid["large"],
+             always=np.arange(len(modelspace), len(entities), dtype=np.int64))
+    os.replace(tmp_path, path)
+    return path
+
+
+class SpatialIndex:
+    """Index spatial d'un assemblage, chargé depuis assemblage.index.npz (voir build_spatial_index)."""
+
+    def __init__(self, output_dxf: str, meta: dict, arrays: dict):
+        self.output_dxf = output_dxf
+        self.meta = meta
+        self.ranges = arrays["ranges"]
+        self.boxes = arrays["boxes"]
+        self.cell_starts = arrays["cell_starts"]
+        self.cell_items = arrays["cell_items"]
+        self.large = arrays["large"]
+        self.always = arrays["always"]
+
+    @property
+    def sources(self) -> Dict[str, Optional[Extents]]:
+        """Emprise de chaque source de l'assemblage."""
+        return {sid: Extents.from_list(box) for sid, box in self.meta["sources"].items()}
+
+    def sources_window(self, patterns: Iterable[str]) -> Optional[Extents]:
+        """Emprise réunie des sources dont l'identifiant correspond à l'un des motifs (fnmatch).
+
+        Returns:
+            Emprise des sources trouvées, ou None si aucune ne correspond
+        """
+        window = None
+        for sid, box in self.sources.items():
+            if box is not None and any(fnmatch.fnmatch(sid, pattern) for pattern in patterns):
+                window = box.union(window)
+        return window
+
+    def query(self, window: Extents) -> "np.ndarray":
+        """Rangs des entités dont l'emprise coupe la fenêtre (dans l'ordre de l'assemblage)."""
+        grid = self.meta["grid"]
+        (x0, y0), cell, (nx, ny) = grid["origin"], grid["cell"], grid["shape"]
+        first_x = int(np.clip((window.xmin - x0) // cell, 0, nx - 1))
+        last_x = int(np.clip((window.xmax - x0) // cell, 0, nx - 1))
+        first_y = int(np.clip((window.ymin - y0) // cell, 0, ny - 1))
+        last_y = int(np.clip((window.ymax - y0) // cell, 0, ny - 1))
+        parts = [self.large]
+        for cy in range(first_y, last_y + 1):
+            first = cy * nx + first_x
+            parts.append(self.cell_items[self.cell_starts[first]:self.cell_starts[cy * nx + last_x + 1]])
+        candidates = np.unique(np.concatenate(parts))
+        boxes = self.boxes[candidates]
+        hit = ((boxes[:, 0] <= window.xmax) & (boxes[:, 2] >= window.xmin)
+               & (boxes[:, 1] <= window.ymax) & (boxes[:, 3] >= window.ymin))
+        return candidates[hit]
+
+    def write_region(self, rows: "np.ndarray", target_dxf: str) -> int:
+        """Écrit un DXF limité aux entités choisies, recopié depuis l'assemblage.
+
+        En-tête, tables, blocs et objets sont repris tels quels ; seule la section
+        ENTITIES est réduite aux entités choisies (et à celles de l'espace papier).
+
+        Args:
+            rows: Rangs des entités à garder
+            target_dxf: Chemin du DXF de zone à écrire
+
+        Returns:
+            Nombre d'entités de l'espace objet écrites
+        """
+        selected = np.union1d(rows, self.always)
+        spans = self.ranges[selected]
+        # Entités contiguës recopiées d'un seul tenant
+        merged = []
+        for start, end in spans.tolist():
+            if merged and merged[-1][1] == start:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+
+        tmp_path = target_dxf + ".tmp"
+        with open(self.output_dxf, "rb") as src, open(tmp_path, "wb") as dst:
+            for start, end in [[0, self.meta["prefix_end"]], *merged,
+                               [self.meta["suffix_start"], self.meta["output"]["size"]]]:
+                src.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ValueError("assemblage tronqué depuis la création de l'index")
+                    dst.write(chunk)
+                    remaining -= len(chunk)
+        os.replace(tmp_path, target_dxf)
+        return len(rows)
+
+
+def load_spatial_index(output_dxf: str) -> Optional[SpatialIndex]:
+    """Charge l'index spatial d'un assemblage s'il décrit bien le fichier actuel.
+
+    Args:
+        output_dxf: Chemin du fichier DXF assemblé
+
+    Returns:
+        L'index, ou None s'il est absent, périmé (sortie modifiée depuis) ou si NumPy est absent
+    """
+    if np is None:
+        return None
+    try:
+        with np.load(spatial_index_path(output_dxf)) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {key: data[key] for key in data.files if key != "meta"}
+        stat = os.stat(output_dxf)
+    except (OSError, ValueError, KeyError):
+        return None
+    if (meta.get("format") != INDEX_FORMAT
+            or meta.get("output") != {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}):
+        return None
+    return SpatialIndex(output_dxf, meta, arrays)
+
+
+def extract_region(output_dxf: str, target_dxf: str, window: Optional[Sequence[float]] = None,
+                   sources: Optional[List[str]] = None) -> Tuple[int, Extents]:
+    """Écrit la zone d'un assemblage indexé : fenêtre X/Y, sources choisies, ou leur intersection.
+
+    Args:
+        output_dxf: Chemin du fichier DXF assemblé (avec son index)
+        target_dxf: Chemin du DXF de zone à écrire
+        window: Fenêtre [xmin, ymin, xmax, ymax], ou None
+        sources: Motifs (fnmatch) d'identifiants de source (archive/membre), ou None
+
+    Returns:
+        Tuple (nombre d'entités écrites, fenêtre utilisée)
+
+    Raises:
+        ValueError: Index absent ou périmé, aucune source trouvée, zone vide
+    """
+    index = load_spatial_index(output_dxf)
+    if index is None:
+        raise ValueError(f"index spatial absent ou périmé : {spatial_index_path(output_dxf)} "
+                         f"(relancer l'assemblage avec l'index spatial)")
+    region = Extents.from_list(window) if window else None
+    if sources:
+        found = index.sources_window(sources)
+        if found is None:
+            raise ValueError(f"aucune source ne correspond à : {', '.join(sources)}")
+        region = found if region is None else Extents(
+            max(region.xmin, found.xmin), max(region.ymin, found.ymin),
+            min(region.xmax, found.xmax), min(region.ymax, found.ymax))
+    if region is None:
+        raise ValueError("préciser une fenêtre ou des sources")
+    if region.xmin > region.xmax or region.ymin > region.ymax:
+        raise ValueError("zone vide")
+    rows = index.query(region)
+    return index.write_region(rows, target_dxf), region
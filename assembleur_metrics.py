@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : instrumentation du traitement
+- Durée réelle et CPU, octets lus/écrits et mémoire (RSS) de chaque étape et de chaque source
+- Flux d'événements (auditeurs), export JSON ou CSV
+- Profilage optionnel (cProfile ou pyinstrument) d'une étape choisie
+
+Les compteurs (CPU, octets, RSS) sont ceux du processus : quand plusieurs étapes
+s'exécutent en même temps dans des threads, leurs mesures se recouvrent.
+"""
+
+import cProfile
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+# Étapes mesurées (les étapes par source sont imbriquées dans "extraction" et "merge")
+STAGES = (
+    "listing",      # recherche des archives
+    "extraction",   # décompression (globale, puis par archive)
+    "collect",      # recherche des DXF dans les dossiers
+    "validation",   # validation préalable (sans lecture unique)
+    "parse",        # lecture d'une source (ou relecture depuis le cache)
+    "cleanup",      # nettoyage d'une source
+    "extents",      # calcul de l'emprise d'une source
+    "import",       # import de l'espace objet d'une source
+    "finalize",     # finalisation de l'import (tables, blocs)
+    "spool",        # écriture en flux des entités importées (--streaming)
+    "simplify",     # simplification des polylignes et arrondi des coordonnées de l'assemblage
+    "saveas",       # écriture d'un document (partiel ou assemblage)
+    "index",        # index spatial de l'assemblage
+    "geopackage",   # export GeoPackage de l'assemblage (--geopackage)
+    "merge",        # fusion complète
+    "dwg",          # conversion DWG (AutoCAD ou ODA File Converter)
+    "autocad",      # ouverture (et conversion DWG) dans AutoCAD
+)
+
+# Profileurs disponibles pour l'étape choisie
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+@dataclass
+class StageMetrics:
+    """Mesures d'une exécution d'étape (source None : étape globale)."""
+    stage: str
+    source: Optional[str] = None
+    started: float = 0.0
+    wall: float = 0.0
+    cpu: float = 0.0
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+    rss: Optional[int] = None
+    peak_rss: Optional[int] = None
+    pid: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+# Champs exportés (ordre des colonnes CSV)
+METRIC_FIELDS = tuple(f.name for f in fields(StageMetrics))
+
+_proc_io_available = sys.platform.startswith("linux")
+_psutil_process = None
+
+
+def _read_proc_io() -> Tuple[Optional[int], Optional[int]]:
+    """Octets lus/écrits par le processus (Linux : tous les read/write, cache compris)."""
+    global _proc_io_available
+    if not _proc_io_available:
+        return None, None
+    try:
+        with open("/proc/self/io", "rb") as f:
+            values = dict(line.split(b":", 1) for line in f.read().splitlines() if b":" in line)
+        return int(values[b"rchar"]), int(values[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        # /proc/self/io parfois illisible (conteneurs) : ne plus essayer
+        _proc_io_available = False
+        return None, None
+
+
+def process_snapshot() -> Tuple[float, Optional[int], Optional[int], Optional[int], Optional[int]]:
+    """Relevé instantané des compteurs du processus courant.
+
+    Returns:
+        Tuple (temps CPU, octets lus, octets écrits, RSS, RSS maximal) ;
+        None pour les compteurs non disponibles sur la plateforme
+    """
+    global _psutil_process
+    cpu = time.process_time()
+    bytes_read, bytes_written = _read_proc_io()
+    rss = peak_rss = None
+
+    if psutil is not None:
+        if _psutil_process is None or _psutil_process.pid != os.getpid():
+            _psutil_process = psutil.Process()
+        try:
+            mem = _psutil_process.memory_info()
+            rss = mem.rss
+            peak_rss = getattr(mem, "peak_wset", None)
+            if bytes_read is None:
+                io_counters = _psutil_process.io_counters()
+                bytes_read, bytes_written = io_counters.read_bytes, io_counters.write_bytes
+        except (psutil.Error, AttributeError, OSError):
+            pass
+    elif sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "rb") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            pass
+
+    if peak_rss is None and resource is not None:
+        # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != "darwin":
+            peak_rss *= 1024
+    if rss is not None and peak_rss is not None:
+        # Relevés de sources différentes : le maximum ne peut être inférieur à l'actuel
+        peak_rss = max(peak_rss, rss)
+    return cpu, bytes_read, bytes_written, rss, peak_rss
+
+
+def _delta(after: Optional[int], before: Optional[int]) -> Optional[int]:
+    if after is None or before is None:
+        return None
+    return after - before
+
+
+class MetricsRecorder:
+    """Enregistre les mesures des étapes et les diffuse à des auditeurs.
+
+    Une copie transmise à un processus de travail (pickle) repart vide, sans
+    auditeurs ni profilage ; ses mesures sont renvoyées au processus principal
+    (voir extend).
+    """
+
+    def __init__(self, profile_stage: Optional[str] = None, profiler: str = "cprofile"):
+        """
+        Args:
+            profile_stage: Étape à profiler (None = pas de profilage)
+            profiler: "cprofile" ou "pyinstrument"
+        """
+        if profile_stage is not None and profile_stage not in STAGES:
+            raise ValueError(f"Étape inconnue : {profile_stage} (étapes : {', '.join(STAGES)})")
+        if profiler not in PROFILERS:
+            raise ValueError(f"Profileur inconnu : {profiler} ({', '.join(PROFILERS)})")
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.records: List[StageMetrics] = []
+        self._listeners: List[Callable[[StageMetrics], None]] = []
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._profile = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(records=[], _listeners=[], _lock=None, _profile_lock=None,
+                     _profile=None, profile_stage=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+
+    # --- Auditeurs ---
+    def add_listener(self, listener: Callable[[StageMetrics], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[StageMetrics], None]) -> None:
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    # --- Mesures ---
+    def clear(self) -> None:
+        """Oublie les mesures enregistrées (le profil accumulé est conservé)."""
+        with self._lock:
+            self.records = []
+
+    @contextmanager
+    def measure(self, stage: str, source: Optional[str] = None):
+        """Mesure un bloc de code comme une exécution de l'étape.
+
+        Args:
+            stage: Nom de l'étape (voir STAGES)
+            source: Source concernée (archive, fichier DXF, document partiel), ou None
+        """
+        started = time.time()
+        before = process_snapshot()
+        start = time.perf_counter()
+        profiling = self._start_profile(stage)
+        try:
+            yield
+        finally:
+            if profiling:
+                self._stop_profile()
+            wall = time.perf_counter() - start
+            after = process_snapshot()
+            self.add(StageMetrics(
+                stage=stage, source=source, started=started, wall=wall,
+                cpu=after[0] - before[0],
+                bytes_read=_delta(after[1], before[1]),
+                bytes_written=_delta(after[2], before[2]),
+                rss=after[3], peak_rss=after[4], pid=os.getpid(),
+            ))
+
+    def add(self, record: StageMetrics) -> None:
+        """Enregistre une mesure et la diffuse aux auditeurs."""
+        with self._lock:
+            self.records.append(record)
+        for listener in list(self._listeners):
+            try:
+                listener(record)
+            except Exception as e:
+                logger.warning(f"Erreur d'un auditeur de mesures: {e}", exc_info=True)
+
+    def extend(self, records: Iterable[Union[StageMetrics, dict]]) -> None:
+        """Ajoute des mesures faites ailleurs (processus de travail)."""
+        for record in records:
+            self.add(record if isinstance(record, StageMetrics) else StageMetrics(**record))
+
+    def totals(self) -> dict:
+        """Cumul par étape.
+
+        Une étape mesurée globalement (source None) est cumulée sur ces seules mesures ;
+        sinon, sur ses mesures par source. Les étapes par source exécutées dans des
+        processus de travail cumulent leurs durées (supérieures au temps écoulé).
+
+        Returns:
+            {étape: {calls, wall, cpu, bytes_read, bytes_written, peak_rss}}
+        """
+        with self._lock:
+            records = list(self.records)
+        by_stage = {}
+        for record in records:
+            by_stage.setdefault(record.stage, []).append(record)
+
+        totals = {}
+        for stage, stage_records in by_stage.items():
+            global_records = [r for r in stage_records if r.source is None]
+            selected = global_records or stage_records
+            totals[stage] = {
+                "calls": len(selected),
+                "wall": sum(r.wall for r in selected),
+                "cpu": sum(r.cpu for r in selected),
+                "bytes_read": _sum_known(r.bytes_read for r in selected),
+                "bytes_written": _sum_known(r.bytes_written for r in selected),
+                "peak_rss": max((r.peak_rss for r in selected if r.peak_rss is not None), default=None),
+            }
+        return totals
+
+    # --- Export ---
+    def to_json(self, path: str, extra: Optional[dict] = None) -> None:
+        """Écrit les mesures détaillées et les cumuls par étape en JSON."""
+        data = dict(extra or {})
+        data["totals"] = self.totals()
+        data["records"] = [r.as_dict() for r in self.records]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def to_csv(self, path: str) -> None:
+        """Écrit les mesures détaillées en CSV (une ligne par exécution d'étape)."""
+        write_metrics_csv(path, (r.as_dict() for r in self.records))
+
+    # --- Profilage ---
+    def _start_profile(self, stage: str) -> bool:
+        if stage != self.profile_stage:
+            return False
+        # Un seul profil actif à la fois (les autres threads de la même étape ne sont pas profilés)
+        if not self._profile_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._profile is None:
+                if self.profiler == "pyinstrument":
+                    from pyinstrument import Profiler
+                    self._profile = Profiler()
+                else:
+                    self._profile = cProfile.Profile()
+            if self.profiler == "pyinstrument":
+                self._profile.start()
+            else:
+                self._profile.enable()
+            return True
+        except ImportError as e:
+            # pyinstrument absent : profilage abandonné pour la suite
+            logger.warning(f"Profilage de l'étape {stage} impossible: {e}")
+            self.profile_stage = None
+            self._profile_lock.release()
+            return False
+        except (ValueError, RuntimeError) as e:
+            # Autre profileur déjà actif (Python 3.12+ : un seul à la fois)
+            logger.warning(f"Profilage de l'étape {stage} impossible: {e}")
+            self._profile_lock.release()
+            return False
+
+    def _stop_profile(self) -> None:
+        try:
+            if self.profiler == "pyinstrument":
+                self._profile.stop()
+            else:
+                self._profile.disable()
+        finally:
+            self._profile_lock.release()
+
+    def dump_profile(self, path: str) -> bool:
+        """Écrit le profil cumulé de l'étape profilée.
+
+        cProfile : fichier de statistiques (pstats, snakeviz…) ; pyinstrument : page HTML.
+
+        Returns:
+            False si aucun profil n'a été collecté
+        """
+        if self._profile is None:
+            return False
+        if self.profiler == "pyinstrument":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profile.output_html())
+        else:
+            self._profile.dump_stats(path)
+        return True
+
+
+def _sum_known(values: Iterable[Optional[int]]) -> Optional[int]:
+    known = [v for v in values if v is not None]
+    return sum(known) if known else None
+
+
+def measure(metrics: Optional[MetricsRecorder], stage: str, source: Optional[str] = None):
+    """metrics.measure(stage, source), ou un contexte vide si metrics vaut None."""
+    if metrics is None:
+        return nullcontext()
+    return metrics.measure(stage, source)
+
+
+def write_metrics_csv(path: str, rows: Iterable[dict], extra_fields: Tuple[str, ...] = ()) -> None:
+    """Écrit des mesures (dictionnaires de StageMetrics) en CSV.
+
+    Args:
+        path: Fichier CSV à écrire
+        rows: Mesures à écrire
+        extra_fields: Colonnes supplémentaires, placées en tête (ex. nom de la tâche)
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(extra_fields) + list(METRIC_FIELDS))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : écriture du DXF assemblé dans plusieurs formats
+- ascii : DXF texte (défaut, lisible par tous les logiciels)
+- binary : DXF binaire (fichier plus petit, écriture et relecture plus rapides)
+- gzip : DXF texte compressé (assemblage.dxf.gz, lisible par QGIS via /vsigzip/)
+- zip : DXF texte dans une archive (assemblage.zip, lisible par QGIS via /vsizip/)
+
+Les balises sont écrites au fil de l'eau dans le fichier (ou le flux compressé) à travers
+un tampon de taille fixe : le texte complet du DXF n'est jamais construit en mémoire.
+Le fichier est écrit sous un nom temporaire puis renommé.
+"""
+
+import gzip
+import io
+import os
+import zipfile
+
+from ezdxf.document import Drawing
+
+# Formats de sortie
+OUTPUT_FORMATS = ("ascii", "binary", "gzip", "zip")
+
+# Niveau de compression (gzip et zip) : bon compromis taille/durée pour les plans cadastre
+OUTPUT_COMPRESSLEVEL = 6
+
+# Tampon d'écriture : regroupe les nombreuses petites écritures de balises
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# Suffixe ajouté au nom du fichier de sortie, par format
+_SUFFIXES = {"ascii": "", "binary": "", "gzip": ".gz", "zip": ".zip"}
+
+
+def output_path(output_dxf: str, fmt: str) -> str:
+    """Chemin du fichier écrit pour un format (assemblage.dxf, assemblage.dxf.gz, assemblage.zip)."""
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Format de sortie inconnu : {fmt} (formats : {', '.join(OUTPUT_FORMATS)})")
+    if fmt == "zip":
+        return os.path.splitext(output_dxf)[0] + _SUFFIXES[fmt]
+    return output_dxf + _SUFFIXES[fmt]
+
+
+def output_format_of(path: str) -> str:
+    """Format d'un fichier de sortie d'après son nom (ascii ou binary : ascii, non distingués)."""
+    lower = path.lower()
+    if lower.endswith(".gz"):
+        return "gzip"
+    if lower.endswith(".zip"):
+        return "zip"
+    return "ascii"
+
+
+def output_stem(path: str) -> str:
+    """Chemin sans extension de format (assemblage.dxf.gz et assemblage.zip → assemblage)."""
+    stem = path
+    if output_format_of(stem) != "ascii":
+        stem = os.path.splitext(stem)[0]
+    return os.path.splitext(stem)[0]
+
+
+def zip_member_name(path: str) -> str:
+    """Nom du DXF stocké dans une sortie zip."""
+    return os.path.basename(output_stem(path)) + ".dxf"
+
+
+def qgis_source(path: str) -> str:
+    """Chemin à transmettre à QGIS (système de fichiers virtuel GDAL pour les sorties compressées)."""
+    fmt = output_format_of(path)
+    if fmt == "gzip":
+        return "/vsigzip/" + path
+    if fmt == "zip":
+        return f"/vsizip/{path}/{zip_member_name(path)}"
+    return path
+
+
+def write_dxf(doc: Drawing, path: str, fmt: str = "ascii", entities=None) -> int:
+    """Écrit un document dans le format demandé, en flux.
+
+    Args:
+        doc: Document à écrire
+        path: Chemin du fichier (voir output_path)
+        fmt: Format de sortie (voir OUTPUT_FORMATS)
+        entities: Section ENTITIES déjà écrite au fil de l'eau (EntitySpool du même format), ou None
+
+    Returns:
+        Taille du fichier écrit (octets)
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Format de sortie inconnu : {fmt} (formats : {', '.join(OUTPUT_FORMATS)})")
+    tmp_path = path + ".tmp"
+    if entities is not None:
+        # Section ENTITIES recopiée depuis le fichier temporaire au lieu de l'espace objet
+        section, doc.entities = doc.entities, entities
+    try:
+        if fmt == "binary":
+            with open(tmp_path, "wb", buffering=OUTPUT_BUFFER_SIZE) as f:
+                if entities is not None:
+                    entities.output = f
+                doc.write(f, fmt="bin")
+        elif fmt == "gzip":
+            with open(tmp_path, "wb") as f, \
+                    gzip.GzipFile(filename=zip_member_name(path), fileobj=f, mode="wb",
+                                  compresslevel=OUTPUT_COMPRESSLEVEL) as raw:
+                _write_text(doc, raw)
+        elif fmt == "zip":
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED,
+                                 compresslevel=OUTPUT_COMPRESSLEVEL) as archive:
+                with archive.open(zip_member_name(path), "w", force_zip64=True) as raw:
+                    _write_text(doc, raw)
+        else:
+            with io.open(tmp_path, "wt", encoding=doc.output_encoding, errors="dxfreplace",
+                         buffering=OUTPUT_BUFFER_SIZE) as f:
+                doc.write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        if entities is not None:
+            doc.entities = section
+            entities.output = None
+    return os.path.getsize(path)
+
+
+def _write_text(doc: Drawing, raw) -> None:
+    """DXF texte vers un flux binaire, avec l'encodage et la gestion d'erreurs d'ezdxf."""
+    buffered = io.BufferedWriter(_Unclosable(raw), buffer_size=OUTPUT_BUFFER_SIZE)
+    stream = io.TextIOWrapper(buffered, encoding=doc.output_encoding, errors="dxfreplace")
+    doc.write(stream)
+    stream.flush()
+    stream.detach()
+    buffered.flush()
+
+
+class _Unclosable(io.RawIOBase):
+    """Adaptateur d'un flux binaire (gzip, membre zip) pour io.BufferedWriter, sans le fermer."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._raw.write(data)
+        return len(data)
+
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : aperçu rapide des archives .tar.bz2 (sans extraction ni chargement)
+- Chaque archive est lue en flux, en une passe ; chaque DXF est parcouru paire par paire
+  (code de groupe / valeur) sans construire de document ezdxf
+- Par DXF : taille, version, nombre d'entités par type et par calque, emprise approximative
+  (points principaux et sommets des entités de l'espace objet)
+- Cache des aperçus (JSON) par chemin, taille et date de l'archive : un dossier déjà
+  parcouru s'affiche immédiatement
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import tarfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
+
+from ezdxf.lldxf.const import acad_release
+from ezdxf.tools.codepage import toencoding
+
+from assembleur_core import default_cache_dir
+from assembleur_extents import Extents
+
+logger = logging.getLogger(__name__)
+
+
+PREVIEW_FORMAT = 1
+
+# Nombre maximal d'archives gardées dans le cache des aperçus (les plus anciennement vues sont évincées)
+PREVIEW_CACHE_MAX_ENTRIES = 5000
+
+# Nombre maximal d'archives parcourues en même temps (processus)
+PREVIEW_MAX_WORKERS = 4
+
+# En dessous de ce volume d'archives à parcourir, le démarrage des processus coûte plus qu'il ne rapporte
+PREVIEW_PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+# Début d'un DXF binaire (non parcouru : taille seule)
+_BINARY_DXF_SENTINEL = b"AutoCAD Binary DXF\r\n\x1a\x00"
+
+# Sous-entités non comptées comme entités de l'espace objet (leurs sommets comptent dans l'emprise)
+_SUB_ENTITY_TYPES = (b"VERTEX", b"SEQEND", b"ATTRIB")
+
+
+def default_preview_cache_path() -> str:
+    """Fichier par défaut du cache des aperçus (à côté du cache des sources, hors de son éviction)."""
+    return os.path.join(os.path.dirname(default_cache_dir()), "apercu.json")
+
+
+@dataclass
+class MemberPreview:
+    """Aperçu d'un DXF d'une archive."""
+    name: str
+    size: int
+    version: Optional[str] = None
+    binary: bool = False
+    entities: int = 0
+    types: Dict[str, int] = field(default_factory=dict)
+    layers: Dict[str, int] = field(default_factory=dict)
+    extents: Optional[List[float]] = None
+    error: Optional[str] = None
+
+    @property
+    def release(self) -> Optional[str]:
+        """Version AutoCAD lisible (R2010…), ou la version DXF brute."""
+        return acad_release.get(self.version, self.version) if self.version else None
+
+
+@dataclass
+class ArchivePreview:
+    """Aperçu d'une archive .tar.bz2 : ses DXF et leurs totaux."""
+    path: str
+    size: int
+    mtime_ns: int
+    members: List[MemberPreview] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def dxf_bytes(self) -> int:
+        return sum(member.size for member in self.members)
+
+    @property
+    def entities(self) -> int:
+        return sum(member.entities for member in self.members)
+
+    @property
+    def layers(self) -> Dict[str, int]:
+        """Nombre d'entités par calque, tous DXF confondus."""
+        layers = {}
+        for member in self.members:
+            for name, count in member.layers.items():
+                layers[name] = layers.get(name, 0) + count
+        return layers
+
+    @property
+    def versions(self) -> List[str]:
+        return sorted({member.release for member in self.members if member.release})
+
+    @property
+    def extents(self) -> Optional[Extents]:
+        box = None
+        for member in self.members:
+            if member.extents:
+                box = Extents.from_list(member.extents).union(box)
+        return box
+
+    def summary(self) -> str:
+        """Résumé d'une ligne (liste des archives, journal)."""
+        if self.error:
+            return f"⚠️ {self.error}"
+        text = (f"{len(self.members)} DXF, {self.dxf_bytes / (1024 * 1024):.1f} Mo, "
+                f"{self.entities} entités, {len(self.layers)} calque(s)")
+        if self.versions:
+            text += f", {'/'.join(self.versions)}"
+        return text
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ArchivePreview":
+        members = [MemberPreview(**member) for member in data.get("members", [])]
+        return cls(data["path"], data["size"], data["mtime_ns"], members, data.get("error"))
+
+
+def scan_dxf_stream(stream: BinaryIO, member: MemberPreview) -> None:
+    """Parcourt un flux DXF ASCII paire par paire et renseigne l'aperçu d'un membre.
+
+    Seules les sections HEADER (version, page de codes) et ENTITIES sont examinées ;
+    l'emprise retient les points de code 10/20 (point principal, sommets, points de contrôle).
+    """
+    readline = stream.readline
+    section = None
+    expect_section_name = False
+    header_var = None
+    codepage = None
+    in_entities = False
+    counting_layer = False
+    types = {}
+    layers = {}
+    x = None
+    xmin = ymin = float("inf")
+    xmax = ymax = float("-inf")
+    while True:
+        code_line = readline()
+        value_line = readline()
+        if not value_line:
+            member.error = "Fin de fichier inattendue"
+            break
+        try:
+            code = int(code_line)
+        except ValueError:
+            member.error = f"Code de groupe invalide : {code_line.strip()[:20]!r}"
+            break
+        value = value_line.strip()
+        if expect_section_name:
+            section = value
+            in_entities = section == b"ENTITIES"
+            expect_section_name = False
+        elif code == 0:
+            # Calque compté pour les entités de l'espace objet seulement (pas leurs sommets)
+            counting_layer = False
+            if value == b"SECTION":
+                expect_section_name = True
+            elif value == b"ENDSEC":
+                section = None
+                in_entities = False
+            elif value == b"EOF":
+                break
+            elif in_entities and value not in _SUB_ENTITY_TYPES:
+                types[value] = types.get(value, 0) + 1
+                member.entities += 1
+                counting_layer = True
+        elif in_entities:
+            if code == 8 and counting_layer:
+                layers[value] = layers.get(value, 0) + 1
+                counting_layer = False
+            elif code == 10:
+                try:
+                    x = float(value)
+                except ValueError:
+                    x = None
+            elif code == 20 and x is not None:
+                try:
+                    y = float(value)
+                except ValueError:
+                    continue
+                if x < xmin:
+                    xmin = x
+                if x > xmax:
+                    xmax = x
+                if y < ymin:
+                    ymin = y
+                if y > ymax:
+                    ymax = y
+                x = None
+        elif section == b"HEADER":
+            if code == 9:
+                header_var = value
+            elif header_var == b"$ACADVER" and code == 1:
+                member.version = value.decode("ascii", "replace")
+            elif header_var == b"$DWGCODEPAGE" and code == 3:
+                codepage = value.decode("ascii", "replace")
+
+    member.version = member.version or "AC1009"
+    # Depuis R2007 (AC1021), les fichiers DXF sont toujours en UTF-8
+    encoding = "utf-8" if member.version >= "AC1021" else toencoding(codepage or "ANSI_1252")
+    member.types = {name.decode("ascii", "replace"): count for name, count in types.items()}
+    member.layers = {name.decode(encoding, "replace"): count for name, count in layers.items()}
+    if xmin <= xmax:
+        member.extents = [xmin, ymin, xmax, ymax]
+
+
+def scan_archive(path: str, cancel_event: Optional[threading.Event] = None) -> ArchivePreview:
+    """Aperçu d'une archive .tar.bz2, lue en flux en une seule passe.
+
+    Fonction de module : utilisable telle quelle dans un ProcessPoolExecutor.
+
+    Args:
+        path: Chemin de l'archive
+        cancel_event: Interrompt le parcours entre deux membres (aperçu incomplet)
+
+    Returns:
+        Aperçu de l'archive (error renseigné si elle est illisible ou tronquée)
+    """
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        return ArchivePreview(path, 0, 0, error=f"Archive illisible : {e}")
+    preview = ArchivePreview(path, stat.st_size, stat.st_mtime_ns)
+    try:
+        with open(path, "rb") as raw, tarfile.open(fileobj=raw, mode="r|bz2") as tar:
+            for m in tar:
+                if cancel_event is not None and cancel_event.is_set():
+                    preview.error = "Aperçu interrompu"
+                    break
+                if not m.isfile() or not m.name.lower().endswith(".dxf"):
+                    continue
+                member = MemberPreview(m.name, m.size)
+                preview.members.append(member)
+                f = tar.extractfile(m)
+                if f is None:
+                    member.error = "Membre illisible"
+                    continue
+                # Lecture en flux : le début du membre est examiné sans le consommer
+                if f.peek(len(_BINARY_DXF_SENTINEL))[:len(_BINARY_DXF_SENTINEL)] == _BINARY_DXF_SENTINEL:
+                    member.binary = True
+                    continue
+                scan_dxf_stream(f, member)
+    except (OSError, EOFError, tarfile.TarError) as e:
+        preview.error = f"Archive illisible : {e}"
+    return preview
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class PreviewCache:
+    """Cache des aperçus d'archives (fichier JSON), valide tant que taille et date sont inchangées.
+
+    Args:
+        path: Fichier du cache (voir default_preview_cache_path)
+        max_entries: Nombre maximal d'archives gardées
+    """
+
+    def __init__(self, path: str, max_entries: int = PREVIEW_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._entries = data.get("archives", {}) if data.get("format") == PREVIEW_FORMAT else {}
+            except (OSError, ValueError, AttributeError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, path: str) -> Optional[ArchivePreview]:
+        """Aperçu en cache d'une archive, ou None s'il est absent ou périmé."""
+        key = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None or entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+                return None
+            entry["seen"] = time.time()
+            self._dirty = True
+        try:
+            preview = ArchivePreview.from_dict(entry)
+        except (KeyError, TypeError):
+            return None
+        preview.path = path
+        return preview
+
+    def put(self, preview: ArchivePreview) -> None:
+        """Enregistre l'aperçu d'une archive (écrit sur disque par save)."""
+        with self._lock:
+            self._load()[os.path.abspath(preview.path)] = {**preview.as_dict(), "seen": time.time()}
+            self._dirty = True
+
+    def save(self) -> None:
+        """Écrit le cache (écriture atomique), en évinçant les archives les plus anciennement vues."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._load()
+            for key in sorted(entries, key=lambda k: entries[k].get("seen", 0))[:max(0, len(entries) - self.max_entries)]:
+                del entries[key]
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"format": PREVIEW_FORMAT, "archives": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def iter_archive_previews(paths: List[str], cache: Optional[PreviewCache] = None,
+                          workers: Optional[int] = None,
+                          cancel_event: Optional[threading.Event] = None) -> Iterator[ArchivePreview]:
+    """Aperçus d'une liste d'archives : d'abord ceux du cache, puis les autres au fil des parcours.
+
+    Les archives absentes du cache sont parcourues en parallèle (processus) au-delà de
+    PREVIEW_PARALLEL_MIN_BYTES ; les résultats sont produits dans l'ordre d'achèvement et
+    enregistrés dans le cache.
+
+    Args:
+        paths: Archives .tar.bz2
+        cache: Cache des aperçus, ou None
+        workers: Nombre de processus (None = automatique)
+        cancel_event: Interrompt les parcours encore en attente
+
+    Yields:
+        Un ArchivePreview par archive (sauf annulation)
+    """
+    to_scan = []
+    for path in paths:
+        cached = cache.get(path) if cache is not None else None
+        if cached is not None:
+            yield cached
+        else:
+            to_scan.append(path)
+    if not to_scan:
+        return
+
+    workers = max(1, min(workers or min(PREVIEW_MAX_WORKERS, os.cpu_count() or 1), len(to_scan)))
+    if workers > 1 and sum(_file_size(path) for path in to_scan) < PREVIEW_PARALLEL_MIN_BYTES:
+        workers = 1
+    try:
+        if workers == 1:
+            for path in to_scan:
+                preview = scan_archive(path, cancel_event)
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                if cache is not None:
+                    cache.put(preview)
+                yield preview
+            return
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures = [executor.submit(scan_archive, path) for path in to_scan]
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                preview = future.result()
+                if cache is not None:
+                    cache.put(preview)
+                yield preview
+        finally:
+            # Annulation : les archives en cours de parcours se terminent sans être attendues
+            executor.shutdown(wait=cancel_event is None or not cancel_event.is_set(), cancel_futures=True)
+    finally:
+        if cache is not None:
+            try:
+                cache.save()
+            except OSError as e:
+                logger.warning(f"Cache des aperçus non enregistré : {e}")
+
+
+def preview_archives(paths: List[str], cache: Optional[PreviewCache] = None,
+                     on_preview: Optional[Callable[[ArchivePreview], None]] = None,
+                     workers: Optional[int] = None) -> List[ArchivePreview]:
+    """Aperçus d'une liste d'archives, dans l'ordre de la liste (voir iter_archive_previews)."""
+    by_path = {}
+    for preview in iter_archive_previews(paths, cache, workers):
+        by_path[preview.path] = preview
+        if on_preview is not None:
+            on_preview(preview)
+    return [by_path[path] for path in paths if path in by_path]
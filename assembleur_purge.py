@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : purge en mémoire des définitions inutilisées d'un document
+- Un seul parcours des entités de toutes les présentations, puis des blocs qu'elles
+  référencent (blocs imbriqués, géométrie des cotes, flèches des styles de cote)
+- Ressources relevées : calques, types de ligne, styles de texte et blocs, par nom,
+  par handle (objets, fenêtres, styles de cote) ou dans les données étendues (XDATA)
+- Seuls les blocs, calques, types de ligne et styles de texte jamais référencés sont
+  supprimés ; le document n'est ni relu ni réécrit
+
+Les blocs anonymes (*U, *D…), les références externes et les entrées obligatoires
+(calque 0, Defpoints, style Standard, types ByLayer/ByBlock/Continuous) sont conservés.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import List, Set
+
+from ezdxf.document import Drawing
+from ezdxf.lldxf import const
+from ezdxf.render.arrows import ARROWS
+
+logger = logging.getLogger(__name__)
+
+
+# Version de la purge (clé du cache des sources nettoyées)
+PURGE_VERSION = 2
+
+# Entrées conservées même sans référence (noms en minuscules)
+_KEEP_LAYERS = frozenset(("0", "defpoints"))
+_KEEP_LINETYPES = frozenset(("bylayer", "byblock", "continuous"))
+_KEEP_STYLES = frozenset(("standard",))
+
+# Variables d'en-tête désignant la ressource courante
+_CURRENT_LAYER = "$CLAYER"
+_CURRENT_LINETYPE = "$CELTYPE"
+_CURRENT_STYLE = "$TEXTSTYLE"
+
+# Attributs des styles de cote désignant une flèche (bloc) ou un type de ligne
+_DIMSTYLE_ARROWS = ("dimblk", "dimblk1", "dimblk2", "dimldrblk")
+_DIMSTYLE_LINETYPES = ("dimltype", "dimltex1", "dimltex2")
+
+# Code de groupe d'un handle dans les données étendues
+_XDATA_HANDLE = 1005
+
+# Types sans autre ressource que calque, type de ligne et style (pas de recherche de handles)
+_PLAIN_TYPES = frozenset((
+    "LINE", "POINT", "CIRCLE", "ARC", "ELLIPSE", "SPLINE", "LWPOLYLINE", "POLYLINE", "VERTEX",
+    "SEQEND", "TEXT", "MTEXT", "ATTRIB", "ATTDEF", "INSERT", "HATCH", "SOLID", "TRACE", "3DFACE",
+    "RAY", "XLINE", "DIMENSION", "ARC_DIMENSION", "LEADER", "TOLERANCE", "WIPEOUT",
+))
+
+# Table de chaque entrée désignée par un handle
+_TABLE_TYPES = {"LAYER": "layers", "LTYPE": "linetypes", "STYLE": "styles", "BLOCK_RECORD": "blocks"}
+
+
+@dataclass
+class PurgeReport:
+    """Définitions supprimées par purge_unused (noms d'origine)."""
+    blocks: List[str] = field(default_factory=list)
+    layers: List[str] = field(default_factory=list)
+    linetypes: List[str] = field(default_factory=list)
+    styles: List[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return len(self.blocks) + len(self.layers) + len(self.linetypes) + len(self.styles)
+
+    def summary(self) -> str:
+        """Bilan d'une ligne pour le journal."""
+        return (f"{len(self.blocks)} bloc(s), {len(self.styles)} style(s), "
+                f"{len(self.layers)} calque(s), {len(self.linetypes)} type(s) de ligne supprimé(s)")
+
+
+class _Usage:
+    """Ressources référencées, relevées en un seul parcours (noms en minuscules)."""
+
+    def __init__(self, doc: Drawing):
+        self.doc = doc
+        self.layers: Set[str] = set(_KEEP_LAYERS)
+        self.linetypes: Set[str] = set(_KEEP_LINETYPES)
+        self.styles: Set[str] = set(_KEEP_STYLES)
+        self.blocks: Set[str] = set()
+        # Blocs référencés dont le contenu reste à parcourir
+        self._pending: List[str] = []
+
+    def block(self, name: str) -> None:
+        key = name.lower()
+        if key not in self.blocks:
+            self.blocks.add(key)
+            self._pending.append(name)
+
+    def entity(self, entity) -> None:
+        dxf = entity.dxf
+        self.layers.add(dxf.get("layer", "0").lower())
+        self.linetypes.add(dxf.get("linetype", "BYLAYER").lower())
+        kind = entity.dxftype()
+        if entity.is_supported_dxf_attrib("style"):
+            self.styles.add(dxf.get("style", "Standard").lower())
+        if kind == "INSERT":
+            self.block(dxf.name)
+            for attrib in entity.attribs:
+                self.entity(attrib)
+        elif kind in ("DIMENSION", "ARC_DIMENSION") and dxf.hasattr("geometry"):
+            self.block(dxf.geometry)
+        elif kind == "POLYLINE":
+            for vertex in entity.vertices:
+                self.layers.add(vertex.dxf.get("layer", "0").lower())
+        elif kind == "VIEWPORT":
+            for layer in entity.frozen_layers:
+                self.layers.add(layer.lower())
+        if kind not in _PLAIN_TYPES:
+            self.handles(entity)
+        if entity.xdata is not None:
+            for tags in entity.xdata.data.values():
+                for tag in tags:
+                    if tag.code == _XDATA_HANDLE:
+                        self.handle(tag.value)
+
+    def handles(self, entity) -> None:
+        """Relève les ressources désignées par les attributs *_handle d'une entité ou d'un objet."""
+        for key, value in entity.dxfattribs().items():
+            if key.endswith("_handle") and isinstance(value, str):
+                self.handle(value)
+
+    def handle(self, handle: str) -> None:
+        target = self.doc.entitydb.get(handle)
+        if target is None:
+            return
+        table = _TABLE_TYPES.get(target.dxftype())
+        if table == "blocks":
+            self.block(target.dxf.name)
+        elif table is not None:
+            getattr(self, table).add(target.dxf.name.lower())
+
+    def dimstyle(self, dimstyle) -> None:
+        dxf = dimstyle.dxf
+        if dxf.get("dimtxsty"):
+            self.styles.add(dxf.dimtxsty.lower())
+        for attrib in _DIMSTYLE_LINETYPES:
+            if dxf.get(attrib):
+                self.linetypes.add(dxf.get(attrib).lower())
+        for attrib in _DIMSTYLE_ARROWS:
+            if dxf.get(attrib):
+                self.block(ARROWS.block_name(dxf.get(attrib)))
+
+    def drain(self) -> None:
+        """Parcourt le contenu des blocs référencés (imbrication comprise)."""
+        blocks = self.doc.blocks
+        while self._pending:
+            block = blocks.get(self._pending.pop())
+            if block is None:
+                continue
+            self.layers.add(block.block.dxf.get("layer", "0").lower())
+            for entity in block:
+                self.entity(entity)
+
+
+def _protected_block(block) -> bool:
+    """Blocs jamais supprimés : présentations, anonymes et références externes."""
+    if block.is_any_layout or block.name.startswith("*"):
+        return True
+    return bool(block.block.dxf.get("flags", 0) & (const.BLK_XREF | const.BLK_XREF_OVERLAY | const.BLK_EXTERNAL))
+
+
+def _collect_usage(doc: Drawing) -> _Usage:
+    """Relève en un parcours toutes les ressources référencées par le document."""
+    usage = _Usage(doc)
+    header = doc.header
+    usage.layers.add(str(header.get(_CURRENT_LAYER, "0")).lower())
+    usage.linetypes.add(str(header.get(_CURRENT_LINETYPE, "BYLAYER")).lower())
+    usage.styles.add(str(header.get(_CURRENT_STYLE, "Standard")).lower())
+
+    # Présentations (espace objet et papier) : le point de départ du parcours
+    for layout in doc.layouts:
+        usage.blocks.add(layout.block_record_name.lower())
+        for entity in layout:
+            usage.entity(entity)
+    # Blocs conservés d'office : leur contenu compte aussi
+    for block in doc.blocks:
+        if _protected_block(block):
+            usage.block(block.name)
+    # Styles de cote (conservés) et objets (styles de multiligne, de tableau…)
+    for dimstyle in doc.dimstyles:
+        usage.dimstyle(dimstyle)
+    for obj in doc.objects:
+        usage.handles(obj)
+    usage.drain()
+
+    # Types de ligne des calques conservés, styles des types de ligne complexes
+    for layer in doc.layers:
+        if layer.dxf.name.lower() in usage.layers:
+            usage.linetypes.add(layer.dxf.get("linetype", "Continuous").lower())
+    for linetype in doc.linetypes:
+        if linetype.dxf.name.lower() in usage.linetypes and linetype.pattern_tags.is_complex_type():
+            usage.handle(linetype.pattern_tags.get_style_handle())
+    return usage
+
+
+def purge_unused(doc: Drawing) -> PurgeReport:
+    """Supprime les blocs, calques, types de ligne et styles de texte jamais référencés.
+
+    Args:
+        doc: Document DXF déjà chargé (modifié en place)
+
+    Returns:
+        Bilan des définitions supprimées
+    """
+    usage = _collect_usage(doc)
+    report = PurgeReport()
+
+    for block in list(doc.blocks):
+        name = block.name
+        if _protected_block(block) or name.lower() in usage.blocks:
+            continue
+        try:
+            # Aucune référence : inutile de laisser ezdxf les rechercher à nouveau
+            doc.blocks.delete_block(name, safe=False)
+            report.blocks.append(name)
+        except const.DXFError as e:
+            logger.debug(f"Bloc {name} conservé : {e}")
+
+    for table, used, removed in ((doc.layers, usage.layers, report.layers),
+                                 (doc.linetypes, usage.linetypes, report.linetypes),
+                                 (doc.styles, usage.styles, report.styles)):
+        for entry in list(table):
+            name = entry.dxf.name
+            # Les styles sans nom décrivent des fichiers de formes (types de ligne complexes, SHAPE)
+            if not name or name.lower() in used:
+                continue
+            try:
+                table.remove(name)
+                removed.append(name)
+            except const.DXFError as e:
+                logger.debug(f"Entrée {name} conservée : {e}")
+    return report
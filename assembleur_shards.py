@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : assemblage découpé en plusieurs DXF (mode « shards »)
+- Découpage par archive d'origine, par dalle de grille (centre de l'emprise de chaque
+  feuille) ou par budget d'entités ; le budget s'applique aussi aux deux autres modes
+- Chaque DXF est écrit dès qu'il est complet : seuls quelques documents restent ouverts
+- Chaque DXF ne reçoit que les calques, styles et blocs utilisés par ses entités, chaque
+  définition de bloc identique n'y étant importée qu'une fois
+- Index JSON (assemblage.shards.json) : fichier, sources, nombre d'entités et emprise de chaque DXF
+"""
+
+import json
+import logging
+import math
+import os
+import re
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+import ezdxf
+from ezdxf.addons import Importer
+from ezdxf.document import Drawing
+from ezdxf.entities import DXFEntity
+
+from assembleur_dedup import ImportDeduplicator
+from assembleur_extents import Extents
+from assembleur_index import build_spatial_index, remove_spatial_index
+from assembleur_metrics import MetricsRecorder, measure
+from assembleur_output import output_path, write_dxf
+
+logger = logging.getLogger(__name__)
+
+
+SHARDS_FORMAT = 1
+
+# Modes de découpage
+SHARD_MODES = ("archive", "tile", "budget")
+
+# Côté d'une dalle (unités du dessin, mètres en Lambert 93)
+SHARD_TILE_SIZE = 5000.0
+
+# Nombre maximal d'entités par DXF (au-delà, le DXF est écrit et une nouvelle partie commence)
+SHARD_MAX_ENTITIES = 500000
+
+# Nombre maximal de DXF ouverts en même temps (mode dalles ; archives hors ordre)
+SHARD_MAX_OPEN = 4
+
+# Clé des sources sans emprise en mode dalles
+_NO_EXTENTS_KEY = "sans_emprise"
+
+
+def shards_index_path(output_dxf: str) -> str:
+    """Chemin de l'index des DXF découpés associé à un assemblage (assemblage.shards.json)."""
+    return os.path.splitext(output_dxf)[0] + ".shards.json"
+
+
+def _safe_name(key: str) -> str:
+    """Nom de fichier sûr dérivé d'une clé de découpage."""
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", key).strip("._") or "x"
+
+
+def list_shards(output_dxf: str) -> List[str]:
+    """Chemins des DXF découpés listés par l'index d'un assemblage (liste vide sans index lisible)."""
+    try:
+        with open(shards_index_path(output_dxf), "r", encoding="utf-8") as f:
+            shards = json.load(f).get("shards", [])
+    except (OSError, ValueError):
+        return []
+    folder = os.path.dirname(os.path.abspath(output_dxf))
+    return [os.path.join(folder, os.path.basename(shard.get("file", ""))) for shard in shards]
+
+
+def remove_shards(output_dxf: str) -> int:
+    """Supprime les DXF découpés (et leurs index spatiaux) listés par l'index d'un assemblage précédent.
+
+    Returns:
+        Nombre de fichiers supprimés
+    """
+    path = shards_index_path(output_dxf)
+    removed = 0
+    for shard_path in list_shards(output_dxf):
+        remove_spatial_index(shard_path)
+        try:
+            os.remove(shard_path)
+            removed += 1
+        except OSError:
+            pass
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return removed
+
+
+class _OpenShard:
+    """DXF découpé en cours de remplissage."""
+
+    def __init__(self, key: str, part: int, dedup_blocks: bool):
+        self.key = key
+        self.part = part
+        self.doc = ezdxf.new("R2010")
+        self.dedup = ImportDeduplicator(self.doc) if dedup_blocks else None
+        self.sources = []
+        self.entities = 0
+        self.extents = None
+        self.source_extents = {}
+
+
+class ShardWriter:
+    """Répartit les sources importées entre plusieurs DXF écrits au fil de l'eau.
+
+    Args:
+        output_dxf: Chemin de l'assemblage (les DXF sont écrits à côté, préfixés par son nom)
+        mode: Mode de découpage (voir SHARD_MODES)
+        tile_size: Côté d'une dalle (mode « tile »)
+        max_entities: Nombre maximal d'entités par DXF (None : sans limite hors mode « budget »)
+        log: Fonction recevant les messages du journal
+        metrics: Reçoit les mesures des étapes import, finalize, saveas et index, ou None
+        spatial_index: Enregistrer l'index spatial de chaque DXF
+        approximate_extents: Emprises approximatives (index spatial)
+        dedup_blocks: Réutiliser les définitions de blocs identiques déjà importées dans chaque DXF
+        output_format: Format de chaque DXF écrit (voir OUTPUT_FORMATS ; index spatial en ascii seulement)
+        export: Reçoit (entités, nom du DXF) de chaque DXF avant son écriture (export GeoPackage), ou None
+    """
+
+    def __init__(self, output_dxf: str, mode: str, tile_size: float = SHARD_TILE_SIZE,
+                 max_entities: Optional[int] = SHARD_MAX_ENTITIES, log: Callable[[str], None] = logger.info,
+                 metrics: Optional[MetricsRecorder] = None, spatial_index: bool = False,
+                 approximate_extents: bool = False, dedup_blocks: bool = True, output_format: str = "ascii",
+                 export: Optional[Callable[[Iterable[DXFEntity], str], None]] = None):
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Mode de découpage inconnu : {mode} (modes : {', '.join(SHARD_MODES)})")
+        self.output_dxf = output_dxf
+        self.mode = mode
+        self.tile_size = float(tile_size)
+        if max_entities is None and mode == "budget":
+            max_entities = SHARD_MAX_ENTITIES
+        self.max_entities = max_entities
+        self.log = log
+        self.metrics = metrics
+        self.spatial_index = spatial_index
+        self.approximate_extents = approximate_extents
+        self.dedup_blocks = dedup_blocks
+        self.output_format = output_format
+        self.export = export
+        self._dedup_stats = {}
+        self.max_open = 1 if mode == "budget" else SHARD_MAX_OPEN
+        self.shards = []
+        self._open = OrderedDict()
+        self._parts = {}
+        self._folder = os.path.dirname(os.path.abspath(output_dxf))
+        self._stem = os.path.splitext(os.path.basename(output_dxf))[0]
+
+    def shard_key(self, source_id: str, extents: Optional[Extents]) -> str:
+        """Clé du DXF qui reçoit une source (archive, dalle ou budget)."""
+        if self.mode == "archive":
+            # Identifiant archive/membre (ou chemin d'un DXF de dossier : dossier parent)
+            head = source_id.split("/", 1)[0] if "/" in source_id and not os.path.isabs(source_id) \
+                else os.path.basename(os.path.dirname(source_id))
+            for suffix in (".tar.bz2", ".tbz2"):
+                if head.lower().endswith(suffix):
+                    head = head[:-len(suffix)]
+            return head or "dossier"
+        if self.mode == "tile":
+            if extents is None:
+                return _NO_EXTENTS_KEY
+            col = math.floor((extents.xmin + extents.xmax) / 2 / self.tile_size)
+            row = math.floor((extents.ymin + extents.ymax) / 2 / self.tile_size)
+            return f"t{col}_{row}"
+        return "budget"
+
+    def add(self, doc_src: Drawing, source_id: str, extents: Optional[Extents], label: str) -> int:
+        """Importe une source dans le DXF de sa clé (écrit les DXF complets si nécessaire).
+
+        Args:
+            doc_src: Document source (déjà chargé et nettoyé)
+            source_id: Identifiant stable de la source
+            extents: Emprise de la source, ou None
+            label: Nom court de la source (journal, mesures)
+
+        Returns:
+            Nombre d'entités importées
+        """
+        key = self.shard_key(source_id, extents)
+        shard = self._open.get(key)
+        if shard is None:
+            while len(self._open) >= self.max_open:
+                self._flush(next(iter(self._open)))
+            part = self._parts.get(key, 0) + 1
+            self._parts[key] = part
+            shard = self._open[key] = _OpenShard(key, part, self.dedup_blocks)
+        self._open.move_to_end(key)
+
+        msp_target = shard.doc.modelspace()
+        before = len(msp_target)
+        with measure(self.metrics, "import", label):
+            importer = shard.dedup.importer(doc_src) if shard.dedup is not None else Importer(doc_src, shard.doc)
+            importer.import_modelspace()
+        with measure(self.metrics, "finalize", label):
+            importer.finalize()
+        shard.sources.append(source_id)
+        shard.entities += len(msp_target) - before
+        shard.source_extents[source_id] = extents
+        if extents is not None:
+            shard.extents = extents.union(shard.extents)
+
+        if self.max_entities and shard.entities >= self.max_entities:
+            self._flush(key)
+        return len(doc_src.modelspace())
+
+    def _file_name(self, key: str, part: int) -> str:
+        name = f"{self._stem}_{_safe_name(key)}"
+        if self.mode == "budget":
+            name = f"{name}_{part:04d}"
+        elif part > 1:
+            # Seconde partie d'une même clé : budget atteint ou DXF refermé faute de place
+            name = f"{name}_p{part}"
+        return os.path.basename(output_path(f"{name}.dxf", self.output_format))
+
+    def _flush(self, key: str) -> None:
+        """Écrit le DXF d'une clé et libère son document."""
+        shard = self._open.pop(key)
+        if shard.dedup is not None:
+            for name, count in shard.dedup.stats().items():
+                self._dedup_stats[name] = self._dedup_stats.get(name, 0) + count
+        name = self._file_name(key, shard.part)
+        path = os.path.join(self._folder, name)
+        if self.export is not None:
+            self.export(shard.doc.modelspace(), name)
+        with measure(self.metrics, "saveas", name):
+            write_dxf(shard.doc, path, self.output_format)
+        entry = {
+            "file": name,
+            "key": key,
+            "part": shard.part,
+            "sources": shard.sources,
+            "entities": shard.entities,
+            "extents": shard.extents.as_list() if shard.extents is not None else None,
+        }
+        if self.spatial_index and self.output_format == "ascii":
+            try:
+                with measure(self.metrics, "index", name):
+                    build_spatial_index(shard.doc, path, shard.source_extents, self.approximate_extents)
+            except Exception as e:
+                logger.warning(f"Erreur index spatial {path}: {e}", exc_info=True)
+                self.log(f"⚠️ Index spatial non enregistré pour {name} : {e}")
+        self.shards.append(entry)
+        self.log(f"   💾 {name} : {shard.entities} entité(s), {len(shard.sources)} source(s)")
+
+    def close(self) -> List[dict]:
+        """Écrit les DXF encore ouverts puis l'index des DXF découpés.
+
+        Returns:
+            Entrées de l'index (une par DXF écrit)
+        """
+        while self._open:
+            self._flush(next(iter(self._open)))
+        index = {
+            "format": SHARDS_FORMAT,
+            "mode": self.mode,
+            "output_format": self.output_format,
+            "tile_size": self.tile_size if self.mode == "tile" else None,
+            "max_entities": self.max_entities,
+            "shards": self.shards,
+        }
+        path = shards_index_path(self.output_dxf)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+        return self.shards
+
+    def dedup_stats(self) -> dict:
+        """Bilan cumulé du dédoublonnage des DXF écrits (clés d'ImportDeduplicator.stats)."""
+        return dict(self._dedup_stats)
+
+    def discard(self) -> None:
+        """Abandonne les DXF encore ouverts (traitement annulé)."""
+        self._open.clear()
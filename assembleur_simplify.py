@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : simplification des géométries et arrondi des coordonnées
+- Arrondi des coordonnées à un nombre de décimales : sommets des LWPOLYLINE, POLYLINE et
+  SPLINE, points des LINE, POINT, CIRCLE, ARC, INSERT, TEXT et MTEXT
+- Simplification Douglas-Peucker (calcul NumPy sur les tableaux de sommets) des LWPOLYLINE
+  et POLYLINE 2D/3D sans arcs ni largeurs, et des SPLINE définies par leurs seuls points
+  d'ajustement ; les sommets répétés consécutifs sont retirés
+- Limites partagées entre feuilles : les sommets où les tracés se séparent (jonctions,
+  extrémités) sont conservés, et chaque tronçon entre deux jonctions est simplifié dans un
+  sens canonique : un même tronçon donne les mêmes sommets dans chaque feuille
+- Bilan : sommets avant/après, coordonnées arrondies et octets évités (estimation de la sortie texte)
+
+L'arrondi précède la simplification : deux feuilles qui décrivent une même limite à un
+bruit numérique près partagent alors exactement les mêmes sommets.
+"""
+
+import logging
+from array import array
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from ezdxf.document import Drawing
+from ezdxf.lldxf.tagwriter import TagCollector
+from ezdxf.math import Vec3
+
+from assembleur_extents import LWPOLYLINE_VERTEX_SIZE, in_wcs
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+# Nombre maximal de décimales (au-delà, l'arrondi ne change plus les coordonnées en mètres)
+SIMPLIFY_MAX_PRECISION = 12
+
+# Points arrondis des autres entités
+_POINT_ATTRIBUTES = {
+    "LINE": ("start", "end"),
+    "POINT": ("location",),
+    "CIRCLE": ("center",),
+    "ARC": ("center",),
+    "INSERT": ("insert",),
+    "TEXT": ("insert", "align_point"),
+    "MTEXT": ("insert",),
+}
+
+# Estimation des octets évités : une valeur sur _TEXT_SAMPLE_STEP est mise en texte
+# (pas impair : les X et les Y d'un même tableau sont mesurés à tour de rôle)
+_TEXT_SAMPLE_STEP = 7
+
+# POLYLINE lissée (sommets de courbe ou de spline ajoutés) : sommets conservés tels quels
+_POLYLINE_FITTED = 2 | 4
+
+
+@dataclass
+class SimplifyStats:
+    """Bilan de la simplification d'un document."""
+    entities: int = 0           # polylignes et splines parcourues
+    simplified: int = 0         # entités dont des sommets ont été retirés
+    vertices_before: int = 0
+    vertices_after: int = 0
+    junctions: int = 0          # sommets de jonction conservés (limites partagées, extrémités)
+    rounded: int = 0            # coordonnées modifiées par l'arrondi
+    bytes_saved: int = 0        # octets évités (estimation de la sortie texte)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _text_length(values: "np.ndarray") -> int:
+    """Nombre de caractères des valeurs écrites dans un DXF texte (représentation la plus courte)."""
+    return sum(map(len, map(repr, values.ravel().tolist())))
+
+
+class _TextSampler:
+    """Estime la longueur de texte d'un flux de valeurs en mesurant une valeur sur _TEXT_SAMPLE_STEP."""
+
+    def __init__(self):
+        self.position = 0
+
+    def length(self, values: "np.ndarray", other: Optional["np.ndarray"] = None) -> int:
+        """Longueur estimée de values, moins celle de other (mêmes positions) si fourni."""
+        flat = values.ravel()
+        start = -self.position % _TEXT_SAMPLE_STEP
+        self.position += len(flat)
+        measured = _text_length(flat[start::_TEXT_SAMPLE_STEP])
+        if other is not None:
+            measured -= _text_length(other.ravel()[start::_TEXT_SAMPLE_STEP])
+        return _TEXT_SAMPLE_STEP * measured
+
+
+class _Line:
+    """Polyligne candidate à la simplification (sommets X/Y après arrondi)."""
+
+    __slots__ = ("entity", "kind", "xy", "index", "closed")
+
+    def __init__(self, entity, kind: str, xy: "np.ndarray", closed: bool):
+        # Sommets répétés consécutifs retirés (et dernier sommet égal au premier d'une polyligne fermée)
+        distinct = np.ones(len(xy), dtype=bool)
+        distinct[1:] = np.any(xy[1:] != xy[:-1], axis=1)
+        if closed and len(xy) > 1 and not np.any(xy[-1] != xy[0]):
+            distinct[-1] = False
+        self.entity = entity
+        self.kind = kind
+        self.index = np.flatnonzero(distinct)
+        self.xy = xy[self.index]
+        self.closed = closed
+
+    @property
+    def valid(self) -> bool:
+        return len(self.xy) >= (3 if self.closed else 2)
+
+
+class _Simplifier:
+    """Arrondit puis simplifie les entités d'un espace objet (voir simplify_document)."""
+
+    def __init__(self, doc: Drawing, tolerance: Optional[float], precision: Optional[int]):
+        self.doc = doc
+        self.tolerance = tolerance
+        self.precision = precision
+        self.stats = SimplifyStats()
+        self.lines: List[_Line] = []
+        self.text = _TextSampler()
+
+    # --- Arrondi ---
+    def _round(self, values: "np.ndarray") -> "np.ndarray":
+        """Valeurs arrondies (bilan des coordonnées modifiées et des octets évités)."""
+        if self.precision is None:
+            return values
+        rounded = np.round(values, self.precision)
+        changed = rounded != values
+        count = int(changed.sum())
+        if count:
+            self.stats.rounded += count
+            self.stats.bytes_saved += self.text.length(values[changed], rounded[changed])
+        return rounded
+
+    def collect(self, entities) -> None:
+        """Arrondit les coordonnées et retient les polylignes à simplifier."""
+        for entity in entities:
+            kind = entity.dxftype()
+            try:
+                if kind == "LWPOLYLINE":
+                    self._lwpolyline(entity)
+                elif kind == "POLYLINE":
+                    self._polyline(entity)
+                elif kind == "SPLINE":
+                    self._spline(entity)
+                elif self.precision is not None and kind in _POINT_ATTRIBUTES:
+                    self._points(entity, _POINT_ATTRIBUTES[kind])
+            except Exception as e:
+                # Géométrie invalide : l'entité reste telle quelle
+                logger.debug(f"Simplification ignorée pour {entity}: {e}")
+
+    def _lwpolyline(self, entity) -> None:
+        values = np.array(entity.lwpoints.values, dtype=np.float64).reshape(-1, LWPOLYLINE_VERTEX_SIZE)
+        self.stats.entities += 1
+        self.stats.vertices_before += len(values)
+        if self.precision is not None and len(values):
+            values[:, :2] = self._round(values[:, :2])
+            _set_lwpoints(entity, values)
+        if self.tolerance and in_wcs(entity) and not values[:, 2:].any():
+            self.lines.append(_Line(entity, "LWPOLYLINE", values[:, :2].copy(), entity.closed))
+
+    def _polyline(self, entity) -> None:
+        if not (entity.is_2d_polyline or entity.is_3d_polyline):
+            return
+        vertices = entity.vertices
+        self.stats.entities += 1
+        self.stats.vertices_before += len(vertices)
+        if not vertices:
+            return
+        locations = np.array([tuple(vertex.dxf.location) for vertex in vertices], dtype=np.float64)
+        if self.precision is not None:
+            rounded = self._round(locations)
+            for vertex, old, new in zip(vertices, locations, rounded):
+                if np.any(old != new):
+                    vertex.dxf.location = Vec3(new)
+            locations = rounded
+        if (self.tolerance and not entity.dxf.flags & _POLYLINE_FITTED
+                and (entity.is_3d_polyline or in_wcs(entity))
+                and not entity.has_arc and not entity.has_width):
+            self.lines.append(_Line(entity, "POLYLINE", locations[:, :2].copy(), entity.is_closed))
+
+    def _spline(self, entity) -> None:
+        self.stats.entities += 1
+        fit = np.array(entity.fit_points.values, dtype=np.float64).reshape(-1, 3)
+        control = np.array(entity.control_points.values, dtype=np.float64).reshape(-1, 3)
+        self.stats.vertices_before += len(fit) + len(control)
+        if self.precision is not None:
+            if len(fit):
+                fit = self._round(fit)
+                entity.fit_points = fit
+            if len(control):
+                control = self._round(control)
+                entity.control_points = control
+        if self.tolerance and len(fit) and not len(control):
+            # Courbe définie par ses seuls points d'ajustement : ils se simplifient comme des sommets
+            self.lines.append(_Line(entity, "SPLINE", fit[:, :2].copy(), entity.closed))
+
+    def _points(self, entity, names) -> None:
+        dxf = entity.dxf
+        for name in names:
+            point = dxf.get(name)
+            if point is None:
+                continue
+            values = np.array(tuple(point), dtype=np.float64)
+            rounded = self._round(values)
+            if np.any(rounded != values):
+                dxf.set(name, Vec3(rounded))
+
+    # --- Simplification ---
+    def simplify(self) -> None:
+        """Simplifie les polylignes retenues en conservant les jonctions communes."""
+        lines = [line for line in self.lines if line.valid]
+        if not lines:
+            return
+        kept, junctions = _simplify_lines(lines, self.tolerance)
+        self.stats.junctions = junctions
+        for line, positions in zip(lines, kept):
+            self._apply(line, line.index[positions])
+
+    def _apply(self, line: _Line, kept: "np.ndarray") -> None:
+        """Retire les sommets non conservés de l'entité (kept : positions d'origine conservées)."""
+        entity = line.entity
+        if line.kind == "LWPOLYLINE":
+            values = np.array(entity.lwpoints.values, dtype=np.float64).reshape(-1, LWPOLYLINE_VERTEX_SIZE)
+            removed = len(values) - len(kept)
+            if removed:
+                mask = np.ones(len(values), dtype=bool)
+                mask[kept] = False
+                # Codes 10 et 20 et leurs valeurs, sur deux lignes chacun
+                self.stats.bytes_saved += removed * 8 + self.text.length(values[mask, :2])
+                _set_lwpoints(entity, values[kept])
+        elif line.kind == "POLYLINE":
+            vertices = entity.vertices
+            removed = len(vertices) - len(kept)
+            if removed:
+                keep = set(kept.tolist())
+                db = self.doc.entitydb
+                for position, vertex in enumerate(vertices):
+                    if position not in keep:
+                        self.stats.bytes_saved += _entity_bytes(vertex, self.doc.dxfversion)
+                        db.delete_entity(vertex)
+                vertices[:] = [vertex for vertex in vertices if vertex.is_alive]
+        else:
+            fit = np.array(entity.fit_points.values, dtype=np.float64).reshape(-1, 3)
+            removed = len(fit) - len(kept)
+            if removed:
+                mask = np.ones(len(fit), dtype=bool)
+                mask[kept] = False
+                # Codes 11, 21 et 31 et leurs valeurs
+                self.stats.bytes_saved += removed * 12 + self.text.length(fit[mask])
+                entity.fit_points = fit[kept]
+        if removed:
+            self.stats.simplified += 1
+            self.stats.vertices_after -= removed
+
+
+def _set_lwpoints(entity, values: "np.ndarray") -> None:
+    """Remplace les sommets d'une LWPOLYLINE (tableau NumPy ou array("d") à plat selon la version d'ezdxf)."""
+    points = entity.lwpoints
+    if isinstance(points.values, np.ndarray):
+        points.values = np.array(values, dtype=np.float64).reshape(-1, LWPOLYLINE_VERTEX_SIZE)
+    else:
+        points.values = array("d", values.ravel().tolist())
+
+
+def _entity_bytes(entity, dxfversion: str) -> int:
+    """Taille estimée d'une entité dans un DXF texte (code et valeur sur deux lignes)."""
+    collector = TagCollector(dxfversion=dxfversion)
+    entity.export_dxf(collector)
+    return sum(len(str(tag.code)) + len(str(tag.value)) + 2 for tag in collector.tags)
+
+
+def _anchor_vertices(lines: List[_Line], coords: "np.ndarray"):
+    """Numérote les sommets de toutes les polylignes et repère les sommets à conserver.
+
+    Un sommet est conservé s'il n'a pas exactement deux voisins distincts sur l'ensemble
+    des polylignes (jonction où des tracés se séparent, sommet isolé) ou s'il termine une
+    polyligne ouverte : entre deux sommets conservés, toutes les polylignes qui suivent un
+    même tronçon en décrivent exactement la même suite de sommets.
+
+    Args:
+        lines: Polylignes candidates
+        coords: Sommets de toutes les polylignes, bout à bout
+
+    Returns:
+        (numéro de chaque sommet de coords ; tableau booléen des numéros conservés)
+    """
+    # Numéros dans l'ordre lexicographique des coordonnées (départage des anneaux sans jonction)
+    order = np.lexsort((coords[:, 1], coords[:, 0]))
+    ordered = coords[order]
+    distinct = np.ones(len(ordered), dtype=bool)
+    distinct[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    ids = np.empty(len(coords), dtype=np.int64)
+    ids[order] = np.cumsum(distinct) - 1
+    vertex_count = int(ids.max()) + 1
+    following = np.arange(1, len(ids) + 1)
+    ends = []
+    offset = 0
+    for line in lines:
+        last = offset + len(line.xy) - 1
+        if line.closed:
+            following[last] = offset
+        else:
+            following[last] = -1
+            ends.extend((offset, last))
+        offset = last + 1
+    linked = following >= 0
+    first, second = ids[linked], ids[following[linked]]
+    low, high = np.minimum(first, second), np.maximum(first, second)
+    edges = np.unique(low.astype(np.int64) * vertex_count + high)
+    degree = (np.bincount(edges // vertex_count, minlength=vertex_count)
+              + np.bincount(edges % vertex_count, minlength=vertex_count))
+    anchors = degree != 2
+    anchors[ids[ends]] = True
+    return ids, anchors
+
+
+def _simplify_lines(lines: List[_Line], tolerance: float):
+    """Sommets conservés de chaque polyligne : jonctions, puis Douglas-Peucker sur chaque tronçon.
+
+    Chaque polyligne est parcourue d'un sommet conservé au suivant (les anneaux recommencent
+    sur un sommet conservé, ou sur leur plus petit sommet s'ils n'en ont pas) ; chaque tronçon
+    est simplifié dans un sens canonique, le même dans toutes les polylignes qui le partagent.
+
+    Args:
+        lines: Polylignes candidates
+        tolerance: Écart maximal entre la polyligne d'origine et la polyligne simplifiée
+
+    Returns:
+        (positions conservées de chaque polyligne dans line.xy ; nombre de sommets de jonction)
+    """
+    coords = np.concatenate([line.xy for line in lines])
+    ids, anchors = _anchor_vertices(lines, coords)
+    fixed = anchors[ids]
+
+    # Parcours de chaque polyligne (positions dans coords), anneaux refermés sur leur départ
+    walks = []
+    offset = 0
+    for line in lines:
+        count = len(line.xy)
+        if line.closed:
+            positions = np.flatnonzero(fixed[offset:offset + count])
+            start = int(positions[0]) if len(positions) else int(ids[offset:offset + count].argmin())
+            walks.append(np.append(np.roll(np.arange(count), -start), start) + offset)
+        else:
+            walks.append(np.arange(offset, offset + count))
+        offset += count
+    lengths = np.array([len(walk) for walk in walks])
+    walk = np.concatenate(walks)
+    line_of = np.repeat(np.arange(len(lines)), lengths)
+    cut = fixed[walk]
+    ends = np.cumsum(lengths)
+    cut[ends - lengths] = True
+    cut[ends - 1] = True
+
+    # Tronçons entre deux sommets conservés consécutifs d'une même polyligne
+    cuts = np.flatnonzero(cut)
+    first, last = cuts[:-1], cuts[1:]
+    inside = (line_of[first] == line_of[last]) & (last - first >= 2)
+    first, last = first[inside], last[inside]
+    walk_ids = ids[walk]
+    # Sens canonique : du plus petit sommet d'extrémité (boucle : du plus petit second sommet)
+    reverse = (walk_ids[last] < walk_ids[first]) | (
+        (walk_ids[last] == walk_ids[first]) & (walk_ids[last - 1] < walk_ids[first + 1]))
+    size = last - first + 1
+    run_start = np.cumsum(size) - size
+    step = np.arange(int(size.sum())) - np.repeat(run_start, size)
+    along = np.where(np.repeat(reverse, size), np.repeat(last, size) - step, np.repeat(first, size) + step)
+
+    kept = cut
+    kept[along[_douglas_peucker(coords[walk[along]], run_start, size, tolerance)]] = True
+    kept_coords = np.zeros(len(coords), dtype=bool)
+    kept_coords[walk[kept]] = True
+
+    result = []
+    offset = 0
+    for line in lines:
+        count = len(line.xy)
+        positions = np.flatnonzero(kept_coords[offset:offset + count])
+        if len(positions) < (3 if line.closed else 2):
+            # Anneau dégénéré par la simplification : sommets d'origine conservés
+            positions = np.arange(count)
+        result.append(positions)
+        offset += count
+    return result, int(anchors.sum())
+
+
+def _douglas_peucker(points: "np.ndarray", run_start: "np.ndarray", size: "np.ndarray",
+                     tolerance: float) -> "np.ndarray":
+    """Simplification Douglas-Peucker de plusieurs suites de points à la fois (extrémités conservées).
+
+    Les cordes de toutes les suites sont traitées ensemble, niveau de récursion par niveau :
+    à chaque passe, un seul calcul NumPy donne le point le plus éloigné de chaque corde, et
+    chaque corde dont ce point dépasse la tolérance est coupée en deux. Chaque point retiré
+    est à moins de tolerance du segment simplifié qui le remplace.
+
+    Args:
+        points: Tableau (n, 2) des points de toutes les suites, bout à bout
+        run_start: Position du premier point de chaque suite
+        size: Nombre de points de chaque suite
+        tolerance: Écart maximal (unités du dessin)
+
+    Returns:
+        Tableau booléen des points conservés
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    first = run_start
+    last = run_start + size - 1
+    keep[first] = True
+    keep[last] = True
+    limit = tolerance * tolerance
+    while len(first):
+        inner = last - first - 1
+        active = inner > 0
+        first, last, inner = first[active], last[active], inner[active]
+        if not len(first):
+            break
+        offsets = np.cumsum(inner) - inner
+        index = np.arange(int(inner.sum())) - np.repeat(offsets, inner) + np.repeat(first + 1, inner)
+        origin = points[np.repeat(first, inner)]
+        chord = points[np.repeat(last, inner)] - origin
+        vector = points[index] - origin
+        length = np.einsum("ij,ij->i", chord, chord)
+        # Distance au segment (projection bornée aux extrémités de la corde, corde nulle : au point)
+        t = np.clip(np.einsum("ij,ij->i", vector, chord) / np.where(length > 0.0, length, 1.0), 0.0, 1.0)
+        vector -= t[:, None] * chord
+        distance = np.einsum("ij,ij->i", vector, vector)
+        peak = np.maximum.reduceat(distance, offsets)
+        split = peak > limit
+        # Premier point le plus éloigné de chaque corde coupée
+        farthest = np.minimum.reduceat(np.where(distance == np.repeat(peak, inner), index, len(points)),
+                                       offsets)[split]
+        keep[farthest] = True
+        first = np.concatenate((first[split], farthest))
+        last = np.concatenate((farthest, last[split]))
+    return keep
+
+
+def simplify_document(doc: Drawing, tolerance: Optional[float] = None,
+                      precision: Optional[int] = None) -> SimplifyStats:
+    """Arrondit les coordonnées puis simplifie les polylignes de l'espace objet.
+
+    Args:
+        doc: Document modifié sur place (assemblage complet : les jonctions entre feuilles
+            ne sont détectées qu'entre entités d'un même document)
+        tolerance: Écart maximal de la simplification (unités du dessin), None : sans simplification
+        precision: Nombre de décimales conservées, None : coordonnées inchangées
+
+    Returns:
+        Bilan de la simplification
+
+    Raises:
+        RuntimeError: Si NumPy n'est pas disponible
+        ValueError: Si la tolérance ou la précision est invalide
+    """
+    if np is None:
+        raise RuntimeError("NumPy est requis pour simplifier les géométries")
+    check_simplify_options(tolerance, precision)
+    simplifier = _Simplifier(doc, tolerance or None, precision)
+    simplifier.collect(doc.modelspace())
+    simplifier.stats.vertices_after = simplifier.stats.vertices_before
+    if tolerance:
+        simplifier.simplify()
+    return simplifier.stats
+
+
+def check_simplify_options(tolerance: Optional[float], precision: Optional[int]) -> None:
+    """Vérifie la tolérance de simplification et le nombre de décimales.
+
+    Raises:
+        ValueError: Tolérance négative ou nombre de décimales hors de 0..SIMPLIFY_MAX_PRECISION
+    """
+    if tolerance is not None and not tolerance >= 0:
+        raise ValueError(f"Tolérance de simplification invalide : {tolerance}")
+    if precision is not None and not 0 <= precision <= SIMPLIFY_MAX_PRECISION:
+        raise ValueError(f"Nombre de décimales invalide : {precision} (0 à {SIMPLIFY_MAX_PRECISION})")
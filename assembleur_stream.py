@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : écriture en flux de la section ENTITIES (assemblages plus grands que la mémoire)
+- Les tables et les définitions de blocs de chaque source sont fusionnées dans le document
+  assemblé comme d'habitude ; ses entités sont écrites, dès la source importée, dans un fichier
+  temporaire puis retirées du document
+- À l'écriture finale, la section ENTITIES est recopiée depuis ce fichier entre les blocs
+  et les objets : le document ne contient jamais plus d'entités que celles d'une source
+
+Le pic mémoire dépend de la plus grande source (ou du plus grand document partiel en fusion
+parallèle) et des définitions partagées, et non plus de la somme des sources. Les handles restent
+uniques : ils ne sont jamais réattribués par le document, et $HANDSEED est écrit en dernier.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+from ezdxf.document import Drawing
+from ezdxf.lldxf.tagwriter import BinaryTagWriter, TagWriter
+
+from assembleur_output import OUTPUT_BUFFER_SIZE
+
+
+class EntitySpool:
+    """Section ENTITIES d'un assemblage écrite au fil de l'eau dans un fichier temporaire.
+
+    Le fichier temporaire est au format de la sortie (balises texte ou binaires) : il est
+    recopié tel quel par write_dxf(doc, path, fmt, entities=spool).
+
+    Args:
+        doc: Document assemblé (reçoit les tables et les blocs de toutes les sources)
+        fmt: Format de sortie (voir OUTPUT_FORMATS)
+        folder: Dossier du fichier temporaire (celui de la sortie : même disque)
+    """
+
+    def __init__(self, doc: Drawing, fmt: str, folder: str):
+        self.doc = doc
+        self.binary = fmt == "binary"
+        self.entities = 0
+        # Flux binaire de la sortie, renseigné par write_dxf le temps de l'écriture
+        self.output = None
+        fd, self.path = tempfile.mkstemp(prefix=".assemblage_", suffix=".entities.tmp", dir=folder)
+        if self.binary:
+            self._file = io.open(fd, "wb", buffering=OUTPUT_BUFFER_SIZE)
+            self._tagwriter = BinaryTagWriter(self._file, dxfversion=doc.dxfversion,
+                                              write_handles=True, encoding=doc.output_encoding)
+        else:
+            self._file = io.open(fd, "wt", encoding=doc.output_encoding, errors="dxfreplace",
+                                 buffering=OUTPUT_BUFFER_SIZE)
+            self._tagwriter = TagWriter(self._file, dxfversion=doc.dxfversion, write_handles=True)
+
+    def flush(self) -> int:
+        """Écrit les entités de l'espace objet dans le fichier temporaire puis les retire du document.
+
+        À appeler après Importer.finalize() : les références de blocs sont alors résolues.
+
+        Returns:
+            Nombre d'entités écrites
+        """
+        entity_space = self.doc.modelspace().entity_space
+        entity_space.export_dxf(self._tagwriter)
+        count = 0
+        discard = self.doc.entitydb.discard
+        for entity in entity_space:
+            # Sous-entités comprises (attributs, sommets) ; dictionnaires d'extension conservés
+            discard(entity)
+            count += 1
+        entity_space.clear()
+        self.entities += count
+        return count
+
+    @property
+    def size(self) -> int:
+        """Taille actuelle du fichier temporaire (octets)."""
+        self._file.flush()
+        return os.path.getsize(self.path)
+
+    def export_dxf(self, tagwriter) -> None:
+        """Section ENTITIES complète : entités écrites, puis celles restées dans le document.
+
+        Remplace doc.entities pendant l'écriture (voir write_dxf).
+        """
+        if isinstance(tagwriter, BinaryTagWriter) != self.binary:
+            raise ValueError("Format du fichier temporaire des entités différent de celui de la sortie")
+        self._file.close()
+        layouts = self.doc.layouts
+        tagwriter.write_tag2(0, "SECTION")
+        tagwriter.write_tag2(2, "ENTITIES")
+        if self.binary:
+            # Balises binaires recopiées octet par octet dans le flux de la sortie : BinaryTagWriter
+            # écrit sans tampon, l'ordre des balises est conservé
+            if self.output is None:
+                raise ValueError("Sortie binaire en flux : écrire par write_dxf(doc, path, 'binary', "
+                                 "entities=spool), ou relancer sans --streaming")
+            with open(self.path, "rb") as f:
+                shutil.copyfileobj(f, self.output, OUTPUT_BUFFER_SIZE)
+        else:
+            with io.open(self.path, "rt", encoding=self.doc.output_encoding) as f:
+                while True:
+                    chunk = f.read(OUTPUT_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    tagwriter.write_str(chunk)
+        layouts.modelspace().entity_space.export_dxf(tagwriter)
+        layouts.active_layout().entity_space.export_dxf(tagwriter)
+        tagwriter.write_tag2(0, "ENDSEC")
+
+    def close(self) -> None:
+        """Supprime le fichier temporaire."""
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
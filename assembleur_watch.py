@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Assembleur DXF → DWG : surveillance d'un dossier de dépôt (mode « watch »)
+- Détecte les archives .tar.bz2 ajoutées, modifiées ou supprimées (list_tarbz2_files)
+- Notifications inotify sous Linux (sans dépendance, via ctypes), scrutation périodique ailleurs
+- Attend que le dossier soit calme et que chaque archive soit stable (taille et date
+  inchangées, fichier lisible) avant de déclencher un assemblage
+- Le processus reste résident : modules, session AutoCAD et cache des sources restent chauds,
+  et la mise à jour incrémentale ne réextrait que les archives nouvelles ou modifiées
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from assembleur_core import list_tarbz2_files
+
+logger = logging.getLogger(__name__)
+
+
+# Délai sans modification du dossier avant de traiter les archives (s)
+WATCH_SETTLE_SECONDS = 10.0
+
+# Intervalle de scrutation du dossier sans inotify, et de contrôle pendant l'attente de stabilité (s)
+WATCH_POLL_INTERVAL = 2.0
+
+# Relecture complète du dossier même sans notification (événements perdus, partage réseau) (s)
+WATCH_RESCAN_INTERVAL = 60.0
+
+# Masque inotify : fin d'écriture, création, déplacement, suppression et modification
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+                 | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+
+
+# Signature d'une archive : (taille, date de modification en ns)
+ArchiveSignature = Tuple[int, int]
+
+
+def snapshot_archives(folder: str) -> Dict[str, ArchiveSignature]:
+    """Signature (taille, date) de chaque archive .tar.bz2 du dossier.
+
+    Args:
+        folder: Dossier surveillé
+
+    Returns:
+        Chemin de l'archive -> signature (archives disparues pendant la lecture ignorées)
+    """
+    snapshot = {}
+    for path in list_tarbz2_files(folder):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def is_readable(path: str) -> bool:
+    """Vrai si l'archive peut être ouverte en lecture (sous Windows, échoue tant qu'elle est en cours de copie)."""
+    try:
+        with open(path, "rb") as f:
+            f.read(1)
+        return True
+    except OSError:
+        return False
+
+
+class _Inotify:
+    """Notifications inotify d'un dossier (Linux), utilisées pour réveiller la surveillance.
+
+    Les événements ne sont pas interprétés : chaque réveil déclenche une relecture du dossier.
+    """
+
+    def __init__(self, folder: str):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify indisponible sur ce système")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), _INOTIFY_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch {folder}")
+
+    def wait(self, timeout: float) -> bool:
+        """Attend une notification (au plus timeout s) et vide la file.
+
+        Returns:
+            True si le dossier a changé
+        """
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class ArchiveWatcher:
+    """Surveille un dossier d'archives et signale les changements une fois stables.
+
+    Un changement (archive ajoutée, modifiée ou supprimée par rapport au dernier état
+    signalé) n'est signalé qu'après settle secondes sans aucune modification du dossier,
+    et quand chaque archive ajoutée ou modifiée est lisible.
+
+    Args:
+        folder: Dossier surveillé
+        settle: Délai sans modification avant de signaler les changements (s)
+        poll_interval: Intervalle de scrutation sans inotify (s)
+        use_inotify: Utiliser inotify si disponible (Linux)
+        initial: État de départ (chemin -> signature) ; None : dossier vide, toutes les
+            archives présentes sont signalées au premier changement stable
+    """
+
+    def __init__(self, folder: str, settle: float = WATCH_SETTLE_SECONDS,
+                 poll_interval: float = WATCH_POLL_INTERVAL, use_inotify: bool = True,
+                 initial: Optional[Dict[str, ArchiveSignature]] = None):
+        self.folder = folder
+        self.settle = max(0.0, float(settle))
+        self.poll_interval = max(0.05, float(poll_interval))
+        # Dernier état signalé, et dernier état observé (avec la date de son dernier changement)
+        self.known = dict(initial or {})
+        self._seen = dict(self.known)
+        self._changed_at = None
+        self._notifier = None
+        if use_inotify:
+            try:
+                self._notifier = _Inotify(folder)
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify indisponible, scrutation périodique : {e}")
+
+    @property
+    def mode(self) -> str:
+        """Mode de détection : « inotify » ou « scrutation »."""
+        return "inotify" if self._notifier is not None else "scrutation"
+
+    def poll(self) -> Optional[Tuple[List[str], List[str]]]:
+        """Relit le dossier une fois, sans attendre.
+
+        Returns:
+            (archives ajoutées ou modifiées, archives supprimées) si des changements sont
+            stables depuis settle secondes, None sinon
+        """
+        current = snapshot_archives(self.folder)
+        now = time.monotonic()
+        if current != self._seen:
+            self._seen = current
+            self._changed_at = now
+        changed = [path for path, signature in current.items() if self.known.get(path) != signature]
+        removed = [path for path in self.known if path not in current]
+        if not changed and not removed:
+            self._changed_at = None
+            return None
+        if self._changed_at is not None and now - self._changed_at < self.settle:
+            return None
+        if not all(is_readable(path) for path in changed):
+            # Copie encore en cours (fichier verrouillé) : nouvelle tentative après le délai
+            self._changed_at = now
+            return None
+        self.known = current
+        self._changed_at = None
+        return sorted(changed), sorted(removed)
+
+    def wait(self, stop_event: Optional[threading.Event] = None,
+             timeout: Optional[float] = None) -> Optional[Tuple[List[str], List[str]]]:
+        """Attend des changements stables (voir poll).
+
+        Args:
+            stop_event: Interrompt l'attente quand il est positionné
+            timeout: Durée maximale d'attente (s), ou None
+
+        Returns:
+            (archives ajoutées ou modifiées, archives supprimées), ou None (arrêt ou délai écoulé)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        scan = True
+        last_scan = 0.0
+        while stop_event is None or not stop_event.is_set():
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return None
+            if scan or now - last_scan >= WATCH_RESCAN_INTERVAL:
+                last_scan = now
+                changes = self.poll()
+                if changes is not None:
+                    return changes
+            delay = self.poll_interval
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - now))
+            if self._notifier is not None and self._changed_at is None:
+                # Dossier calme : relecture à la prochaine notification (ou relecture de sécurité)
+                scan = self._notifier.wait(delay)
+            else:
+                # Attente de stabilité, ou scrutation périodique
+                scan = True
+                if self._changed_at is not None:
+                    delay = min(delay, max(0.05, self._changed_at + self.settle - now))
+                if self._notifier is not None:
+                    self._notifier.wait(0)
+                if stop_event is not None:
+                    stop_event.wait(delay)
+                else:
+                    time.sleep(delay)
+        return None
+
+    def close(self) -> None:
+        """Libère les notifications inotify."""
+        if self._notifier is not None:
+            self._notifier.close()
+            self._notifier = None
+
+
+def watch_folder(folder: str, on_changes: Callable[[List[str], List[str]], None],
+                 stop_event: Optional[threading.Event] = None, settle: float = WATCH_SETTLE_SECONDS,
+                 poll_interval: float = WATCH_POLL_INTERVAL, use_inotify: bool = True,
+                 log: Callable[[str], None] = logger.info,
+                 initial: Optional[Dict[str, ArchiveSignature]] = None) -> None:
+    """Surveille un dossier et appelle on_changes à chaque lot de changements stables.
+
+    Le traitement initial (mise à jour de l'assemblage) est à la charge de l'appelant, qui
+    relève l'état du dossier (snapshot_archives) avant de le lancer et le passe dans initial :
+    les archives déposées pendant ce traitement sont ainsi signalées ensuite. Bloquant
+    jusqu'à stop_event.
+
+    Args:
+        folder: Dossier d'archives surveillé
+        on_changes: Reçoit (archives ajoutées ou modifiées, archives supprimées)
+        stop_event: Arrête la surveillance quand il est positionné (None : jusqu'à Ctrl+C)
+        settle: Délai sans modification avant traitement (s)
+        poll_interval: Intervalle de scrutation sans inotify (s)
+        use_inotify: Utiliser inotify si disponible (Linux)
+        log: Fonction recevant les messages du journal
+        initial: État du dossier déjà traité (chemin -> signature) ; None : contenu actuel du dossier
+    """
+    if initial is None:
+        initial = snapshot_archives(folder)
+    watcher = ArchiveWatcher(folder, settle, poll_interval, use_inotify, initial=initial)
+    log(f"👀 Surveillance de {folder} ({watcher.mode}, délai de stabilité {watcher.settle:g} s)")
+    try:
+        while stop_event is None or not stop_event.is_set():
+            changes = watcher.wait(stop_event)
+            if changes is None:
+                continue
+            changed, removed = changes
+            log(f"📥 {len(changed)} archive(s) nouvelle(s) ou modifiée(s), {len(removed)} supprimée(s)")
+            for path in changed:
+                log(f"   + {os.path.basename(path)}")
+            for path in removed:
+                log(f"   - {os.path.basename(path)}")
+            on_changes(changed, removed)
+    finally:
+        watcher.close()
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Banc d'essai de l'assembleur : corpus synthétique et mesures de débit (voir docs/BENCHMARKS.md)."""
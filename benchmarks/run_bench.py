@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Banc d'essai reproductible de l'assembleur (sans AutoCAD ni Qt)
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.run_bench --output resultats.json
+    python -m benchmarks.run_bench --archives 2 --sheets 10 --entities 500 --cases pipeline_serial,parse
+    python -m benchmarks.run_bench --output apres.json --compare avant.json
+
+Chaque cas est exécuté dans un processus neuf (démarrage « spawn ») : le pic mémoire
+mesuré est celui du cas seul, processus de fusion compris. Les étapes isolées ne
+chronomètrent que l'étape visée ; leur préparation (extraction, lecture…) est exclue.
+"""
+
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import ezdxf
+
+from assembleur_core import (
+    APP_VERSION,
+    AssemblyEngine,
+    fast_validate_dxf,
+    import_dxf_document,
+    list_tarbz2_files,
+    load_dxf_file,
+    purge_dxf_document,
+)
+from assembleur_extents import compute_extents
+from assembleur_output import output_path, write_dxf
+from benchmarks.synthetic import CorpusSpec, build_corpus
+
+RESULTS_FORMAT = 1
+
+# Options d'AssemblyEngine de chaque variante du pipeline complet
+PIPELINE_CASES = {
+    "pipeline_serial": {},
+    "pipeline_parallel": {"merge_workers": min(4, os.cpu_count() or 1)},
+    "pipeline_in_memory": {"in_memory": True},
+    "pipeline_multi_pass": {"single_parse": False},
+    "pipeline_cleanup": {"do_cleanup": True},
+    "pipeline_streaming": {"streaming": True},
+    "pipeline_simplify": {"simplify_tolerance": 0.05, "coordinate_precision": 2},
+    "pipeline_geopackage": {"geopackage": True},
+}
+
+# Écriture du document assemblé, par format de sortie
+SAVEAS_CASES = {"saveas": "ascii", "saveas_binary": "binary", "saveas_gzip": "gzip", "saveas_zip": "zip"}
+
+# Étapes mesurées isolément
+STAGE_CASES = ("extraction", "validation", "parse", "cleanup", "extents", "import") + tuple(SAVEAS_CASES)
+
+ALL_CASES = tuple(PIPELINE_CASES) + STAGE_CASES
+
+
+def _silent(_message: str) -> None:
+    pass
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Pic de mémoire résidente du processus et de ses processus enfants terminés."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _extract_all(corpus_dir: str, work_dir: str) -> List[str]:
+    """Extrait le corpus (préparation des étapes isolées) et retourne les DXF extraits."""
+    engine = AssemblyEngine(corpus_dir, [], work_dir, open_in_autocad=False)
+    extract_dir = os.path.join(work_dir, "extracted")
+    os.makedirs(extract_dir, exist_ok=True)
+    return [str(p) for p in engine.extract_archives(list_tarbz2_files(corpus_dir), extract_dir)]
+
+
+def _timed_documents(paths: List[str], step: Callable) -> float:
+    """Charge chaque DXF (non chronométré) puis chronomètre ``step(doc, path)``."""
+    elapsed = 0.0
+    for path in paths:
+        doc, _error = load_dxf_file(path)
+        if doc is None:
+            continue
+        t0 = time.perf_counter()
+        step(doc, path)
+        elapsed += time.perf_counter() - t0
+    return elapsed
+
+
+def run_case(case: str, corpus_dir: str, work_dir: str) -> dict:
+    """Exécute un cas de mesure (dans un processus de travail neuf).
+
+    Args:
+        case: Nom du cas (voir ALL_CASES)
+        corpus_dir: Dossier des archives du corpus
+        work_dir: Dossier de travail propre au cas
+
+    Returns:
+        Dictionnaire {wall, cpu, peak_rss, output_bytes, status}
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    os.makedirs(work_dir, exist_ok=True)
+    output_bytes = None
+    status = "ok"
+    cpu0 = time.process_time()
+
+    if case in PIPELINE_CASES:
+        engine = AssemblyEngine(corpus_dir, [], work_dir, open_in_autocad=False, **PIPELINE_CASES[case])
+        t0 = time.perf_counter()
+        engine.run()
+        wall = time.perf_counter() - t0
+        status = engine.status
+        output = os.path.join(work_dir, "assemblage.dxf")
+        if os.path.isfile(output):
+            output_bytes = os.path.getsize(output)
+
+    elif case == "extraction":
+        engine = AssemblyEngine(corpus_dir, [], work_dir, open_in_autocad=False)
+        extract_dir = os.path.join(work_dir, "extracted")
+        os.makedirs(extract_dir, exist_ok=True)
+        t0 = time.perf_counter()
+        engine.extract_archives(list_tarbz2_files(corpus_dir), extract_dir)
+        wall = time.perf_counter() - t0
+
+    else:
+        paths = _extract_all(corpus_dir, work_dir)
+        if case == "validation":
+            t0 = time.perf_counter()
+            for path in paths:
+                fast_validate_dxf(path)
+            wall = time.perf_counter() - t0
+        elif case == "parse":
+            t0 = time.perf_counter()
+            for path in paths:
+                load_dxf_file(path)
+            wall = time.perf_counter() - t0
+        elif case == "cleanup":
+            wall = _timed_documents(paths, lambda doc, path: purge_dxf_document(doc, path, _silent))
+        elif case == "extents":
+            wall = _timed_documents(paths, lambda doc, path: compute_extents(doc.modelspace()))
+        else:
+            target = ezdxf.new("R2010")
+            wall = _timed_documents(paths, lambda doc, path: import_dxf_document(doc, target, path, _silent))
+            if case in SAVEAS_CASES:
+                output = output_path(os.path.join(work_dir, "assemblage.dxf"), SAVEAS_CASES[case])
+                t0 = time.perf_counter()
+                output_bytes = write_dxf(target, output, SAVEAS_CASES[case])
+                wall = time.perf_counter() - t0
+
+    return {
+        "wall": wall,
+        "cpu": time.process_time() - cpu0,
+        "peak_rss": _peak_rss_bytes(),
+        "output_bytes": output_bytes,
+        "status": status,
+    }
+
+
+def _throughput(case: str, wall: float, corpus: dict, output_bytes: Optional[int]) -> dict:
+    """Débits d'un cas : entités/s et Mo/s (octets compressés pour l'extraction, écrits pour saveas)."""
+    if case == "extraction":
+        volume = corpus["archive_bytes"]
+    elif case in SAVEAS_CASES:
+        volume = output_bytes or 0
+    else:
+        volume = corpus["dxf_bytes"]
+    wall = max(wall, 1e-9)
+    return {
+        "entities_per_s": round(corpus["entities"] / wall, 1),
+        "mb_per_s": round(volume / wall / 1e6, 3),
+    }
+
+
+def _git_revision(root: str) -> dict:
+    """Révision git du dépôt mesuré (commit et présence de modifications locales)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True,
+                                text=True, timeout=30).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, timeout=60).stdout.strip()
+        return {"commit": commit or None, "dirty": bool(dirty)}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+def run_benchmarks(corpus_dir: str, corpus: dict, cases: List[str], repeat: int,
+                   work_root: str, log=print) -> Dict[str, dict]:
+    """Exécute les cas demandés, chacun ``repeat`` fois dans un processus neuf.
+
+    Le meilleur temps est retenu (moins sensible au bruit de la machine) ; le pic mémoire
+    retenu est le plus élevé des exécutions.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for case in cases:
+        runs = []
+        for n in range(repeat):
+            work_dir = os.path.join(work_root, f"{case}_{n}")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(run_case, case, corpus_dir, work_dir).result())
+            shutil.rmtree(work_dir, ignore_errors=True)
+        best = min(runs, key=lambda r: r["wall"])
+        peaks = [r["peak_rss"] for r in runs if r["peak_rss"] is not None]
+        results[case] = {
+            "wall": round(best["wall"], 4),
+            "cpu": round(best["cpu"], 4),
+            "walls": [round(r["wall"], 4) for r in runs],
+            "peak_rss_mb": round(max(peaks) / 2**20, 1) if peaks else None,
+            "output_bytes": best["output_bytes"],
+            "status": best["status"],
+            **_throughput(case, best["wall"], corpus, best["output_bytes"]),
+        }
+        r = results[case]
+        peak = f"{r['peak_rss_mb']:.0f} Mo" if r["peak_rss_mb"] is not None else "n/d"
+        log(f"{case:<22} {r['wall']:>9.3f} s  {r['entities_per_s']:>11.0f} ent/s  "
+            f"{r['mb_per_s']:>8.2f} Mo/s  pic {peak}" + ("" if r["status"] == "ok" else f"  [{r['status']}]"))
+    return results
+
+
+def compare_results(current: dict, baseline: dict, log=print) -> None:
+    """Affiche, pour chaque cas commun, le rapport des temps et des pics mémoire à une référence."""
+    base_rev = (baseline.get("git") or {}).get("commit") or "?"
+    log(f"Comparaison avec {base_rev[:10]} (rapport < 1 : plus rapide / moins de mémoire)")
+    if baseline.get("corpus", {}).get("spec") != current["corpus"]["spec"]:
+        log("⚠️ Corpus différents : comparaison indicative seulement")
+    for case, r in current["cases"].items():
+        ref = baseline.get("cases", {}).get(case)
+        if not ref:
+            continue
+        speed = r["wall"] / ref["wall"] if ref.get("wall") else float("nan")
+        line = f"{case:<22} temps x{speed:.2f}"
+        if r.get("peak_rss_mb") and ref.get("peak_rss_mb"):
+            line += f"  mémoire x{r['peak_rss_mb'] / ref['peak_rss_mb']:.2f}"
+        log(line)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run_bench",
+        description="Banc d'essai de l'assembleur DXF sur un corpus cadastre synthétique.")
+    spec = CorpusSpec()
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "assembleur_bench_corpus"),
+                        help="Dossier du corpus (réutilisé si ses paramètres sont identiques)")
+    parser.add_argument("--archives", type=int, default=spec.archives, help="Nombre d'archives .tar.bz2")
+    parser.add_argument("--sheets", type=int, default=spec.sheets_per_archive, help="Feuilles DXF par archive")
+    parser.add_argument("--entities", type=int, default=spec.entities_per_sheet, help="Entités par feuille")
+    parser.add_argument("--layers", type=int, default=spec.layers, help="Calques par feuille")
+    parser.add_argument("--blocks", type=int, default=spec.blocks, help="Blocs par feuille")
+    parser.add_argument("--styles", type=int, default=spec.text_styles, help="Styles de texte par feuille")
+    parser.add_argument("--duplicates", type=float, default=spec.duplicate_ratio,
+                        help="Part des définitions communes à toutes les feuilles (0..1)")
+    parser.add_argument("--seed", type=int, default=spec.seed, help="Graine du générateur")
+    parser.add_argument("--regenerate", action="store_true", help="Régénérer le corpus")
+    parser.add_argument("--cases", default=",".join(ALL_CASES),
+                        help="Cas à mesurer, séparés par des virgules (défaut : tous)")
+    parser.add_argument("--repeat", type=int, default=1, help="Exécutions par cas (meilleur temps retenu)")
+    parser.add_argument("--output", help="Fichier de résultats JSON")
+    parser.add_argument("--compare", help="Résultats JSON de référence à comparer")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in ALL_CASES]
+    if unknown:
+        parser.error(f"cas inconnu(s) : {', '.join(unknown)} (disponibles : {', '.join(ALL_CASES)})")
+    if not 0.0 <= args.duplicates <= 1.0:
+        parser.error("--duplicates doit être compris entre 0 et 1")
+
+    for stream in (sys.stdout, sys.stderr):
+        if isinstance(stream, io.TextIOWrapper):
+            stream.reconfigure(errors="replace")
+    logging.getLogger().setLevel(logging.WARNING)
+
+    spec = CorpusSpec(archives=args.archives, sheets_per_archive=args.sheets,
+                      entities_per_sheet=args.entities, layers=args.layers, blocks=args.blocks,
+                      text_styles=args.styles, duplicate_ratio=args.duplicates, seed=args.seed)
+    corpus_dir = os.path.abspath(args.corpus)
+    corpus = build_corpus(corpus_dir, spec, force=args.regenerate)
+    print(f"Corpus : {corpus['sheets']} feuille(s), {corpus['entities']} entité(s), "
+          f"{corpus['dxf_bytes'] / 1e6:.1f} Mo DXF, {corpus['archive_bytes'] / 1e6:.1f} Mo compressés")
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory(prefix="assembleur_bench_") as work_root:
+        results = run_benchmarks(corpus_dir, corpus, cases, max(1, args.repeat), work_root)
+
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git": _git_revision(root),
+        "app_version": APP_VERSION,
+        "python": platform.python_version(),
+        "ezdxf": ezdxf.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "corpus": corpus,
+        "repeat": max(1, args.repeat),
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Résultats : {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_results(report, json.load(f))
+    return 0 if all(r["status"] == "ok" for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Générateur d'archives cadastre synthétiques (.tar.bz2 de feuilles DXF)
+- Taille configurable : archives, feuilles par archive, entités par feuille
+- Calques, blocs et styles de texte : part de définitions communes à toutes les
+  feuilles (doublons, comme les feuilles réelles d'une même commune) ou propres à chaque feuille
+- Reproductible : une même graine donne les mêmes géométries ; un corpus existant
+  généré avec les mêmes paramètres est réutilisé
+"""
+
+import io
+import json
+import math
+import os
+import random
+import tarfile
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import ezdxf
+from ezdxf.document import Drawing
+
+
+# Origine des feuilles (Lambert 93, ordre de grandeur d'une commune française) et taille d'une feuille (m)
+ORIGIN_X = 650000.0
+ORIGIN_Y = 6860000.0
+SHEET_SIZE = 500.0
+
+# Date fixe des membres d'archive (corpus reproductible)
+MEMBER_MTIME = 1700000000
+
+# Fichier décrivant un corpus généré
+CORPUS_MANIFEST = "corpus.json"
+
+
+@dataclass
+class CorpusSpec:
+    """Paramètres d'un corpus synthétique."""
+    archives: int = 4
+    sheets_per_archive: int = 25
+    entities_per_sheet: int = 2000
+    layers: int = 12
+    blocks: int = 6
+    text_styles: int = 3
+    # Part des calques/blocs/styles communs à toutes les feuilles (0..1)
+    duplicate_ratio: float = 0.75
+    seed: int = 1
+
+    @property
+    def sheets(self) -> int:
+        return self.archives * self.sheets_per_archive
+
+
+def _definition_names(prefix: str, count: int, duplicate_ratio: float, sheet: int) -> List[str]:
+    """Noms des définitions d'une feuille : les premières sont communes, les autres propres à la feuille."""
+    shared = round(count * duplicate_ratio)
+    return [f"{prefix}_{k}" if k < shared else f"{prefix}_{k}_F{sheet}" for k in range(count)]
+
+
+def build_sheet(spec: CorpusSpec, sheet: int) -> Drawing:
+    """Construit une feuille cadastre synthétique.
+
+    Répartition des entités : parcelles (LWPOLYLINE fermées) 50 %, limites (LINE) 15 %,
+    numéros (TEXT) 15 %, bornes (INSERT) 10 %, CIRCLE 5 %, POINT 5 %.
+
+    Args:
+        spec: Paramètres du corpus
+        sheet: Numéro global de la feuille (position dans la grille, graine)
+
+    Returns:
+        Document DXF de la feuille
+    """
+    rng = random.Random(spec.seed * 1000003 + sheet)
+    doc = ezdxf.new("R2010")
+    msp = doc.modelspace()
+
+    layers = _definition_names("CAD", spec.layers, spec.duplicate_ratio, sheet)
+    for k, name in enumerate(layers):
+        doc.layers.add(name, color=1 + k % 255)
+    styles = _definition_names("TXT", spec.text_styles, spec.duplicate_ratio, sheet)
+    for name in styles:
+        doc.styles.add(name, font="arial.ttf")
+    blocks = _definition_names("BORNE", spec.blocks, spec.duplicate_ratio, sheet)
+    for k, name in enumerate(blocks):
+        block = doc.blocks.new(name)
+        radius = 0.2 + 0.1 * k
+        block.add_circle((0, 0), radius, dxfattribs={"layer": "0"})
+        block.add_line((-radius, 0), (radius, 0), dxfattribs={"layer": "0"})
+        block.add_line((0, -radius), (0, radius), dxfattribs={"layer": "0"})
+
+    columns = max(1, math.ceil(math.sqrt(spec.sheets)))
+    x0 = ORIGIN_X + (sheet % columns) * SHEET_SIZE
+    y0 = ORIGIN_Y + (sheet // columns) * SHEET_SIZE
+
+    def point():
+        return x0 + rng.random() * SHEET_SIZE, y0 + rng.random() * SHEET_SIZE
+
+    kinds = ("parcel",) * 10 + ("line",) * 3 + ("text",) * 3 + ("insert",) * 2 + ("circle", "point")
+    for n in range(spec.entities_per_sheet):
+        kind = kinds[n % len(kinds)]
+        attribs = {"layer": rng.choice(layers)}
+        if kind == "parcel":
+            cx, cy = point()
+            sides = rng.randint(4, 8)
+            size = 5.0 + rng.random() * 25.0
+            vertices = [(cx + size * math.cos(2 * math.pi * i / sides) * (0.7 + 0.3 * rng.random()),
+                         cy + size * math.sin(2 * math.pi * i / sides) * (0.7 + 0.3 * rng.random()))
+                        for i in range(sides)]
+            msp.add_lwpolyline(vertices, close=True, dxfattribs=attribs)
+        elif kind == "line":
+            msp.add_line(point(), point(), dxfattribs=attribs)
+        elif kind == "text":
+            attribs.update(style=rng.choice(styles), height=1.5)
+            msp.add_text(str(rng.randint(1, 9999)), dxfattribs=attribs).set_placement(point())
+        elif kind == "insert":
+            msp.add_blockref(rng.choice(blocks), point(), dxfattribs=attribs)
+        elif kind == "circle":
+            msp.add_circle(point(), 0.5 + rng.random() * 3.0, dxfattribs=attribs)
+        else:
+            msp.add_point(point(), dxfattribs=attribs)
+    return doc
+
+
+def _dxf_bytes(doc: Drawing) -> bytes:
+    stream = io.StringIO()
+    doc.write(stream)
+    return stream.getvalue().encode(doc.output_encoding, errors="dxfreplace")
+
+
+def load_corpus(folder: str) -> Optional[dict]:
+    """Relit la description d'un corpus généré (None si absent ou illisible)."""
+    try:
+        with open(os.path.join(folder, CORPUS_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_corpus(folder: str, spec: CorpusSpec, force: bool = False, log=print) -> dict:
+    """Génère les archives .tar.bz2 du corpus (ou réutilise un corpus identique).
+
+    Args:
+        folder: Dossier des archives
+        spec: Paramètres du corpus
+        force: Régénérer même si un corpus identique existe
+        log: Fonction recevant les messages de progression
+
+    Returns:
+        Description du corpus : paramètres, archives, nombre d'entités, tailles DXF et compressée
+    """
+    existing = load_corpus(folder)
+    if not force and existing is not None and existing.get("spec") == asdict(spec) and all(
+            os.path.isfile(os.path.join(folder, name)) for name in existing["archives"]):
+        log(f"Corpus existant réutilisé : {folder}")
+        return existing
+
+    os.makedirs(folder, exist_ok=True)
+    archives = []
+    dxf_bytes = 0
+    for a in range(spec.archives):
+        name = f"synthetique_{a:03d}.tar.bz2"
+        with tarfile.open(os.path.join(folder, name), "w:bz2") as tar:
+            for s in range(spec.sheets_per_archive):
+                sheet = a * spec.sheets_per_archive + s
+                data = _dxf_bytes(build_sheet(spec, sheet))
+                dxf_bytes += len(data)
+                info = tarfile.TarInfo(f"commune_{a:03d}/feuille_{sheet:05d}.dxf")
+                info.size = len(data)
+                info.mtime = MEMBER_MTIME
+                tar.addfile(info, io.BytesIO(data))
+        archives.append(name)
+        log(f"Archive {a + 1}/{spec.archives} : {name}")
+
+    corpus = {
+        "spec": asdict(spec),
+        "archives": archives,
+        "sheets": spec.sheets,
+        "entities": spec.sheets * spec.entities_per_sheet,
+        "dxf_bytes": dxf_bytes,
+        "archive_bytes": sum(os.path.getsize(os.path.join(folder, name)) for name in archives),
+    }
+    with open(os.path.join(folder, CORPUS_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(corpus, f, indent=2)
+    return corpus
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Application AutoCAD factice pour AutocadConverter (remplace l'objet COM hors Windows).
+
+Seul le sous-ensemble utilisé par assembleur_convert est simulé : Version, Documents
+(Open, Count, Item), document (FullName, SaveAs, Close, Activate), GetAcadState().IsQuiescent,
+ZoomExtents et Visible. Chaque appel est journalisé avec le nom du thread appelant.
+"""
+
+import threading
+
+# HRESULT renvoyés par le faux AutoCAD
+RPC_E_CALL_REJECTED = -2147418111
+RPC_S_SERVER_UNAVAILABLE = -2147023174
+
+
+class FakeComError(Exception):
+    """Erreur COM (com_error) : code HRESULT en premier argument et dans hresult."""
+
+    def __init__(self, hresult: int, message: str = ""):
+        super().__init__(hresult, message)
+        self.hresult = hresult
+
+
+class FakeDocument:
+    def __init__(self, app: "FakeAutocad", path: str):
+        self._app = app
+        self.FullName = path
+
+    def SaveAs(self, path: str, save_type: int) -> None:
+        self._app._call("SaveAs", path, save_type)
+        with open(self.FullName, "rb") as f:
+            content = f.read()
+        with open(path, "wb") as f:
+            f.write(self._app.signature + content)
+
+    def Close(self, save: bool) -> None:
+        self._app._call("Close", self.FullName)
+        self._app._documents.remove(self)
+
+    def Activate(self) -> None:
+        self._app._call("Activate", self.FullName)
+
+
+class FakeDocuments:
+    def __init__(self, app: "FakeAutocad"):
+        self._app = app
+
+    def Open(self, path: str) -> FakeDocument:
+        self._app._call("Open", path)
+        doc = FakeDocument(self._app, path)
+        self._app._documents.append(doc)
+        self._app.busy_readings = self._app.busy_after_open
+        return doc
+
+    @property
+    def Count(self) -> int:
+        self._app._call("Count")
+        return len(self._app._documents)
+
+    def Item(self, index: int) -> FakeDocument:
+        self._app._call("Item", index)
+        return self._app._documents[index]
+
+
+class FakeState:
+    def __init__(self, quiescent: bool):
+        self.IsQuiescent = quiescent
+
+
+class FakeAutocad:
+    """Application AutoCAD factice.
+
+    Attributs de réglage :
+        signature: Début des DWG écrits par SaveAs (b"AC1032" : DWG 2018)
+        busy: Nom d'appel -> nombre de refus « application occupée » avant succès
+        busy_after_open: Relevés « pas au repos » après chaque ouverture de document
+        always_busy: AutoCAD jamais au repos
+    """
+
+    def __init__(self, version: str = "24.1s (LMS Tech)"):
+        self._version = version
+        self._documents = []
+        self._alive = True
+        self.signature = b"AC1032"
+        self.busy = {}
+        self.busy_after_open = 0
+        self.busy_readings = 0
+        self.always_busy = False
+        self.Visible = False
+        self.calls = []
+
+    def _call(self, name: str, *args) -> None:
+        if not self._alive:
+            raise FakeComError(RPC_S_SERVER_UNAVAILABLE, "Le serveur RPC n'est pas disponible.")
+        self.calls.append((name, args, threading.current_thread().name))
+        if self.busy.get(name, 0) > 0:
+            self.busy[name] -= 1
+            raise FakeComError(RPC_E_CALL_REJECTED, "L'appel a été rejeté par l'appelé.")
+
+    def quit(self) -> None:
+        """Simule la fermeture d'AutoCAD par l'utilisateur : la session est perdue."""
+        self._alive = False
+
+    def called(self, name: str) -> list:
+        """Arguments des appels réussis ou refusés d'un nom donné, dans l'ordre."""
+        return [args for call, args, _ in self.calls if call == name]
+
+    @property
+    def Version(self) -> str:
+        self._call("Version")
+        return self._version
+
+    @property
+    def Documents(self) -> FakeDocuments:
+        self._call("Documents")
+        return FakeDocuments(self)
+
+    def GetAcadState(self) -> FakeState:
+        self._call("GetAcadState")
+        if self.always_busy:
+            return FakeState(False)
+        if self.busy_readings > 0:
+            self.busy_readings -= 1
+            return FakeState(False)
+        return FakeState(True)
+
+    def ZoomExtents(self) -> None:
+        self._call("ZoomExtents")
+
+
+class FakeDispatch:
+    """Fonction dispatch pour AutocadConverter : une nouvelle application à chaque connexion."""
+
+    def __init__(self):
+        self.apps = []
+        self.new_instance = []
+
+    def __call__(self, new_instance: bool) -> FakeAutocad:
+        self.new_instance.append(new_instance)
+        app = FakeAutocad()
+        self.apps.append(app)
+        return app
+
+    @property
+    def app(self) -> FakeAutocad:
+        """Dernière application connectée."""
+        return self.apps[-1]
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""File de conversion AutoCAD (AutocadConverter), avec une application COM factice (fake_autocad)."""
+
+import os
+
+import pytest
+
+from assembleur_convert import AutocadConverter, _AutocadSession
+from tests.fake_autocad import RPC_E_CALL_REJECTED, FakeDispatch
+
+
+def write_dxf(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def dispatch():
+    return FakeDispatch()
+
+
+@pytest.fixture
+def converter(dispatch):
+    converter = AutocadConverter(dispatch=dispatch, timeout=5.0)
+    yield converter
+    converter.close()
+
+
+def test_convert_many_keeps_queue_order_in_one_session(tmp_path, dispatch, converter):
+    paths = [write_dxf(tmp_path / f"feuille_{i}.dxf", b"DXF %d" % i) for i in range(5)]
+
+    results = converter.convert_many(paths)
+    converter.show(paths[0], zoom=True)
+    more = converter.convert_many(paths[:2])
+
+    assert results == [(path, os.path.splitext(path)[0] + ".dwg", None) for path in paths]
+    assert [path for path, _, error in more if error is None] == paths[:2]
+    for path, dwg_path, _ in results:
+        assert read(dwg_path) == b"AC1032" + read(path)
+    # Une seule connexion, tous les appels COM depuis le thread de la session, dans l'ordre de la file
+    assert len(dispatch.apps) == 1
+    app = dispatch.app
+    assert {thread for _, _, thread in app.calls} == {"autocad-session"}
+    assert [args[0] for args in app.called("Open")] == paths + [paths[0]] + paths[:2]
+    assert [args[0] for args in app.called("SaveAs")] == [dwg for _, dwg, _ in results + more]
+    assert app.Visible and app.called("ZoomExtents")
+
+
+def test_busy_calls_are_retried(tmp_path, dispatch, converter):
+    path = write_dxf(tmp_path / "plan.dxf", b"contenu")
+    converter.version()
+    app = dispatch.app
+    app.busy = {"Open": 2, "SaveAs": 1, "GetAcadState": 3}
+
+    assert converter.convert(path) == str(tmp_path / "plan.dwg")
+
+    assert len(app.called("Open")) == 3
+    assert len(app.called("SaveAs")) == 2
+    assert app.busy == {"Open": 0, "SaveAs": 0, "GetAcadState": 0}
+    assert read(tmp_path / "plan.dwg") == b"AC1032contenu"
+
+
+def test_busy_beyond_timeout_fails(tmp_path, dispatch):
+    path = write_dxf(tmp_path / "plan.dxf", b"contenu")
+    with AutocadConverter(dispatch=dispatch, timeout=0.3) as converter:
+        converter.version()
+        dispatch.app.busy = {"Open": 1000}
+
+        (_, dwg_path, error), = converter.convert_many([path])
+
+    assert dwg_path is None
+    assert str(RPC_E_CALL_REJECTED) in error
+
+
+def test_waits_until_quiescent(tmp_path, dispatch, converter):
+    path = write_dxf(tmp_path / "plan.dxf", b"contenu")
+    converter.version()
+    dispatch.app.busy_after_open = 4
+
+    assert converter.convert(path) == str(tmp_path / "plan.dwg")
+    assert len(dispatch.app.called("GetAcadState")) >= 5
+
+
+def test_wait_idle_timeout(dispatch):
+    session = _AutocadSession(dispatch, False, timeout=0.3)
+    session.version()
+    dispatch.app.always_busy = True
+
+    with pytest.raises(TimeoutError, match="AutoCAD occupé"):
+        session.wait_idle()
+    assert len(dispatch.app.called("GetAcadState")) > 1
+
+
+def test_reconnects_after_lost_session(tmp_path, dispatch, converter):
+    first = write_dxf(tmp_path / "a.dxf", b"premier")
+    second = write_dxf(tmp_path / "b.dxf", b"second")
+    converter.convert(first)
+    dispatch.app.quit()
+
+    assert converter.convert(second) == str(tmp_path / "b.dwg")
+
+    assert len(dispatch.apps) == 2
+    assert [args[0] for args in dispatch.apps[1].called("SaveAs")] == [str(tmp_path / "b.dwg")]
+    assert read(tmp_path / "b.dwg") == b"AC1032second"
+
+
+def test_rejects_file_without_dwg_signature(tmp_path, dispatch, converter):
+    path = write_dxf(tmp_path / "plan.dxf", b"contenu")
+    converter.version()
+    dispatch.app.signature = b"XXXXXX"
+
+    with pytest.raises(ValueError, match="signature"):
+        converter.convert(path)
+    (_, dwg_path, error), = converter.convert_many([path])
+    assert dwg_path is None
+    assert "Fichier DWG invalide" in error
+    # Documents refermés malgré l'échec
+    assert not dispatch.app._documents
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Conversion DWG par ODA File Converter (OdaConverter), avec un faux convertisseur (tests/stubs)."""
+
+import json
+import os
+
+import pytest
+
+from assembleur_convert import OdaConverter
+
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs", "ODAFileConverter")
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="faux convertisseur lancé par son shebang (POSIX)")
+
+
+def write_dxf(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def stub_log(tmp_path, monkeypatch):
+    log = tmp_path / "appels.jsonl"
+    monkeypatch.setenv("ODA_STUB_LOG", str(log))
+    for name in ("ODA_STUB_SLEEP", "ODA_STUB_EXIT", "ODA_STUB_ERR"):
+        monkeypatch.delenv(name, raising=False)
+
+    def calls():
+        if not log.exists():
+            return []
+        return [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    return calls
+
+
+def test_convert_many_splits_into_batches(tmp_path, stub_log):
+    paths = [write_dxf(tmp_path / "dxf" / f"feuille_{i}.dxf", b"DXF %d" % i * (i + 1)) for i in range(5)]
+
+    results = OdaConverter(STUB, workers=2).convert_many(paths)
+
+    assert [path for path, _, _ in results] == paths
+    for index, (path, dwg_path, error) in enumerate(results):
+        assert error is None
+        assert dwg_path == os.path.splitext(path)[0] + ".dwg"
+        assert read(dwg_path) == b"AC1032" + read(path)
+    calls = stub_log()
+    assert len(calls) == 2
+    assert sorted(len(call["files"]) for call in calls) == [2, 3]
+    assert all(call["args"][:2] == ["ACAD2018", "DWG"] for call in calls)
+    # Dossiers de travail supprimés
+    assert not [name for name in os.listdir(tmp_path / "dxf") if name.startswith(".oda_")]
+
+
+def test_convert_many_same_name_in_different_folders(tmp_path, stub_log):
+    first = write_dxf(tmp_path / "a" / "plan.dxf", b"premier")
+    second = write_dxf(tmp_path / "b" / "plan.dxf", b"second")
+
+    results = OdaConverter(STUB, workers=1).convert_many([first, second])
+
+    assert [error for _, _, error in results] == [None, None]
+    assert read(tmp_path / "a" / "plan.dwg") == b"AC1032premier"
+    assert read(tmp_path / "b" / "plan.dwg") == b"AC1032second"
+    assert len(stub_log()) == 1
+
+
+def test_convert_many_timeout(tmp_path, stub_log, monkeypatch):
+    monkeypatch.setenv("ODA_STUB_SLEEP", "5")
+    path = write_dxf(tmp_path / "plan.dxf", b"contenu")
+
+    (_, dwg_path, error), = OdaConverter(STUB, workers=1, timeout=0.5).convert_many([path])
+
+    assert dwg_path is None
+    assert "arrêté après" in error
+    assert not os.path.exists(tmp_path / "plan.dwg")
+
+
+def test_convert_many_non_zero_exit(tmp_path, stub_log, monkeypatch):
+    monkeypatch.setenv("ODA_STUB_EXIT", "3")
+    path = write_dxf(tmp_path / "plan.dxf", b"contenu")
+    # Un DWG d'une exécution précédente ne passe pas pour le résultat
+    write_dxf(tmp_path / "plan.dwg", b"AC1032ancien")
+
+    (_, dwg_path, error), = OdaConverter(STUB, workers=1).convert_many([path])
+
+    assert dwg_path is None
+    assert "code 3" in error and "erreur simulée" in error
+    assert not os.path.exists(tmp_path / "plan.dwg")
+
+
+def test_convert_many_reports_err_file(tmp_path, stub_log, monkeypatch):
+    monkeypatch.setenv("ODA_STUB_ERR", "abime")
+    good = write_dxf(tmp_path / "bon.dxf", b"bon")
+    bad = write_dxf(tmp_path / "abime.dxf", b"abime")
+
+    results = OdaConverter(STUB, workers=1).convert_many([good, bad])
+
+    assert results[0] == (good, str(tmp_path / "bon.dwg"), None)
+    assert results[1][:2] == (bad, None)
+    assert results[1][2] == "Erreur de lecture simulée"
+
+
+def test_convert_with_explicit_target_keeps_default_sibling(tmp_path, stub_log):
+    path = write_dxf(tmp_path / "c.dxf", b"contenu")
+    converter = OdaConverter(STUB, workers=1)
+    (_, sibling, _), = converter.convert_many([path])
+    target = str(tmp_path / "sortie" / "out.dwg")
+    os.makedirs(os.path.dirname(target))
+
+    assert converter.convert(path, target) == target
+
+    assert read(target) == b"AC1032contenu"
+    assert read(sibling) == b"AC1032contenu"
+
+
+def test_convert_raises_on_failure(tmp_path, stub_log, monkeypatch):
+    monkeypatch.setenv("ODA_STUB_EXIT", "1")
+    path = write_dxf(tmp_path / "plan.dxf", b"contenu")
+
+    with pytest.raises(RuntimeError, match="code 1"):
+        OdaConverter(STUB, workers=1).convert(path)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Surveillance du dossier de dépôt (ArchiveWatcher), en mode inotify et en scrutation."""
+
+import os
+import time
+
+import pytest
+
+from assembleur_watch import ArchiveWatcher, snapshot_archives
+
+SETTLE = 0.3
+POLL_INTERVAL = 0.05
+TIMEOUT = 5.0
+
+
+@pytest.fixture(params=["inotify", "scrutation"])
+def make_watcher(request, tmp_path):
+    watchers = []
+
+    def make(initial=None):
+        watcher = ArchiveWatcher(str(tmp_path), settle=SETTLE, poll_interval=POLL_INTERVAL,
+                                 use_inotify=request.param == "inotify", initial=initial)
+        watchers.append(watcher)
+        if watcher.mode != request.param:
+            pytest.skip("inotify indisponible")
+        return watcher
+    yield make
+    for watcher in watchers:
+        watcher.close()
+
+
+def drop(folder, name, content=b"BZh91AY&SY"):
+    path = os.path.join(str(folder), name)
+    with open(path, "ab") as f:
+        f.write(content)
+    return path
+
+
+def test_reports_dropped_archive_once_settled(tmp_path, make_watcher):
+    watcher = make_watcher()
+    path = drop(tmp_path, "lot_1.tar.bz2")
+    drop(tmp_path, "notes.txt")
+
+    start = time.monotonic()
+    changes = watcher.wait(timeout=TIMEOUT)
+
+    assert changes == ([path], [])
+    assert time.monotonic() - start >= SETTLE
+    assert watcher.wait(timeout=SETTLE * 2) is None
+
+
+def test_reports_grown_archive(tmp_path, make_watcher):
+    path = drop(tmp_path, "lot_1.tar.bz2")
+    watcher = make_watcher(initial=snapshot_archives(str(tmp_path)))
+    assert watcher.wait(timeout=SETTLE * 2) is None
+
+    drop(tmp_path, "lot_1.tar.bz2", b"suite de la copie")
+
+    assert watcher.wait(timeout=TIMEOUT) == ([path], [])
+    assert watcher.known[path][0] == os.path.getsize(path)
+
+
+def test_reports_deleted_archive(tmp_path, make_watcher):
+    kept = drop(tmp_path, "lot_1.tar.bz2")
+    deleted = drop(tmp_path, "lot_2.tar.bz2")
+    watcher = make_watcher(initial=snapshot_archives(str(tmp_path)))
+
+    os.remove(deleted)
+
+    assert watcher.wait(timeout=TIMEOUT) == ([], [deleted])
+    assert list(watcher.known) == [kept]
+
+
+def test_waits_for_copy_to_finish(tmp_path, make_watcher):
+    watcher = make_watcher()
+    path = drop(tmp_path, "lot_1.tar.bz2")
+    # Copie qui se poursuit : rien n'est signalé tant que l'archive grossit
+    for _ in range(4):
+        assert watcher.wait(timeout=SETTLE / 2) is None
+        drop(tmp_path, "lot_1.tar.bz2", b"bloc")
+
+    assert watcher.wait(timeout=TIMEOUT) == ([path], [])
+    assert watcher.known[path][0] == os.path.getsize(path)